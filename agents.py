@@ -2,14 +2,23 @@ from autogen_ext.models.ollama import OllamaChatCompletionClient
 from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.conditions import TextMentionTermination
 from autogen_agentchat.teams import SelectorGroupChat
-from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
-from typing import Dict, Any, Sequence, List
-import json
-from ddgs import DDGS
+from autogen_agentchat.base import TaskResult
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage, TextMessage
+from typing import Dict, Any, Sequence, List, Tuple
+from autogen_core import CancellationToken
 from autogen_core.tools import FunctionTool
 import asyncio
+import time
+import ollama
 import logging
-from functools import partial
+from search import default_search_service
+from prompt_budget import PromptBudget, log_turn_usage
+from turn_scheduler import TurnScheduler
+from consensus import find_consensus_section, build_transcript
+from moderation import ModerationStage
+from transcript import TranscriptWriter
+from telemetry import default_telemetry
+import config
 from logger_config import setup_logging
 
 # Configure logging for all modules
@@ -21,59 +30,116 @@ async def web_search(query: str, num_results: int = 3) -> List[Dict[str, str]]:
     """
     Perform a web search using DuckDuckGo
     """
+    return await default_search_service.search(query, num_results)
+
+
+DEBATOR_MODEL = "llama3.1:latest"
+MODERATION_MODEL = "llama-guard3:latest"
+
+
+def create_model_clients() -> Tuple[
+    OllamaChatCompletionClient, OllamaChatCompletionClient
+]:
+    """
+    Create the debator and moderation model clients
+    """
+    debator_client = OllamaChatCompletionClient(
+        # model="gpt-oss:20b",
+        model=DEBATOR_MODEL,
+        model_info={
+            "vision": False,
+            "function_calling": True,
+            "json_output": False,
+            # "family": "gpt-4",
+            "family": "llama-3.3-8b",
+            "structured_output": False,
+            "multiple_system_messages": False,
+        },
+        keep_alive=config.OLLAMA_KEEP_ALIVE,
+    )
+    moderation_client = OllamaChatCompletionClient(
+        model=MODERATION_MODEL,
+        model_info={
+            "vision": False,
+            "function_calling": False,
+            "json_output": False,
+            "family": "llama-3.3-8b",
+            "structured_output": False,
+            "multiple_system_messages": False,
+        },
+        keep_alive=config.OLLAMA_KEEP_ALIVE,
+    )
+    return debator_client, moderation_client
+
+
+async def warm_up_models(
+    models: Sequence[str] = (DEBATOR_MODEL, MODERATION_MODEL),
+    keep_alive: str = config.OLLAMA_KEEP_ALIVE,
+) -> None:
+    """
+    Preload the models into Ollama once at startup so model load time is not paid during the first debate
+    """
+    client = ollama.AsyncClient()
+
+    async def load(model: str) -> None:
+        started = time.monotonic()
+        try:
+            # An empty prompt only loads the model and keeps it resident for keep_alive
+            await client.generate(model=model, prompt="", keep_alive=keep_alive)
+            logger.info(f"Loaded {model} into Ollama in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            logger.warning(f"Could not preload {model} into Ollama: {str(e)}")
+
     try:
-        # Run DuckDuckGo search in a thread pool to avoid blocking
-        loop = asyncio.get_event_loop()
-        with DDGS() as ddgs:
-            search_func = partial(list, ddgs.text(query, max_results=num_results))
-            results = await loop.run_in_executor(None, search_func)
-
-        formatted_results = []
-        for r in results:
-            try:
-                formatted_results.append(
-                    {
-                        "title": r.get("title", "No title"),
-                        "link": r.get("url", r.get("link", "No link")),
-                        "snippet": r.get("body", r.get("snippet", "No description")),
-                    }
-                )
-            except (AttributeError, KeyError) as e:
-                logger.warning(f"Skipping malformed result: {str(e)}")
-                continue
+        await asyncio.gather(*(load(model) for model in models))
+    finally:
+        # ollama 0.5 has no close() on its client, so close the HTTP client underneath it
+        await client._client.aclose()
+
+
+ANALYSIS_ERROR_MESSAGE = "There was an error during analysis."
+
+OPENING_ROUND_PROMPT = """This is the opening round of the debate. Give your initial stance on the stock (buy, sell, or hold)
+and your key reasons, referring to the stock data provided. The other analysts are giving their opening statements at the same time."""
+
+SUMMARY_REPAIR_PROMPT = """The summary of this debate either did not include the required format or did not specify a valid recommendation.
+The recommendation MUST be "Buy", "Sell", or "Hold".
+
+You do not need to redo the debate, but just summarize the transcript above again in the required format.
 
-        return formatted_results
-    except Exception as e:
-        logger.error(f"Search error: {str(e)}", exc_info=True)
-        return []
+End your markdown summary with 'TERMINATE' on a new line."""
+
+REBUTTAL_PHASE_NOTE = """The analysts have already given their opening statements below.
+DebateFacilitator: skip the initial stance question, summarize the opening statements and start the rebuttal phase."""
 
 
 class StockAnalysisSystem:
-    def __init__(self):
-        debator_client = OllamaChatCompletionClient(
-            # model="gpt-oss:20b",
-            model="llama3.1:latest",
-            model_info={
-                "vision": False,
-                "function_calling": True,
-                "json_output": False,
-                # "family": "gpt-4",
-                "family": "llama-3.3-8b",
-                "structured_output": False,
-                "multiple_system_messages": False,
-            },
-        )
-        moderation_client = OllamaChatCompletionClient(
-            model="llama-guard3:latest",
-            model_info={
-                "vision": False,
-                "function_calling": False,
-                "json_output": False,
-                "family": "llama-3.3-8b",
-                "structured_output": False,
-                "multiple_system_messages": False,
-            },
-        )
+    def __init__(
+        self,
+        parallel_openings: bool = config.PARALLEL_OPENINGS,
+        opening_parallelism: int = config.OPENING_PARALLELISM,
+        summary_repair_attempts: int = config.SUMMARY_REPAIR_ATTEMPTS,
+        stream_transcripts: bool = config.STREAM_TRANSCRIPTS,
+        model_clients: (
+            Tuple[OllamaChatCompletionClient, OllamaChatCompletionClient] | None
+        ) = None,
+    ):
+        self.prompt_budget = PromptBudget()
+        self.parallel_openings = parallel_openings
+        self.opening_parallelism = opening_parallelism
+        self.summary_repair_attempts = summary_repair_attempts
+        self.stream_transcripts = stream_transcripts
+        # Wall time of each debate phase and summary repair counts for the last analyzed stock
+        self.phase_timings: Dict[str, float] = {}
+        self.repair_stats: Dict[str, int] = {"repair_calls": 0}
+        # Whether the last debate was handed to the summarizer because its time budget ran out
+        self.wrapped_up = False
+        # Passed to every agent and team run, so cancel() aborts the model call in flight
+        self.cancellation_token = CancellationToken()
+
+        # Model clients (and their HTTP connections) can be shared across systems and stocks
+        debator_client, moderation_client = model_clients or create_model_clients()
+        self.model_clients = (debator_client, moderation_client)
 
         web_search_tool = FunctionTool(
             web_search,
@@ -93,8 +159,9 @@ class StockAnalysisSystem:
             - Long-term market trends
             - Positive industry developments
 
-            You have access to a web search function that you can use to find current information about stocks.
-            You can search for recent news, market analysis, or company developments to support your arguments.
+            Web search results about the stock's earnings, competitors, risks and news are provided with the stock data.
+            You also have access to a web search function for follow-up questions those results do not answer.
+            With it you can search for recent news, market analysis, or company developments to support your arguments.
 
             You must always refer to the stock data provided and any relevant information you find via web search.
             **DO NOT** ignore the stock data provided, instead use it to back up your arguments.
@@ -119,8 +186,9 @@ class StockAnalysisSystem:
             - Competition and market challenges
             - Potential alternative investments that are better given the money that could be made by selling this stock
 
-            You have access to a web search function that you can use to find current information about stocks.
-            You can search for recent news about risks, competitors, market challenges, or negative developments.
+            Web search results about the stock's earnings, competitors, risks and news are provided with the stock data.
+            You also have access to a web search function for follow-up questions those results do not answer.
+            With it you can search for recent news about risks, competitors, market challenges, or negative developments.
 
             You must always refer to the stock data provided and any relevant information you find via web search.
             **DO NOT** ignore the stock data provided, instead use it to back up your arguments.
@@ -141,10 +209,12 @@ class StockAnalysisSystem:
             - Long-term potential of the stock
             - Market stability and trends
             - Balanced view of risks and rewards
-            - Technical analysis indicators
+            - Technical analysis indicators (precomputed indicators such as moving averages, RSI, MACD,
+              Bollinger bands and ATR are provided with the stock data)
             
-            You have access to a web search function that you can use to find current information about stocks.
-            You can search for historical trends, market analysis, and balanced perspectives on the stock.
+            Web search results about the stock's earnings, competitors, risks and news are provided with the stock data.
+            You also have access to a web search function for follow-up questions those results do not answer.
+            With it you can search for historical trends, market analysis, and balanced perspectives on the stock.
 
             You must always refer to the stock data provided and any relevant information you find via web search.
             **DO NOT** ignore the stock data provided, instead use it to back up your arguments.
@@ -154,7 +224,7 @@ class StockAnalysisSystem:
             Make sure to cite any information you find from web searches.""",
         )
 
-        summarizer_agent = AssistantAgent(
+        self.summarizer_agent = AssistantAgent(
             "SummarizerAgent",
             model_client=debator_client,
             system_message="""You are a summarizer agent. Your job is to summarize the consensus decision from the analysts, describe each analyst's key point, 
@@ -199,9 +269,23 @@ class StockAnalysisSystem:
             After the analysts have reached a consensus, you must invoke SummarizerAgent to provide a summary of the debate.""",
         )
 
-        self.moderator_agent = AssistantAgent(
-            name="Moderator",
-            model_client=moderation_client,
+        # Llama Guard moderation of the consensus section
+        self.moderation_stage = ModerationStage(moderation_client)
+
+        self.analyst_agents = [buy_agent, sell_agent, hold_agent]
+
+        # Resolves the next speaker from the facilitator's message to skip most LLM selector calls,
+        # and hands off to the summarizer as soon as the analysts agree
+        self.turn_scheduler = TurnScheduler(
+            facilitator_name=self.debate_facilitator_agent.name,
+            agent_names=[
+                buy_agent.name,
+                sell_agent.name,
+                hold_agent.name,
+                self.summarizer_agent.name,
+            ],
+            analyst_names=[agent.name for agent in self.analyst_agents],
+            summarizer_name=self.summarizer_agent.name,
         )
 
         # Define termination condition
@@ -214,7 +298,7 @@ class StockAnalysisSystem:
                 buy_agent,
                 sell_agent,
                 hold_agent,
-                summarizer_agent,
+                self.summarizer_agent,
             ],
             model_client=debator_client,
             selector_prompt="""Select an agent to perform task.
@@ -233,11 +317,29 @@ class StockAnalysisSystem:
             max_turns=20,
         )
 
+    async def reset(self) -> None:
+        """
+        Clear the team and agent state before analyzing another stock, while keeping the model clients
+        and their HTTP connections alive
+        """
+        await self.stock_recommendation_team.reset()
+        self.phase_timings = {}
+        self.repair_stats = {"repair_calls": 0}
+        self.wrapped_up = False
+        self.cancellation_token = CancellationToken()
+
+    def cancel(self) -> None:
+        """
+        Abort the analysis in progress, including the model call of the current turn
+        """
+        self.cancellation_token.cancel()
+
     def __selector_func(
         self, messages: Sequence[BaseAgentEvent | BaseChatMessage]
     ) -> str | None:
         """
-        __selector_func always provides handoff back to debate facilitator if it was not the last speaker, otherwise lets selector group chat moderator decide next handoff.
+        __selector_func always provides handoff back to debate facilitator if it was not the last speaker. After the facilitator speaks,
+        it hands off to the agent the facilitator addressed, and only lets the selector group chat model decide when that is ambiguous.
 
         Args:
             messages (Sequence[BaseAgentEvent  |  BaseChatMessage]): The message history of the conversation.
@@ -245,100 +347,228 @@ class StockAnalysisSystem:
         Returns:
             str | None: The name of the agent to hand off to, or None if no specific handoff is needed.
         """
-        if messages[-1].source != self.debate_facilitator_agent.name:
-            return self.debate_facilitator_agent.name
-        return None
-
-    async def __verify_content_safety(self, content: str) -> bool:
+        return self.turn_scheduler.select(messages)
+
+    @staticmethod
+    def __record_turn(
+        symbol: str,
+        agent_name: str,
+        duration: float,
+        messages: Sequence[BaseAgentEvent | BaseChatMessage],
+    ) -> None:
         """
-        Use llama-guard to verify content safety
+        Record one agent turn span with the tokens used by its messages
         """
-        # Ask llama-guard to verify the content
-        response = await self.moderator_agent.run(task=content)
+        usages = [m.models_usage for m in messages if getattr(m, "models_usage", None)]
+        default_telemetry.record(
+            "agent_turn",
+            duration,
+            symbol=symbol,
+            agent=agent_name,
+            prompt_tokens=sum(usage.prompt_tokens for usage in usages),
+            completion_tokens=sum(usage.completion_tokens for usage in usages),
+        )
 
-        # Ignore S6 unsafe classification since stock advice is inherently risky, decreases false positives
-        return response.messages[-1].content in ["safe", "unsafe\nS6"]
+    async def __run_opening_round(self, symbol: str, task: str) -> List[BaseChatMessage]:
+        """
+        Fan the opening round out to the Buy, Sell and Hold agents concurrently, since their initial stances do not depend on each other.
+        Returns the opening statements as chat messages to seed the group chat history with.
+        """
+        semaphore = asyncio.Semaphore(self.opening_parallelism)
+
+        async def opening_statement(agent: AssistantAgent) -> BaseChatMessage:
+            async with semaphore:
+                started = time.monotonic()
+                result = await agent.run(
+                    task=f"{task}\n\n{OPENING_ROUND_PROMPT}",
+                    cancellation_token=self.cancellation_token,
+                )
+                self.__record_turn(symbol, agent.name, time.monotonic() - started, result.messages)
+            # The agent rebuilds its context from the shared group chat history, so drop the private exchange
+            await agent.on_reset(CancellationToken())
+            statement = result.messages[-1]
+            return TextMessage(
+                content=statement.to_text(),
+                source=agent.name,
+                models_usage=statement.models_usage,
+            )
+
+        return list(
+            await asyncio.gather(
+                *(opening_statement(agent) for agent in self.analyst_agents)
+            )
+        )
 
-    async def analyze_stock(self, stock_data: Dict[str, Any]) -> Dict[str, Any]:
+    async def __run_debate(
+        self, symbol: str, team_task: str | List[BaseChatMessage]
+    ) -> TaskResult:
         """
-        Conduct a full analysis of a stock using all agents
+        Run the group chat, streaming every turn to the symbol's JSONL transcript when enabled.
+        Streamed turns are also timed individually as agent_turn spans.
         """
+        if not self.stream_transcripts:
+            return await self.stock_recommendation_team.run(
+                task=team_task, cancellation_token=self.cancellation_token
+            )
+
+        result = None
+        with TranscriptWriter(symbol) as transcript:
+            # A turn (tool calls included) lasts from the previous agent's last message to this agent's last message
+            turn_start = time.monotonic()
+            turn_messages: List[BaseAgentEvent | BaseChatMessage] = []
+            # The task and the seeded opening statements are streamed back first and are not live turns
+            task_messages = 1 if isinstance(team_task, str) else len(team_task)
+            async for item in self.stock_recommendation_team.run_stream(
+                task=team_task, cancellation_token=self.cancellation_token
+            ):
+                if isinstance(item, TaskResult):
+                    result = item
+                    continue
+                transcript.write(item)
+                if transcript.turns <= task_messages:
+                    turn_start = time.monotonic()
+                    continue
+                turn_messages.append(item)
+                if isinstance(item, BaseChatMessage):
+                    self.__record_turn(
+                        symbol, item.source, time.monotonic() - turn_start, turn_messages
+                    )
+                    turn_start = time.monotonic()
+                    turn_messages = []
+        return result
 
-        # Initial prompt with stock data
-        task = f"""
-        Please analyze this stock based on the following data:
-        
-        Symbol: {stock_data.get('stock_data', {}).get('symbol', 'Unknown')}
-        
-        Recent Research Reports:
-        {json.dumps(stock_data.get('research_reports', []), indent=2)}
-        
-        Market Data:
-        {json.dumps(stock_data.get('stock_data', {}), indent=2)}
-        
-        Each agent should provide their perspective on whether to buy, sell, or hold this stock.
-        Consider all available information and justify your recommendations.
+    async def __repair_summary(
+        self, symbol: str, messages: Sequence[BaseAgentEvent | BaseChatMessage]
+    ) -> str:
+        """
+        Ask SummarizerAgent directly to summarize the debate transcript again, instead of re-running the whole team.
+        Returns an empty string if no valid summary could be produced.
+        """
+        transcript = build_transcript(messages)
+
+        for attempt in range(1, self.summary_repair_attempts + 1):
+            self.repair_stats["repair_calls"] += 1
+            # The summarizer only needs the transcript, not its group chat context
+            await self.summarizer_agent.on_reset(CancellationToken())
+            repair_start = time.monotonic()
+            result = await self.summarizer_agent.run(
+                task=f"Debate transcript:\n\n{transcript}\n\n{SUMMARY_REPAIR_PROMPT}",
+                cancellation_token=self.cancellation_token,
+            )
+            self.__record_turn(
+                symbol, self.summarizer_agent.name, time.monotonic() - repair_start, result.messages
+            )
+            log_turn_usage(symbol, result.messages)
+
+            consensus_section = find_consensus_section(
+                result.messages, self.summarizer_agent.name
+            )
+            if consensus_section is not None:
+                logger.info(f"Repaired {symbol} summary after {attempt} summarizer call(s)")
+                return consensus_section
+
+        logger.error(
+            f"Could not get a valid consensus recommendation for {symbol} "
+            f"after {self.summary_repair_attempts} summarizer call(s)"
+        )
+        return ""
+
+    async def analyze_stock(
+        self,
+        stock_data: Dict[str, Any],
+        moderate: bool = True,
+        time_budget: float | None = None,
+    ) -> Dict[str, Any]:
+        """
+        Conduct a full analysis of a stock using all agents.
+        Pass moderate=False when the consensus section is moderated later together with the rest of the run.
+        With a time_budget (seconds), the summarizer takes over once it is used up; a budget of 0 skips the
+        rebuttal round and summarizes the opening statements.
         """
 
-        retry_prompt = """Your last response either did not include the required format or did not specify a valid recommendation. 
-                    The recommendation MUST be "Buy", "Sell", or "Hold".
-                    
-                    You do not need to redo the debate, but just summarize it again.
+        symbol = stock_data.get("symbol", "Unknown")
+
+        # Compact task under the token budget, since the team re-sends it on every turn
+        task = self.prompt_budget.build_task(stock_data)
 
-                    End your markdown summary with 'TERMINATE' on a new line."""
+        selector_stats_before = self.turn_scheduler.stats()
 
         try:
+            analysis_start = time.monotonic()
+            self.turn_scheduler.wrap_up_at = (
+                analysis_start + time_budget if time_budget is not None else None
+            )
+            self.phase_timings = {}
+            self.repair_stats = {"repair_calls": 0}
+            self.wrapped_up = False
+
+            if self.parallel_openings:
+                # Opening statements run concurrently, then the sequential rebuttal phase continues from them
+                opening_messages = await self.__run_opening_round(symbol, task)
+                self.phase_timings["opening"] = time.monotonic() - analysis_start
+                team_task = [
+                    TextMessage(content=f"{task}\n\n{REBUTTAL_PHASE_NOTE}", source="user"),
+                    *opening_messages,
+                ]
+            else:
+                team_task = task
+
             # Run the SelectorGroupChat and process messages for web search
-            stock_recommendations = await self.stock_recommendation_team.run(task=task)
-
-            full_message = stock_recommendations.messages[-1].content
-
-            # Extract just the consensus section
-            consensus_section = ""
-            retry_count = 0
-            max_retries = 2  # Maximum number of times to retry
-            valid_recommendations = ["buy", "sell", "hold"]
-
-            # Validate the consensus recommendation format
-            while retry_count <= max_retries:
-                # Ensure the "Consensus Recommendation" section is present
-                if "**Consensus Recommendation:**" in full_message:
-                    consensus_parts = full_message.split(
-                        "**Consensus Recommendation:**"
-                    )
-                    if len(consensus_parts) > 1:
-                        consensus_section = (
-                            "**Consensus Recommendation:**" + consensus_parts[1]
-                        )
-                        consensus_section = consensus_section.split("TERMINATE")[
-                            0
-                        ].strip()
-
-                        # Extract just the recommendation word
-                        first_line = consensus_section.split("\n")[0].strip()
-                        recommendation = (
-                            first_line.replace("**Consensus Recommendation:**", "")
-                            .strip()
-                            .lower()
-                        )
-
-                        if recommendation in valid_recommendations:
-                            break  # Valid recommendation found, skip retry
-
-                stock_recommendations = await self.stock_recommendation_team.run(
-                    task=retry_prompt
+            debate_start = time.monotonic()
+            stock_recommendations = await self.__run_debate(symbol, team_task)
+            self.phase_timings["debate"] = time.monotonic() - debate_start
+            log_turn_usage(symbol, stock_recommendations.messages)
+
+            # Extract just the consensus section, repairing the summary without re-running the team if needed
+            consensus_section = find_consensus_section(
+                stock_recommendations.messages, self.summarizer_agent.name
+            )
+            repair_start = time.monotonic()
+            if consensus_section is None:
+                consensus_section = await self.__repair_summary(
+                    symbol, stock_recommendations.messages
+                )
+            self.phase_timings["summary_repair"] = time.monotonic() - repair_start
+
+            selector_stats = self.turn_scheduler.stats()
+            logger.info(
+                f"{symbol} speaker selection: "
+                f"{selector_stats['selector_calls_avoided'] - selector_stats_before['selector_calls_avoided']} "
+                f"LLM selector calls avoided, "
+                f"{selector_stats['selector_calls_delegated'] - selector_stats_before['selector_calls_delegated']} delegated"
+            )
+            if selector_stats["early_terminations"] > selector_stats_before["early_terminations"]:
+                logger.info(
+                    f"{symbol} debate ended early on consensus after {len(stock_recommendations.messages)} messages"
+                )
+            if selector_stats["deadline_wrap_ups"] > selector_stats_before["deadline_wrap_ups"]:
+                self.wrapped_up = True
+                logger.info(
+                    f"{symbol} debate was wrapped up after {len(stock_recommendations.messages)} messages "
+                    f"to stay within its {time_budget:.0f}s budget"
                 )
-                full_message = stock_recommendations.messages[-1].content
-                retry_count += 1
 
             # Verify content safety - this will pause execution until moderation is complete
-            is_safe = await self.__verify_content_safety(consensus_section)
+            if moderate:
+                moderation_start = time.monotonic()
+                moderated = await self.moderation_stage.moderate(
+                    {symbol: consensus_section}
+                )
+                consensus_section = moderated[symbol]
+                self.phase_timings["moderation"] = time.monotonic() - moderation_start
 
-            if not is_safe:
-                consensus_section = "The content generated was flagged as unsafe by the moderation system."
+            self.phase_timings["total"] = time.monotonic() - analysis_start
+            logger.info(
+                f"{symbol} phase timings ({'parallel' if self.parallel_openings else 'serial'} openings): "
+                + ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in self.phase_timings.items())
+                + f", summary repair calls {self.repair_stats['repair_calls']}"
+            )
 
             return consensus_section
 
         except Exception as e:
+            if self.cancellation_token.is_cancelled():
+                logger.warning(f"Analysis of {symbol} was cancelled")
+                return ANALYSIS_ERROR_MESSAGE
             logger.error(f"Error during analysis: {str(e)}", exc_info=True)
-            return "There was an error during analysis."
+            return ANALYSIS_ERROR_MESSAGE
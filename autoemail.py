@@ -1,12 +1,13 @@
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List
 from dotenv import load_dotenv
 import os
-import markdown
 import logging
+from deadline import DEADLINE_MISSED_MESSAGE
+from email_rendering import EmailRenderer
+from smtp_delivery import EmailDeliveryEngine, SMTPConnectionPool
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -38,49 +39,45 @@ class StockRecommendationEmailer:
             raise ValueError("SMTP_PORT not found in environment variables")
         self.smtp_port = int(self.smtp_port)
 
-        recipient_emails = os.getenv("RECIPIENT_EMAILS")
-        if not recipient_emails:
-            raise ValueError("RECIPIENT_EMAILS not found in environment variables")
-        self.recipient_emails = [email.strip() for email in recipient_emails.split(",")]
+        # Recipients of every analysis when send_email is not given per-recipient watchlists
+        recipient_emails = os.getenv("RECIPIENT_EMAILS", "")
+        self.recipient_emails = [
+            email.strip() for email in recipient_emails.split(",") if email.strip()
+        ]
+
+        # Renders each analysis once, however many recipients it goes to
+        self.renderer = EmailRenderer()
 
     def format_email_content(self, stock_analyses: Dict[str, str]) -> str:
         """
         Format multiple stock analyses into one email
         """
-        stock_analyses_html = ""
-        for symbol, analysis in stock_analyses.items():
-            if not symbol:
-                raise ValueError("Stock symbol is empty")
-
-            stock_analyses_html += f"""
-                <div class="stock-analysis" style="margin-bottom: 30px; border-bottom: 1px solid #ccc; padding-bottom: 20px;">
-                    <h2>Analysis for {symbol}</h2>
-                    <div style="margin: 15px 0;">
-                        {markdown.markdown(analysis)}
-                    </div>
-                </div>
-            """
-
-        html_content = f"""
-        <html>
-            <body>
-                <h2>Stock Analysis Report - {datetime.now().strftime('%Y-%m-%d')}</h2>
-                
-                {stock_analyses_html}
-                
-                <p style="color: #666; font-size: 12px; margin-top: 30px;">
-                    This is an automated stock analysis report. Please do your own research before making investment decisions.
-                </p>
-            </body>
-        </html>
-        """
-
-        return html_content
+        return self.renderer.render(stock_analyses)[0]
 
-    def send_email(self, stock_analyses: Dict[str, str]) -> bool:
+    def build_message(self, recipient: str, stock_analyses: Dict[str, str]) -> MIMEMultipart:
+        """
+        Create the email of one recipient, with a plain text alternative to the HTML report
+        """
+        html_content, text_content = self.renderer.render(stock_analyses)
+        msg = MIMEMultipart("alternative")
+        msg["Subject"] = f"Stock Analysis Report - {datetime.now().strftime('%Y-%m-%d')}"
+        msg["From"] = self.sender_email
+        msg["To"] = recipient
+        # Clients show the last alternative they support, so the HTML part goes last
+        msg.attach(MIMEText(text_content, "plain"))
+        msg.attach(MIMEText(html_content, "html"))
+        return msg
+
+    async def send_email(
+        self,
+        stock_analyses: Dict[str, str],
+        recipient_watchlists: Dict[str, List[str]] | None = None,
+    ) -> bool:
         """
-        Send email with multiple stock analyses results.
+        Send every recipient their own email with multiple stock analyses results.
         The stock_analyses dictionary contains stock symbols as keys and their analysis summaries as values.
+        recipient_watchlists maps a recipient to the symbols they follow; without it, every recipient gets
+        every analysis. Returns True when every email was delivered.
         """
         try:
             # Validate input data
@@ -91,38 +88,48 @@ class StockRecommendationEmailer:
                 if not stock_analyses[symbol]:
                     stock_analyses[symbol] = "No analysis available."
 
-            # Create message
-            msg = MIMEMultipart("alternative")
-            msg["Subject"] = (
-                f"Stock Analysis Report - {datetime.now().strftime('%Y-%m-%d')}"
+            if recipient_watchlists is None:
+                if not self.recipient_emails:
+                    raise ValueError("RECIPIENT_EMAILS not found in environment variables")
+                recipient_watchlists = {
+                    recipient: list(stock_analyses) for recipient in self.recipient_emails
+                }
+
+            # Create one message per recipient with the analyses of their symbols
+            messages = {}
+            # Unfinished analyses per recipient, whose reports only count as partial deliveries
+            placeholders = {}
+            for recipient, symbols in recipient_watchlists.items():
+                analyses = {
+                    symbol: stock_analyses[symbol] for symbol in symbols if symbol in stock_analyses
+                }
+                if not analyses:
+                    logger.warning(f"No analyses for the watchlist of {recipient}, skipping")
+                    continue
+                messages[recipient] = self.build_message(recipient, analyses)
+                placeholders[recipient] = sum(
+                    analysis == DEADLINE_MISSED_MESSAGE for analysis in analyses.values()
+                )
+            self.renderer.log_stats()
+
+            engine = EmailDeliveryEngine(
+                SMTPConnectionPool(
+                    self.smtp_server,
+                    self.smtp_port,
+                    self.sender_email,
+                    self.sender_password,
+                )
             )
-            msg["From"] = self.sender_email
-            msg["To"] = ", ".join(self.recipient_emails)
+            try:
+                results = await engine.deliver(messages, placeholders)
+            finally:
+                engine.close()
 
-            # Create HTML content
-            html_content = self.format_email_content(stock_analyses)
-            msg.attach(MIMEText(html_content, "html"))
-
-            # Connect to SMTP server and send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.ehlo()
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
-
-            return True
+            return all(results.values())
 
         except ValueError as ve:
             logger.error(f"Validation error: {str(ve)}")
             return False
-        except smtplib.SMTPAuthenticationError:
-            logger.error(
-                "SMTP Authentication failed. Please check your email and password."
-            )
-            return False
-        except smtplib.SMTPException as se:
-            logger.error(f"SMTP error occurred: {str(se)}")
-            return False
         except Exception as e:
             logger.error(f"Unexpected error sending email: {str(e)}", exc_info=True)
             return False
@@ -0,0 +1,165 @@
+"""
+Compare the original email formatting with the render-once EmailRenderer for many recipients.
+
+* original: f-string += concatenation and a fresh markdown.markdown call per symbol, per recipient (HTML only)
+* renderer: precompiled templates, one reused Markdown converter and sections memoized by analysis hash,
+  producing the HTML and the plain text bodies
+
+Every recipient follows a random (seeded) subset of the symbols, so watchlists overlap as they would for real
+subscribers. Run from the repository root:
+
+    python benchmarks/bench_email_rendering.py --symbols 1000 --recipients 100 --watchlist-size 100
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import markdown
+from email_rendering import EmailRenderer
+
+# Shape of a consensus section produced by the SummarizerAgent
+ANALYSIS_TEMPLATE = """**Recommendation: {recommendation}**
+
+**Key arguments**
+* Revenue for {symbol} grew {growth}% year over year, ahead of the sector median.
+* Margins compressed by {margin} points on higher input costs and a stronger dollar.
+* The stock trades at {pe}x forward earnings, above its five year average of {average_pe}x.
+
+**Risks**
+1. Guidance for the next quarter assumes a recovery in enterprise spending.
+2. Competitors are cutting prices in the core segment.
+
+**Consensus**
+The analysts agreed to *{recommendation}* {symbol}: the growth case is intact, but the valuation already prices
+in most of it. Revisit after the next earnings call on the `{symbol}` investor relations page.
+"""
+
+
+def format_email_content_original(stock_analyses: Dict[str, str]) -> str:
+    """
+    The original StockRecommendationEmailer.format_email_content
+    """
+    stock_analyses_html = ""
+    for symbol, analysis in stock_analyses.items():
+        if not symbol:
+            raise ValueError("Stock symbol is empty")
+
+        stock_analyses_html += f"""
+                <div class="stock-analysis" style="margin-bottom: 30px; border-bottom: 1px solid #ccc; padding-bottom: 20px;">
+                    <h2>Analysis for {symbol}</h2>
+                    <div style="margin: 15px 0;">
+                        {markdown.markdown(analysis)}
+                    </div>
+                </div>
+            """
+
+    html_content = f"""
+        <html>
+            <body>
+                <h2>Stock Analysis Report - {datetime.now().strftime('%Y-%m-%d')}</h2>
+
+                {stock_analyses_html}
+
+                <p style="color: #666; font-size: 12px; margin-top: 30px;">
+                    This is an automated stock analysis report. Please do your own research before making investment decisions.
+                </p>
+            </body>
+        </html>
+        """
+
+    return html_content
+
+
+def synthetic_analyses(count: int) -> Dict[str, str]:
+    """
+    One summarizer-shaped analysis per synthetic symbol
+    """
+    rng = random.Random(0)
+    analyses = {}
+    for index in range(count):
+        symbol = f"SYM{index:04d}"
+        analyses[symbol] = ANALYSIS_TEMPLATE.format(
+            symbol=symbol,
+            recommendation=rng.choice(["Buy", "Sell", "Hold"]),
+            growth=rng.randint(1, 40),
+            margin=rng.randint(1, 5),
+            pe=rng.randint(8, 60),
+            average_pe=rng.randint(8, 40),
+        )
+    return analyses
+
+
+def _measure(
+    make_render: Callable[[], Callable[[Dict[str, str]], object]], watchlists: List[Dict[str, str]]
+) -> Dict[str, float]:
+    """
+    Wall time of rendering every recipient's email, then the peak traced allocation of a second, traced pass
+    (tracemalloc slows allocation-heavy code down, so it is kept out of the timed pass)
+    """
+    render = make_render()
+    started = time.perf_counter()
+    for analyses in watchlists:
+        render(analyses)
+    seconds = time.perf_counter() - started
+
+    render = make_render()
+    tracemalloc.start()
+    for analyses in watchlists:
+        render(analyses)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 1024 / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=1000, help="Analyzed symbols")
+    parser.add_argument("--recipients", type=int, default=100, help="Recipients, each sent their own email")
+    parser.add_argument("--watchlist-size", type=int, default=100, help="Symbols followed by each recipient")
+    args = parser.parse_args()
+
+    # Keep the rendering logs out of the timings
+    logging.disable(logging.CRITICAL)
+
+    analyses = synthetic_analyses(args.symbols)
+    rng = random.Random(1)
+    symbols = list(analyses)
+    watchlists = []
+    for _ in range(args.recipients):
+        chosen = rng.sample(symbols, min(args.watchlist_size, len(symbols)))
+        watchlists.append({symbol: analyses[symbol] for symbol in chosen})
+
+    original_html = format_email_content_original(watchlists[0])
+    rendered_html, _ = EmailRenderer().render(watchlists[0])
+    assert original_html.split() == rendered_html.split(), "original and renderer HTML disagree"
+
+    results = (
+        ("original", _measure(lambda: format_email_content_original, watchlists)),
+        ("renderer", _measure(lambda: EmailRenderer().render, watchlists)),
+    )
+    sections = sum(len(watchlist) for watchlist in watchlists)
+    unique = len({symbol for watchlist in watchlists for symbol in watchlist})
+    print(
+        f"{args.symbols} symbols, {args.recipients} recipients, {args.watchlist_size} symbols per recipient "
+        f"({sections} sections, {unique} unique)"
+    )
+    print(f"{'path':<9} {'time (s)':>9} {'per email (ms)':>15} {'peak alloc (MB)':>16}")
+    for name, result in results:
+        print(
+            f"{name:<9} {result['seconds']:>9.2f} {result['seconds'] / args.recipients * 1000:>15.2f} "
+            f"{result['peak_mb']:>16.1f}"
+        )
+    print(f"speedup: {results[0][1]['seconds'] / results[1][1]['seconds']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
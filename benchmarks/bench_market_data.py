@@ -0,0 +1,214 @@
+"""
+Compare the per-symbol get_stock_data path with the batched BulkMarketDataProvider on a yfinance fixture.
+
+yfinance is replaced by the fixture so both paths see identical data, with a fixed latency added to every simulated
+HTTP request. Run from the repository root:
+
+    python benchmarks/bench_market_data.py --latency 0.25 --repeat 3
+
+The shipped fixture is synthetic ("synthetic": true): its prices and info fields are made up to look like real
+yfinance data. To replace it with live Yahoo Finance data (requires network access):
+
+    python benchmarks/bench_market_data.py --record AAPL MSFT NVDA
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import yfinance as yf
+from web_scraping import get_stock_data
+from market_data import BulkMarketDataProvider
+from price_store import PriceHistoryStore
+from cache import default_cache
+
+FIXTURE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "fixtures", "yfinance_watchlist.json"
+)
+
+
+def load_fixture(path: str = FIXTURE_PATH) -> Dict[str, Any]:
+    """
+    Load the info fields and price history of each symbol in the fixture
+    """
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _history_frame(history: Dict[str, List]) -> pd.DataFrame:
+    """
+    Rebuild a yfinance history frame from its fixture columns
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(history["Date"]), name="Date")
+    # Fixtures written before the price store only kept Close and Volume
+    return pd.DataFrame(
+        {
+            "Open": history.get("Open", history["Close"]),
+            "High": history.get("High", history["Close"]),
+            "Low": history.get("Low", history["Close"]),
+            "Close": history["Close"],
+            "Volume": history["Volume"],
+        },
+        index=index,
+    )
+
+
+@contextmanager
+def fixture_yfinance(fixture: Dict[str, Any], latency: float):
+    """
+    Serve yf.Ticker and yf.download from the fixture, sleeping `latency` seconds per simulated request
+    """
+    symbols = fixture["symbols"]
+
+    class FixtureTicker:
+        def __init__(self, symbol: str):
+            self.symbol = symbol
+
+        @property
+        def info(self) -> Dict[str, Any]:
+            time.sleep(latency)
+            return dict(symbols[self.symbol]["info"])
+
+        def history(self, period: str = "1mo", **kwargs) -> pd.DataFrame:
+            time.sleep(latency)
+            return _history_frame(symbols[self.symbol]["history"])
+
+    def fixture_download(tickers, **kwargs) -> pd.DataFrame:
+        time.sleep(latency)
+        tickers = [tickers] if isinstance(tickers, str) else list(tickers)
+        return pd.concat(
+            {symbol: _history_frame(symbols[symbol]["history"]) for symbol in tickers},
+            axis=1,
+        )
+
+    original_ticker, original_download = yf.Ticker, yf.download
+    yf.Ticker, yf.download = FixtureTicker, fixture_download
+    try:
+        yield
+    finally:
+        yf.Ticker, yf.download = original_ticker, original_download
+
+
+async def per_symbol_path(symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    The original flow: one Ticker.info and one history call per symbol, one symbol at a time
+    """
+    return {symbol: await get_stock_data(symbol) for symbol in symbols}
+
+
+async def bulk_path(
+    symbols: List[str], price_store_dir: str
+) -> Dict[str, Dict[str, Any]]:
+    """
+    One batched history download into the price store plus concurrent info lookups
+    """
+    provider = BulkMarketDataProvider(
+        price_store=PriceHistoryStore(directory=price_store_dir)
+    )
+    try:
+        return await provider.fetch(symbols)
+    finally:
+        provider.close()
+
+
+def _time_path(path, symbols: List[str], repeat: int, *args):
+    """
+    Run a path `repeat` times and return the best wall time and the last result
+    """
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = asyncio.run(path(symbols, *args))
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def record_fixture(symbols: List[str], path: str = FIXTURE_PATH) -> None:
+    """
+    Record live info fields and one month of history for the given symbols
+    """
+    recorded = {
+        "period": "1mo",
+        "recorded_at": time.strftime("%Y-%m-%d"),
+        "symbols": {},
+    }
+    for symbol in symbols:
+        ticker = yf.Ticker(symbol)
+        hist = ticker.history(period="1mo", auto_adjust=False)
+        recorded["symbols"][symbol] = {
+            "info": ticker.info,
+            "history": {
+                "Date": [d.strftime("%Y-%m-%d") for d in hist.index],
+                "Open": [float(v) for v in hist["Open"]],
+                "High": [float(v) for v in hist["High"]],
+                "Low": [float(v) for v in hist["Low"]],
+                "Close": [float(v) for v in hist["Close"]],
+                "Volume": [int(v) for v in hist["Volume"]],
+            },
+        }
+    with open(path, "w") as f:
+        json.dump(recorded, f, indent=1, default=str)
+    print(f"Recorded {len(symbols)} symbols to {path}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.25,
+        help="Simulated seconds per yfinance HTTP request",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path")
+    parser.add_argument(
+        "--record",
+        nargs="+",
+        metavar="SYMBOL",
+        help="Record a new fixture from live data instead of benchmarking",
+    )
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture(args.record)
+        return
+
+    # Repeated runs must measure the fetch paths, not the on-disk cache
+    default_cache.enabled = False
+
+    fixture = load_fixture()
+    symbols = list(fixture["symbols"])
+
+    with fixture_yfinance(fixture, args.latency), tempfile.TemporaryDirectory() as store_dir:
+        per_symbol_time, per_symbol_result = _time_path(
+            per_symbol_path, symbols, args.repeat
+        )
+        # The first run bootstraps the price store, later runs only check for missing bars
+        bulk_time, bulk_result = _time_path(
+            bulk_path, symbols, args.repeat, store_dir
+        )
+
+    # Only the bulk path has the price store history needed for technical indicators
+    for data in bulk_result.values():
+        data.pop("technical_indicators", None)
+
+    if per_symbol_result != bulk_result:
+        raise SystemExit("Bulk provider output does not match the per-symbol path")
+
+    print(f"{len(symbols)} symbols, {args.latency:.2f}s simulated latency per request")
+    print(f"  per-symbol path: {per_symbol_time:.3f}s")
+    print(f"  bulk provider:   {bulk_time:.3f}s")
+    print(f"  speedup:         {per_symbol_time / bulk_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+Benchmark main.analyze_stocks end to end against synthetic fixtures and a fake Ollama server, fully offline.
+
+Every external service is replaced: the Yahoo quote page is served from a synthetic HTML page, yfinance from
+synthetic frames, DuckDuckGo from synthetic results, Ollama by a local HTTP server with scripted agent replies and a
+configurable latency, and SMTP by a local sink (smtp_sink.py). None of the fixtures were captured from the live
+services, so the timings measure this code against look-alike payloads, not real pages or responses. Each watchlist size runs in a fresh process, so peak RSS
+is measured per size. Run from the repository root:
+
+    python benchmarks/bench_pipeline.py --sizes 1 10 100 --llm-latency 0.02
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from email import message_from_bytes, policy
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+FIXTURE_DIR = os.path.join(BENCHMARK_DIR, "fixtures")
+QUOTE_PAGE_FIXTURE = os.path.join(FIXTURE_DIR, "yahoo_quote_page.html")
+SEARCH_FIXTURE = os.path.join(FIXTURE_DIR, "ddg_results.json")
+
+# Stages reported in the per-size breakdown, in pipeline order
+STAGES = (
+    "scrape",
+    "market_data",
+    "web_search",
+    "agent_turn",
+    "debate",
+    "moderation",
+    "send_email",
+)
+
+# Facilitator turns of the scripted debate, indexed by how many times the facilitator already spoke.
+# The analysts agree on Hold, so the debate ends early once the third final stance is in.
+FACILITATOR_SCRIPT = (
+    "Thank you for the opening statements. BuyAgent, how do you respond to the valuation concerns?",
+    "SellAgent, how do you respond to the growth argument?",
+    "HoldAgent, where do you land after hearing both sides?",
+    "BuyAgent, please give your final stance.",
+    "SellAgent, please give your final stance.",
+    "HoldAgent, please give your final stance.",
+    "SummarizerAgent, please summarize the debate.",
+)
+
+ANALYST_ARGUMENTS = {
+    "optimistic": "BuyAgent",
+    "skeptical": "SellAgent",
+    "calm and collected": "HoldAgent",
+}
+
+SCRIPTED_SUMMARY = """**Consensus Recommendation:** Hold
+
+* **Key reason to buy:** Earnings growth and a price target above the current price.
+* **Key reason to sell:** The forward P/E is above the sector average.
+* **Key reason to hold:** The price sits between its 50 and 200 day averages with a neutral RSI.
+
+The analysts agreed to hold, since the growth case is balanced by the valuation risk.
+TERMINATE"""
+
+
+def scripted_reply(model: str, messages: List[Dict[str, Any]]) -> str:
+    """
+    Pick the reply of the agent whose system message opens the conversation
+    """
+    if "guard" in model:
+        return "safe"
+    system = next((m["content"] for m in messages if m.get("role") == "system"), "")
+    last = messages[-1].get("content", "") if messages else ""
+
+    if "debate facilitator" in system:
+        turn = sum(1 for m in messages if m.get("role") == "assistant")
+        return FACILITATOR_SCRIPT[min(turn, len(FACILITATOR_SCRIPT) - 1)]
+    if "summarizer agent" in system:
+        return SCRIPTED_SUMMARY
+    for marker, name in ANALYST_ARGUMENTS.items():
+        if marker in system:
+            if "please give your final stance" in last:
+                return "After weighing the other arguments, holding is the prudent choice.\n\nFinal stance: Hold"
+            return (
+                f"As {name}, I point to the current price relative to the 50 and 200 day averages, the forward P/E "
+                "and the most recent research reports. The technical indicators support my view, and the search "
+                "results on earnings and competitors back it up."
+            )
+    # LLM speaker selection, only reached when the facilitator's message is ambiguous
+    return "DebateFacilitator"
+
+
+class FakeOllamaHandler(BaseHTTPRequestHandler):
+    """
+    Minimal Ollama API: /api/chat (streamed or not) with scripted replies, and /api/generate for model preloads
+    """
+
+    latency = 0.0
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send_json_lines(self, payloads: List[Dict[str, Any]], stream: bool) -> None:
+        body = (
+            "".join(json.dumps(p) + "\n" for p in payloads)
+            if stream
+            else json.dumps(payloads[-1])
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header(
+            "Content-Type", "application/x-ndjson" if stream else "application/json"
+        )
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        created_at = datetime.now(timezone.utc).isoformat()
+        model = request.get("model", "")
+        time.sleep(self.latency)
+
+        if self.path == "/api/generate":
+            self._send_json_lines(
+                [{"model": model, "created_at": created_at, "response": "", "done": True, "done_reason": "load"}],
+                stream=False,
+            )
+            return
+        if self.path != "/api/chat":
+            self.send_error(404)
+            return
+
+        messages = request.get("messages", [])
+        reply = scripted_reply(model, messages)
+        prompt_chars = sum(len(str(m.get("content", ""))) for m in messages)
+        final = {
+            "model": model,
+            "created_at": created_at,
+            "message": {"role": "assistant", "content": reply},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int(self.latency * 1e9),
+            "prompt_eval_count": prompt_chars // 4,
+            "eval_count": len(reply) // 4,
+        }
+        if request.get("stream"):
+            chunk = dict(final, done=False, done_reason=None)
+            final = dict(final, message={"role": "assistant", "content": ""})
+            self._send_json_lines([chunk, final], stream=True)
+        else:
+            self._send_json_lines([final], stream=False)
+
+
+class FakeOllamaServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that stays quiet when a client hangs up, as debates cancelled at the cutoff do
+    """
+
+    def handle_error(self, request, client_address) -> None:
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+
+def start_fake_ollama(latency: float) -> ThreadingHTTPServer:
+    """
+    Serve the fake Ollama API on a free local port from a background thread
+    """
+    handler = type("Handler", (FakeOllamaHandler,), {"latency": latency})
+    server = FakeOllamaServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class FixturePage:
+    """
+    Browser tab serving the synthetic quote page, with a fixed navigation latency
+    """
+
+    def __init__(self, html: str, latency: float):
+        self.html = html
+        self.latency = latency
+        self.url = ""
+
+    async def route(self, url, handler) -> None:
+        pass
+
+    async def goto(self, url: str, **kwargs) -> None:
+        self.url = url
+        await asyncio.sleep(self.latency)
+
+    async def wait_for_selector(self, selector: str, **kwargs) -> None:
+        pass
+
+    async def content(self) -> str:
+        symbol = self.url.rstrip("/").rsplit("/", 1)[-1]
+        return self.html.replace("{SYMBOL}", symbol)
+
+    async def eval_on_selector_all(self, selector: str, expression: str) -> List[Dict[str, Any]]:
+        """
+        Emulate the in-browser report extraction script by reading the report items from the fixture HTML
+        """
+        import lxml.html
+        from web_scraping import _class_xpath
+
+        tree = lxml.html.fromstring(await self.content())
+        items = tree.xpath(
+            '//section[@data-testid="research-report"]'
+            + _class_xpath("div", "listContainer")[1:]
+            + "//section"
+        )
+        results = []
+        for item in items:
+            titles = item.xpath(_class_xpath("h3", "title"))
+            summaries = item.xpath(_class_xpath("p", "summary"))
+            results.append(
+                {
+                    "title": titles[0].text_content() if titles else None,
+                    "summary": summaries[0].text_content() if summaries else None,
+                }
+            )
+        return results
+
+
+class FixtureBrowserPool:
+    """
+    Stand-in for BrowserPool that hands out FixturePage tabs
+    """
+
+    html = ""
+    latency = 0.0
+
+    def __init__(self, *args, **kwargs):
+        self.launches = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    async def __aenter__(self) -> "FixtureBrowserPool":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    @asynccontextmanager
+    async def page(self):
+        yield FixturePage(self.html, self.latency)
+
+
+def watchlist_fixture(size: int) -> Dict[str, Any]:
+    """
+    Scale the yfinance fixture to `size` symbols, reusing its frames under new symbol names
+    """
+    from bench_market_data import load_fixture
+
+    base_fixture = load_fixture()
+    base_symbols = list(base_fixture["symbols"])
+    symbols = {}
+    for index in range(size):
+        base = base_symbols[index % len(base_symbols)]
+        symbol = base if index < len(base_symbols) else f"{base}{index // len(base_symbols)}"
+        symbols[symbol] = base_fixture["symbols"][base]
+    return dict(base_fixture, symbols=symbols)
+
+
+def run_watchlist(size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Child process: analyze a watchlist of `size` symbols end to end and report timings
+    """
+    # Settings are read when the project modules are imported, so the environment is set up first
+    work_dir = os.getcwd()
+    os.environ.update(
+        {
+            "OLLAMA_HOST": args.ollama_host,
+            "CACHE_ENABLED": "false",
+            "PRICE_STORE_DIR": os.path.join(work_dir, "price_history"),
+            "TRANSCRIPT_DIR": os.path.join(work_dir, "transcripts"),
+            "METRICS_DIR": os.path.join(work_dir, "metrics"),
+            "METRICS_ENABLED": "true",
+            "SEARCH_BACKEND": "local",
+            "SEARCH_FIXTURE_FILE": SEARCH_FIXTURE,
+            "HOST_MIN_INTERVAL_SECONDS": str(args.host_interval),
+            "SENDER_EMAIL": "bench@example.com",
+            "SENDER_PASSWORD": "bench",
+            "SMTP_SERVER": "127.0.0.1",
+            "SMTP_STARTTLS": "false",
+            "OUTBOX_DIR": os.path.join(work_dir, "outbox"),
+            # Without --deadline, every symbol is analyzed whatever the time of day
+            "SEND_BY_TIME": (
+                (datetime.now() + timedelta(seconds=args.deadline)).strftime("%H:%M:%S")
+                if args.deadline
+                else ""
+            ),
+            "SEND_RESERVE_SECONDS": "0",
+        }
+    )
+    sys.path[:0] = [REPO_DIR, BENCHMARK_DIR]
+
+    import main
+    import pipeline
+    from agents import ANALYSIS_ERROR_MESSAGE
+    from bench_market_data import fixture_yfinance
+    from smtp_sink import SMTPSink
+    from telemetry import default_telemetry
+
+    with open(QUOTE_PAGE_FIXTURE, "r") as f:
+        FixtureBrowserPool.html = f.read()
+    FixtureBrowserPool.latency = args.page_latency
+    pipeline.BrowserPool = FixtureBrowserPool
+
+    fixture = watchlist_fixture(size)
+    # Every recipient follows the whole watchlist, so each symbol is still analyzed once
+    subscriptions = {
+        f"reader{index}@example.com": list(fixture["symbols"]) for index in range(args.recipients)
+    }
+    with SMTPSink(latency=args.smtp_latency) as sink, fixture_yfinance(fixture, args.yfinance_latency):
+        os.environ["SMTP_PORT"] = str(sink.port)
+        started = time.perf_counter()
+        asyncio.run(main.analyze_stocks(subscriptions))
+        wall_time = time.perf_counter() - started
+
+    # Analyses appear in both the plain text and the HTML part, so failures are counted in the HTML part only
+    email = ""
+    if sink.messages:
+        html_part = message_from_bytes(sink.messages[-1], policy=policy.default).get_body(("html",))
+        email = html_part.get_content() if html_part else ""
+    return {
+        "symbols": size,
+        "wall_seconds": round(wall_time, 3),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "emails_sent": len(sink.messages),
+        "smtp_connections": sink.connections,
+        "failed_analyses": email.count(ANALYSIS_ERROR_MESSAGE),
+        "late_analyses": email.count(pipeline.DEADLINE_MISSED_MESSAGE),
+        "stages": default_telemetry.summary(),
+    }
+
+
+def run_size(size: int, args: argparse.Namespace, ollama_host: str) -> Dict[str, Any]:
+    """
+    Run one watchlist size in a fresh process (so peak RSS is per size), inside a scratch directory
+    """
+    with tempfile.TemporaryDirectory() as work_dir:
+        command = [
+            sys.executable,
+            os.path.abspath(__file__),
+            "--child",
+            str(size),
+            "--ollama-host",
+            ollama_host,
+            "--page-latency",
+            str(args.page_latency),
+            "--yfinance-latency",
+            str(args.yfinance_latency),
+            "--smtp-latency",
+            str(args.smtp_latency),
+            "--recipients",
+            str(args.recipients),
+            "--deadline",
+            str(args.deadline),
+            "--host-interval",
+            str(args.host_interval),
+        ]
+        completed = subprocess.run(
+            command, cwd=work_dir, capture_output=True, text=True, check=False
+        )
+        if completed.returncode != 0:
+            raise RuntimeError(
+                f"Benchmark of {size} symbols failed:\n{completed.stderr[-2000:]}"
+            )
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    """
+    Print wall time and peak RSS per size, then the per-stage breakdown
+    """
+    print(f"{'symbols':>8} {'wall (s)':>10} {'per symbol (s)':>15} {'peak RSS (MB)':>14} {'failed':>7} {'late':>5} {'emails':>7} {'SMTP conns':>11}")
+    for result in results:
+        print(
+            f"{result['symbols']:>8} {result['wall_seconds']:>10.2f} "
+            f"{result['wall_seconds'] / result['symbols']:>15.3f} "
+            f"{result['peak_rss_mb']:>14.1f} {result['failed_analyses']:>7} {result['late_analyses']:>5} "
+            f"{result['emails_sent']:>7} {result['smtp_connections']:>11}"
+        )
+
+    print("\nPer-stage breakdown (span count / summed seconds / p95 seconds; stages overlap, so sums exceed wall time)")
+    print(f"{'stage':>12} " + " ".join(f"{str(r['symbols']) + ' symbols':>24}" for r in results))
+    for stage in STAGES:
+        cells = []
+        for result in results:
+            summary = result["stages"].get(stage)
+            cells.append(
+                f"{summary['count']:>6} / {summary['total_seconds']:>7.2f} / {summary['p95_seconds']:>5.2f}"
+                if summary
+                else f"{'-':>24}"
+            )
+        print(f"{stage:>12} " + " ".join(f"{cell:>24}" for cell in cells))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="Watchlist sizes")
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="Seconds per fake Ollama request")
+    parser.add_argument("--page-latency", type=float, default=0.2, help="Seconds per quote page navigation")
+    parser.add_argument("--yfinance-latency", type=float, default=0.1, help="Seconds per yfinance request")
+    parser.add_argument("--smtp-latency", type=float, default=0.2, help="Seconds per SMTP delivery")
+    parser.add_argument("--recipients", type=int, default=1, help="Recipients, each sent their own email")
+    parser.add_argument(
+        "--deadline",
+        type=float,
+        default=0.0,
+        help="Send-by time in seconds from the start of each run (0 for no deadline)",
+    )
+    parser.add_argument(
+        "--host-interval",
+        type=float,
+        default=0.0,
+        help="Minimum seconds between requests to the same host (HOST_MIN_INTERVAL_SECONDS)",
+    )
+    parser.add_argument("--json", metavar="PATH", help="Also write the results to a JSON file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--ollama-host", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_watchlist(args.child, args)))
+        return
+
+    server = start_fake_ollama(args.llm_latency)
+    ollama_host = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        results = [run_size(size, args, ollama_host) for size in args.sizes]
+    finally:
+        server.shutdown()
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
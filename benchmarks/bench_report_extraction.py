@@ -0,0 +1,190 @@
+"""
+Compare research report extraction paths on the fixture quote pages: extraction time, peak allocations and bytes that leave the browser.
+The shipped page (fixtures/yahoo_quote_page.html) is synthetic, built to mimic the live page's structure.
+
+Each page is loaded into headless Chromium with page.set_content, and the browser paths are timed from the
+loaded page to the list of articles:
+
+* html: page.content() serializes the whole page, then _parse_research_reports (lxml) parses it
+  (REPORT_EXTRACTION=html)
+* evaluate: eval_on_selector_all returns only the report titles and summaries, which
+  _build_research_reports turns into articles (REPORT_EXTRACTION=evaluate)
+
+The parsers are also timed alone on the page HTML, without the browser:
+
+* bs4: the original BeautifulSoup html.parser walk of the whole page (without its 0.1s sleep per report)
+* lxml: _parse_research_reports
+
+Peak allocations are traced with tracemalloc, which only sees Python allocations: neither the C allocations
+of libxml2 (lxml's tree) nor the browser's memory. Without a Playwright Chromium install
+(python -m playwright install chromium), only the parser rows are printed.
+
+Run from the repository root:
+
+    python benchmarks/bench_report_extraction.py --repeat 50
+"""
+
+import argparse
+import asyncio
+import glob
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from playwright.async_api import Error as PlaywrightError, Page, async_playwright
+from web_scraping import (
+    EXTRACT_REPORTS_SCRIPT,
+    RESEARCH_REPORT_ITEMS_SELECTOR,
+    _build_research_reports,
+    _parse_research_reports,
+)
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def parse_with_bs4(content: str) -> List[Dict[str, Any]]:
+    """
+    The original extraction: parse the whole page with BeautifulSoup and walk the report sections
+    """
+    soup = BeautifulSoup(content, "html.parser")
+    section = soup.find("section", {"data-testid": "research-report"})
+    list_container = section.find("div", class_="listContainer") if section else None
+    if not list_container:
+        return []
+    items = []
+    for item_section in list_container.find_all("section"):
+        h3_tag = item_section.find("h3", class_="title")
+        p_tag = item_section.find("p", class_="summary")
+        items.append(
+            {
+                "title": h3_tag.get_text(strip=True) if h3_tag else None,
+                "summary": p_tag.get_text(strip=True) if p_tag else None,
+            }
+        )
+    return _build_research_reports(items)
+
+
+async def extract_html(page: Page) -> List[Dict[str, Any]]:
+    """
+    REPORT_EXTRACTION=html: serialize the whole page out of the browser and parse it with lxml
+    """
+    return _parse_research_reports(await page.content())
+
+
+async def extract_evaluate(page: Page) -> List[Dict[str, Any]]:
+    """
+    REPORT_EXTRACTION=evaluate: extract the report titles and summaries inside the browser
+    """
+    items = await page.eval_on_selector_all(RESEARCH_REPORT_ITEMS_SELECTOR, EXTRACT_REPORTS_SCRIPT)
+    return _build_research_reports(items)
+
+
+async def _payload_bytes(page: Page, name: str) -> int:
+    """
+    Bytes transferred out of the browser by one extraction path
+    """
+    if name == "html":
+        return len((await page.content()).encode("utf-8"))
+    items = await page.eval_on_selector_all(RESEARCH_REPORT_ITEMS_SELECTOR, EXTRACT_REPORTS_SCRIPT)
+    return len(json.dumps(items).encode("utf-8"))
+
+
+def _measure(func: Callable[[Any], Any], argument: Any, repeat: int) -> Dict[str, float]:
+    """
+    Best wall time over `repeat` calls, and the peak traced allocation of one call
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(argument)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func(argument)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_kb": peak / 1024}
+
+
+async def _measure_async(
+    func: Callable[[Page], Awaitable[Any]], page: Page, repeat: int
+) -> Dict[str, float]:
+    """
+    Best wall time over `repeat` awaited calls, and the peak traced allocation of one call
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await func(page)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    await func(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": best, "peak_kb": peak / 1024}
+
+
+def _print_row(page_name: str, name: str, result: Dict[str, float], payload: str, reports: int) -> None:
+    print(
+        f"{page_name:<28} {name:<9} {result['seconds'] * 1000:>10.2f} "
+        f"{result['peak_kb']:>16.0f} {payload:>21} {reports:>8}"
+    )
+
+
+async def run(repeat: int) -> None:
+    """
+    Time the parsers on every fixture page, then the browser paths on the same pages loaded into Chromium
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        with open(path, "r") as f:
+            pages.append((os.path.basename(path), f.read().replace("{SYMBOL}", "AAPL")))
+
+    print(f"{'page':<28} {'path':<9} {'time (ms)':>10} {'peak alloc (KB)':>16} {'browser payload (KB)':>21} {'reports':>8}")
+    for page_name, content in pages:
+        reports = _parse_research_reports(content)
+        assert parse_with_bs4(content) == reports, "bs4 and lxml extraction disagree"
+        for name, func in (("bs4", parse_with_bs4), ("lxml", _parse_research_reports)):
+            _print_row(page_name, name, _measure(func, content, repeat), "-", len(reports))
+
+    async with async_playwright() as playwright:
+        try:
+            browser = await playwright.chromium.launch(headless=True)
+        except PlaywrightError as e:
+            print(f"\nSkipping the browser paths, Chromium could not be launched: {str(e).splitlines()[0]}")
+            return
+
+        try:
+            page = await browser.new_page()
+            for page_name, content in pages:
+                await page.set_content(content, wait_until="domcontentloaded")
+                reports = await extract_html(page)
+                assert await extract_evaluate(page) == reports, "html and evaluate extraction disagree"
+                for name, func in (("html", extract_html), ("evaluate", extract_evaluate)):
+                    result = await _measure_async(func, page, repeat)
+                    payload = f"{await _payload_bytes(page, name) / 1024:.1f}"
+                    _print_row(page_name, name, result, payload, len(reports))
+        finally:
+            await browser.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50, help="Timed runs per path and page")
+    args = parser.parse_args()
+
+    # Keep the extraction logs out of the timings
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Local SMTP sink for exercising the email delivery engine offline.
+
+Speaks enough SMTP for smtplib (EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT, and AUTH when enabled), keeps every
+accepted message in memory, and can answer the first deliveries with a temporary 451 error to exercise retries (or
+a permanent 550 error, which must not be retried).
+It offers no STARTTLS, so point the emailer at it with SMTP_STARTTLS=false. Run it on its own with:
+
+    python benchmarks/smtp_sink.py --port 1025
+"""
+
+import argparse
+import socketserver
+import threading
+import time
+from typing import List
+
+
+class _SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    One SMTP session
+    """
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+        self.wfile.flush()
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b".\r\n", b".\n"):
+                break
+            # Undo dot-stuffing
+            lines.append(line[1:] if line.startswith(b"..") else line)
+        return b"".join(lines)
+
+    def handle(self) -> None:
+        sink: SMTPSink = self.server.sink
+        sink.record_connection()
+        self._reply("220 smtp-sink ready")
+        recipients = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode("utf-8", errors="replace").strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                extensions = ["250-smtp-sink", "250-8BITMIME"]
+                if sink.auth:
+                    extensions.append("250-AUTH PLAIN LOGIN")
+                self._reply("\r\n".join(extensions + ["250 SMTPUTF8"]))
+            elif verb == "HELO":
+                self._reply("250 smtp-sink")
+            elif verb == "AUTH":
+                self._reply("235 Authentication successful")
+            elif verb == "MAIL":
+                recipients = 0
+                self._reply("250 OK")
+            elif verb == "RCPT":
+                recipients += 1
+                self._reply("250 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self._read_data()
+                time.sleep(sink.latency)
+                failure = sink.take_failure()
+                if failure == "permanent":
+                    self._reply("550 Mailbox unavailable")
+                elif failure == "transient":
+                    self._reply("451 Temporary failure, try again later")
+                else:
+                    sink.record_message(data)
+                    self._reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self._reply("250 OK")
+            elif verb == "QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _ThreadingTCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SMTPSink:
+    """
+    Threaded SMTP server on localhost collecting delivered messages
+    """
+
+    def __init__(
+        self,
+        port: int = 0,
+        latency: float = 0.0,
+        transient_failures: int = 0,
+        auth: bool = False,
+        permanent_failures: int = 0,
+    ):
+        self.latency = latency
+        self.transient_failures = transient_failures
+        self.permanent_failures = permanent_failures
+        self.auth = auth
+        self.messages: List[bytes] = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = _ThreadingTCPServer(("127.0.0.1", port), _SMTPSinkHandler)
+        self._server.sink = self
+        self.port = self._server.server_address[1]
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def record_message(self, data: bytes) -> None:
+        with self._lock:
+            self.messages.append(data)
+
+    def take_failure(self) -> str | None:
+        """
+        Whether the current delivery should be answered with a "permanent" or a "transient" failure
+        """
+        with self._lock:
+            if self.permanent_failures > 0:
+                self.permanent_failures -= 1
+                return "permanent"
+            if self.transient_failures > 0:
+                self.transient_failures -= 1
+                return "transient"
+            return None
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "SMTPSink":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=1025, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds per accepted message")
+    args = parser.parse_args()
+
+    with SMTPSink(args.port, latency=args.latency, auth=True) as sink:
+        print(f"SMTP sink listening on 127.0.0.1:{sink.port}, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(5)
+                print(f"{len(sink.messages)} messages over {sink.connections} connections")
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
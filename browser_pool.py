@@ -0,0 +1,179 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+from playwright.async_api import async_playwright, Browser, BrowserContext, Page
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class _BrowserSlot:
+    """
+    One launched browser process together with its context and usage counters.
+    """
+
+    def __init__(self, browser: Browser, context: BrowserContext):
+        self.browser = browser
+        self.context = context
+        self.navigations = 0
+        self.open_pages = 0
+        # A retired slot no longer hands out pages and is closed once its last page is closed
+        self.retired = False
+        # Set before the browser is closed on purpose, so its disconnected event is not taken for a crash
+        self.closing = False
+
+
+class BrowserPool:
+    """
+    Long-lived headless Chromium shared across symbols.
+
+    Pages (tabs) are handed out through page() up to max_pages at a time. The browser is recycled
+    after recycle_after navigations or when it crashes; pages still open on the old browser are
+    allowed to finish before it is closed.
+    """
+
+    def __init__(
+        self,
+        max_pages: int = config.BROWSER_MAX_PAGES,
+        recycle_after: int = config.BROWSER_RECYCLE_AFTER,
+    ):
+        self.max_pages = max_pages
+        self.recycle_after = recycle_after
+        self.launches = 0
+        self._playwright = None
+        self._slot: _BrowserSlot | None = None
+        self._retired_slots: List[_BrowserSlot] = []
+        self._page_semaphore = asyncio.Semaphore(max_pages)
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self) -> "BrowserPool":
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb) -> None:
+        await self.close()
+
+    async def start(self) -> None:
+        """
+        Start Playwright and launch the first browser
+        """
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            if self._slot is None:
+                self._slot = await self._launch()
+
+    async def close(self) -> None:
+        """
+        Close every browser owned by the pool and stop Playwright
+        """
+        async with self._lock:
+            slots = self._retired_slots + ([self._slot] if self._slot else [])
+            self._slot = None
+            self._retired_slots = []
+            for slot in slots:
+                await self._close_slot(slot)
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _launch(self) -> _BrowserSlot:
+        """
+        Launch a new headless browser and register crash handlers
+        """
+        browser = await self._playwright.chromium.launch(headless=True)
+        context = await browser.new_context()
+        slot = _BrowserSlot(browser, context)
+        browser.on("disconnected", lambda _: self._mark_crashed(slot))
+        self.launches += 1
+        logger.info(f"Launched headless browser #{self.launches}")
+        return slot
+
+    def _mark_crashed(self, slot: _BrowserSlot) -> None:
+        """
+        Retire a slot whose browser or page crashed so the next page() call relaunches it
+        """
+        if not slot.retired and not slot.closing:
+            logger.warning("Headless browser crashed or disconnected, recycling it")
+            slot.retired = True
+
+    async def _close_slot(self, slot: _BrowserSlot) -> None:
+        """
+        Close a browser, ignoring errors from browsers that already crashed
+        """
+        slot.closing = True
+        try:
+            await slot.browser.close()
+        except Exception as e:
+            logger.warning(f"Error closing headless browser: {str(e)}")
+
+    async def _acquire_slot(self) -> _BrowserSlot:
+        """
+        Return the active browser slot, recycling it first if it is worn out or crashed
+        """
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+
+            slot = self._slot
+            if slot is not None and (
+                slot.retired or slot.navigations >= self.recycle_after
+            ):
+                logger.info(
+                    f"Recycling headless browser after {slot.navigations} navigations"
+                )
+                slot.retired = True
+                if slot.open_pages == 0:
+                    await self._close_slot(slot)
+                else:
+                    self._retired_slots.append(slot)
+                slot = None
+
+            if slot is None:
+                slot = await self._launch()
+                self._slot = slot
+
+            slot.navigations += 1
+            slot.open_pages += 1
+            return slot
+
+    async def _release_slot(self, slot: _BrowserSlot) -> None:
+        """
+        Release a page from its slot, closing retired browsers once they are idle
+        """
+        async with self._lock:
+            slot.open_pages -= 1
+            if slot.retired and slot.open_pages == 0:
+                if slot in self._retired_slots:
+                    self._retired_slots.remove(slot)
+                if slot is self._slot:
+                    self._slot = None
+                await self._close_slot(slot)
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """
+        Hand out a new tab on the shared browser, closing it when the caller is done
+        """
+        async with self._page_semaphore:
+            slot = await self._acquire_slot()
+            page = None
+            try:
+                page = await slot.context.new_page()
+                page.on("crash", lambda _: self._mark_crashed(slot))
+                yield page
+            except Exception:
+                if not slot.browser.is_connected():
+                    self._mark_crashed(slot)
+                raise
+            finally:
+                if page is not None and not page.is_closed():
+                    try:
+                        await page.close()
+                    except Exception as e:
+                        logger.warning(f"Error closing browser page: {str(e)}")
+                await self._release_slot(slot)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+from functools import wraps
+from typing import Any, Callable, Dict
+import diskcache
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Sentinel returned by TTLCache.get when a key is not cached
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Persistent on-disk cache shared by every data source.
+
+    Entries are keyed by a content hash of the source name and the request arguments, expire after a
+    per-source TTL, and the least recently used entries are evicted once the cache exceeds its size limit.
+    Hit and miss counters are kept per source.
+    """
+
+    def __init__(
+        self,
+        directory: str = config.CACHE_DIR,
+        size_limit_mb: int = config.CACHE_SIZE_LIMIT_MB,
+        ttls: Dict[str, float] | None = None,
+        enabled: bool = config.CACHE_ENABLED,
+    ):
+        self.directory = directory
+        self.size_limit = size_limit_mb * 1024 * 1024
+        self.enabled = enabled
+        self.ttls = ttls or {
+            "market_data": config.CACHE_TTL_MARKET_DATA_SECONDS,
+            "research_reports": config.CACHE_TTL_RESEARCH_REPORTS_SECONDS,
+            "web_search": config.CACHE_TTL_WEB_SEARCH_SECONDS,
+            "moderation": config.CACHE_TTL_MODERATION_SECONDS,
+            "debate_results": config.CACHE_TTL_DEBATE_RESULTS_SECONDS,
+        }
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self._cache: diskcache.Cache | None = None
+
+    @property
+    def store(self) -> diskcache.Cache:
+        """
+        Open the cache directory on first use
+        """
+        if self._cache is None:
+            self._cache = diskcache.Cache(
+                self.directory,
+                size_limit=self.size_limit,
+                eviction_policy="least-recently-used",
+            )
+        return self._cache
+
+    @staticmethod
+    def make_key(source: str, *parts: Any) -> str:
+        """
+        Build a content-hash key from the source name and the request arguments
+        """
+        payload = json.dumps([source, *parts], sort_keys=True, default=str)
+        return f"{source}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+    def _count(self, source: str, outcome: str) -> None:
+        counters = self.counters.setdefault(source, {"hits": 0, "misses": 0})
+        counters[outcome] += 1
+
+    def get(self, source: str, key: str) -> Any:
+        """
+        Return the cached value for a key, or MISSING if it is absent or expired
+        """
+        if not self.enabled:
+            return MISSING
+        try:
+            value = self.store.get(key, default=MISSING)
+        except Exception as e:
+            logger.warning(f"Cache read failed for {source}: {str(e)}")
+            value = MISSING
+        self._count(source, "misses" if value is MISSING else "hits")
+        return value
+
+    def set(self, source: str, key: str, value: Any) -> None:
+        """
+        Store a value using the TTL configured for its source
+        """
+        if not self.enabled:
+            return
+        try:
+            self.store.set(key, value, expire=self.ttls.get(source))
+        except Exception as e:
+            logger.warning(f"Cache write failed for {source}: {str(e)}")
+
+    def cached(
+        self,
+        source: str,
+        key_func: Callable[..., Any] | None = None,
+        should_cache: Callable[[Any], bool] = bool,
+    ) -> Callable:
+        """
+        Decorator that caches the result of an async function.
+        key_func picks the arguments that identify a request, and empty or failed results are not cached by default.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                key_parts = (
+                    key_func(*args, **kwargs) if key_func else [args, kwargs]
+                )
+                key = self.make_key(source, func.__qualname__, key_parts)
+                value = self.get(source, key)
+                if value is not MISSING:
+                    return value
+                value = await func(*args, **kwargs)
+                if should_cache(value):
+                    self.set(source, key, value)
+                return value
+
+            return wrapper
+
+        return decorator
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Export hit and miss counters per source
+        """
+        return {source: dict(counts) for source, counts in self.counters.items()}
+
+    def log_stats(self) -> None:
+        """
+        Log hit and miss counters per source
+        """
+        for source, counts in sorted(self.counters.items()):
+            total = counts["hits"] + counts["misses"]
+            logger.info(
+                f"Cache {source}: {counts['hits']} hits, {counts['misses']} misses "
+                f"({counts['hits'] / total:.0%} hit rate)"
+            )
+
+
+# Shared cache used by the scraper, market data fetches, agent web searches, moderation verdicts and debate results
+default_cache = TTLCache()
@@ -0,0 +1,230 @@
+import os
+from typing import List
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def _get_int(name: str, default: int) -> int:
+    """
+    Read a positive integer setting from the environment
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        parsed = int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer, got {value!r}")
+    if parsed < 1:
+        raise ValueError(f"{name} must be at least 1, got {parsed}")
+    return parsed
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    """
+    Read a true/false setting from the environment
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    if value.strip().lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.strip().lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"{name} must be true or false, got {value!r}")
+
+
+def _get_list(name: str, default: List[str]) -> List[str]:
+    """
+    Read a comma separated list setting from the environment
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return list(default)
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _get_str(name: str, default: str) -> str:
+    """
+    Read a string setting from the environment
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+def _get_float(name: str, default: float) -> float:
+    """
+    Read a non-negative float setting from the environment
+    """
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        parsed = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    if parsed < 0:
+        raise ValueError(f"{name} must not be negative, got {parsed}")
+    return parsed
+
+
+# Watchlist of every user (JSON object of email address -> symbols). Without it, every RECIPIENT_EMAILS address
+# follows the shared watchlist file
+SUBSCRIPTIONS_FILE = _get_str("SUBSCRIPTIONS_FILE", "subscriptions.json")
+WATCHLIST_FILE = _get_str("WATCHLIST_FILE", "watchlist.txt")
+
+# Maximum number of Yahoo Finance pages scraped at the same time
+SCRAPE_CONCURRENCY = _get_int("SCRAPE_CONCURRENCY", 2)
+
+# Maximum number of yfinance requests in flight at the same time
+MARKET_DATA_CONCURRENCY = _get_int("MARKET_DATA_CONCURRENCY", 4)
+
+# Maximum number of analyst debates running at the same time (bounded by the local Ollama server)
+DEBATE_CONCURRENCY = _get_int("DEBATE_CONCURRENCY", 1)
+
+# Minimum number of seconds between two requests sent to the same host
+HOST_MIN_INTERVAL_SECONDS = _get_float("HOST_MIN_INTERVAL_SECONDS", 1.0)
+
+# Maximum number of tabs open at the same time in the shared headless browser
+BROWSER_MAX_PAGES = _get_int("BROWSER_MAX_PAGES", SCRAPE_CONCURRENCY)
+
+# Number of navigations after which the shared headless browser is relaunched
+BROWSER_RECYCLE_AFTER = _get_int("BROWSER_RECYCLE_AFTER", 50)
+
+# Abort images, media, fonts, analytics and ad requests while scraping the quote page
+BLOCK_RESOURCES = _get_bool("BLOCK_RESOURCES", True)
+
+# Hosts that are never blocked by the scrape resource filter
+RESOURCE_ALLOWLIST = _get_list("RESOURCE_ALLOWLIST", [])
+
+# Persistent cache for market data, research reports and web search results
+CACHE_ENABLED = _get_bool("CACHE_ENABLED", True)
+CACHE_DIR = _get_str("CACHE_DIR", ".cache")
+CACHE_SIZE_LIMIT_MB = _get_int("CACHE_SIZE_LIMIT_MB", 256)
+
+# Time to live of cached entries per source
+CACHE_TTL_MARKET_DATA_SECONDS = _get_float("CACHE_TTL_MARKET_DATA_SECONDS", 30 * 60)
+CACHE_TTL_RESEARCH_REPORTS_SECONDS = _get_float(
+    "CACHE_TTL_RESEARCH_REPORTS_SECONDS", 6 * 60 * 60
+)
+CACHE_TTL_WEB_SEARCH_SECONDS = _get_float("CACHE_TTL_WEB_SEARCH_SECONDS", 6 * 60 * 60)
+CACHE_TTL_MODERATION_SECONDS = _get_float(
+    "CACHE_TTL_MODERATION_SECONDS", 7 * 24 * 60 * 60
+)
+# Staleness window of a stored debate result: within it, unchanged inputs reuse the consensus section
+CACHE_TTL_DEBATE_RESULTS_SECONDS = _get_float(
+    "CACHE_TTL_DEBATE_RESULTS_SECONDS", 24 * 60 * 60
+)
+
+# Significant digits kept from each price field in the debate input fingerprint
+DEBATE_FINGERPRINT_SIGNIFICANT_DIGITS = _get_int(
+    "DEBATE_FINGERPRINT_SIGNIFICANT_DIGITS", 3
+)
+
+# Append-only journal of the stages completed for each symbol, replayed when the run is restarted the same day
+JOURNAL_ENABLED = _get_bool("JOURNAL_ENABLED", True)
+JOURNAL_DIR = _get_str("JOURNAL_DIR", "journal")
+
+# Always re-run the debates, ignoring (but still refreshing) stored debate results
+FORCE_REFRESH = _get_bool("FORCE_REFRESH", False)
+
+# Local OHLCV store: new symbols are bootstrapped with this yfinance period, later runs only append missing bars
+PRICE_STORE_DIR = _get_str("PRICE_STORE_DIR", "price_history")
+PRICE_HISTORY_BOOTSTRAP_PERIOD = _get_str("PRICE_HISTORY_BOOTSTRAP_PERIOD", "2y")
+
+# Calendar days of price and volume history passed to the analysts
+PRICE_HISTORY_LOOKBACK_DAYS = _get_int("PRICE_HISTORY_LOOKBACK_DAYS", 31)
+
+# Calendar days of stored history used to compute technical indicators (SMA200 and the 52-week high need a year)
+INDICATOR_LOOKBACK_DAYS = _get_int("INDICATOR_LOOKBACK_DAYS", 400)
+
+# Token limit for the debate task, which the team re-sends on every turn
+PROMPT_TOKEN_BUDGET = _get_int("PROMPT_TOKEN_BUDGET", 1200)
+
+# Run the Buy/Sell/Hold opening statements concurrently before the sequential rebuttal phase
+PARALLEL_OPENINGS = _get_bool("PARALLEL_OPENINGS", True)
+
+# Opening statements sent to Ollama at the same time (the server needs OLLAMA_NUM_PARALLEL of at least this)
+OPENING_PARALLELISM = _get_int("OPENING_PARALLELISM", 3)
+
+# How long Ollama keeps the debator and moderation models loaded after the last request
+OLLAMA_KEEP_ALIVE = _get_str("OLLAMA_KEEP_ALIVE", "30m")
+
+# Direct SummarizerAgent calls made when the debate summary does not contain a valid recommendation
+SUMMARY_REPAIR_ATTEMPTS = _get_int("SUMMARY_REPAIR_ATTEMPTS", 1)
+
+# Consensus sections classified by Llama Guard at the same time
+MODERATION_CONCURRENCY = _get_int("MODERATION_CONCURRENCY", 4)
+
+# Stream the debate and append every turn to a per-symbol JSONL transcript as it happens
+STREAM_TRANSCRIPTS = _get_bool("STREAM_TRANSCRIPTS", True)
+TRANSCRIPT_DIR = _get_str("TRANSCRIPT_DIR", "transcripts")
+
+# Web search: "ddgs" for DuckDuckGo, or "local" for the offline stand-in backend (optionally fed by a JSON fixture)
+SEARCH_BACKEND = _get_str("SEARCH_BACKEND", "ddgs")
+SEARCH_FIXTURE_FILE = _get_str("SEARCH_FIXTURE_FILE", "")
+
+# Threads running web searches, and reusable DuckDuckGo clients shared by them
+SEARCH_CONCURRENCY = _get_int("SEARCH_CONCURRENCY", 4)
+SEARCH_CLIENT_POOL_SIZE = _get_int("SEARCH_CLIENT_POOL_SIZE", 4)
+SEARCH_TIMEOUT_SECONDS = _get_int("SEARCH_TIMEOUT_SECONDS", 10)
+
+# Retries of a rate limited or timed out search, with exponential backoff starting at this many seconds
+SEARCH_MAX_RETRIES = _get_int("SEARCH_MAX_RETRIES", 3)
+SEARCH_BACKOFF_SECONDS = _get_float("SEARCH_BACKOFF_SECONDS", 2.0)
+
+# Web searches issued for every symbol before its debate, in parallel with the scrape ({symbol} is substituted)
+SEARCH_CONTEXT_ENABLED = _get_bool("SEARCH_CONTEXT_ENABLED", True)
+SEARCH_CONTEXT_QUERIES = _get_list(
+    "SEARCH_CONTEXT_QUERIES",
+    ["{symbol} stock earnings", "{symbol} competitors", "{symbol} stock risks", "{symbol} stock news"],
+)
+SEARCH_CONTEXT_RESULTS_PER_QUERY = _get_int("SEARCH_CONTEXT_RESULTS_PER_QUERY", 5)
+
+# Ranked search results passed to the analysts as context
+SEARCH_CONTEXT_MAX_RESULTS = _get_int("SEARCH_CONTEXT_MAX_RESULTS", 6)
+
+# Record stage timings, token counts and bytes, exported per run as a JSON report and a Prometheus textfile
+METRICS_ENABLED = _get_bool("METRICS_ENABLED", True)
+METRICS_DIR = _get_str("METRICS_DIR", "metrics")
+
+# How research reports are read from the rendered quote page: "evaluate" extracts only the report items inside
+# the browser, "html" serializes the whole page and parses it with lxml
+REPORT_EXTRACTION = _get_str("REPORT_EXTRACTION", "evaluate")
+
+# Email delivery: SMTP connections reused for the whole send (also the number of messages sent at the same time),
+# and whether they are upgraded with STARTTLS (disable for a local SMTP sink)
+SMTP_POOL_SIZE = _get_int("SMTP_POOL_SIZE", 2)
+SMTP_STARTTLS = _get_bool("SMTP_STARTTLS", True)
+SMTP_TIMEOUT_SECONDS = _get_float("SMTP_TIMEOUT_SECONDS", 30.0)
+
+# Retries of a message after a dropped connection or a temporary (4xx) SMTP reply, with exponential backoff
+SMTP_MAX_RETRIES = _get_int("SMTP_MAX_RETRIES", 3)
+SMTP_BACKOFF_SECONDS = _get_float("SMTP_BACKOFF_SECONDS", 2.0)
+
+# Persistent outbox: the day's messages are kept until delivered, so a restarted run only sends what is left
+OUTBOX_DIR = _get_str("OUTBOX_DIR", "outbox")
+
+# Send-by time of the morning email (local HH:MM or HH:MM:SS), and the part of it kept for moderation and delivery.
+# Opt-in, so manual and daytime runs analyze everything: send_stock_analysis_email.sh sets it for the scheduled run.
+# Debates still running at the cutoff are dropped and everything else is sent
+SEND_BY_TIME = _get_str("SEND_BY_TIME", "")
+SEND_RESERVE_SECONDS = _get_float("SEND_RESERVE_SECONDS", 180.0)
+# Time the debates cancelled at the cutoff get to abort their model calls, capped by the reserve left
+CANCEL_GRACE_SECONDS = _get_float("CANCEL_GRACE_SECONDS", 10.0)
+
+# Playwright timeouts of the quote page navigation and of the research reports appearing
+PAGE_LOAD_TIMEOUT_SECONDS = _get_float("PAGE_LOAD_TIMEOUT_SECONDS", 60.0)
+REPORTS_LOAD_TIMEOUT_SECONDS = _get_float("REPORTS_LOAD_TIMEOUT_SECONDS", 30.0)
+
+# Per-stage time limits, further capped by the time left before the cutoff
+SCRAPE_TIMEOUT_SECONDS = _get_float("SCRAPE_TIMEOUT_SECONDS", 120.0)
+SEARCH_CONTEXT_TIMEOUT_SECONDS = _get_float("SEARCH_CONTEXT_TIMEOUT_SECONDS", 60.0)
+MODERATION_TIMEOUT_SECONDS = _get_float("MODERATION_TIMEOUT_SECONDS", 120.0)
+
+# Debate time after which the facilitator hands off to the summarizer, shortened to a fair share of the time left
+DEBATE_TIME_BUDGET_SECONDS = _get_float("DEBATE_TIME_BUDGET_SECONDS", 600.0)
@@ -0,0 +1,85 @@
+import re
+from typing import Sequence
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
+
+# Matches "**Consensus Recommendation:** Buy" and its variants: any case, bold or underscores around the label
+# and/or the value, "-" instead of ":", brackets around the value and trailing punctuation.
+# An unfilled "Buy/Sell/Hold" template placeholder is not a recommendation.
+CONSENSUS_PATTERN = re.compile(
+    r"[#*_ \t]*consensus\s+recommendation[*_ \t]*[:\-–—][*_ \t\[]*"
+    r"(?P<recommendation>buy|sell|hold)\b(?!\s*/)[\]*_]*[.!]?",
+    re.IGNORECASE,
+)
+
+# Matches "Final stance: Hold", "**Final Recommendation** - Buy", "my final position is sell" and similar
+FINAL_STANCE_PATTERN = re.compile(
+    r"final\s+(?:stance|recommendation|position|vote)[*_ \t]*(?:[:\-–—]|\bis\b)[*_ \t\[]*"
+    r"(?P<stance>buy|sell|hold)\b(?!\s*/)",
+    re.IGNORECASE,
+)
+
+
+def parse_consensus_section(message: str) -> str | None:
+    """
+    Extract the consensus section from a summary, normalizing the recommendation line to
+    "**Consensus Recommendation:** Buy/Sell/Hold". Returns None if no valid recommendation is found.
+    """
+    match = CONSENSUS_PATTERN.search(message)
+    if match is None:
+        return None
+
+    recommendation = match.group("recommendation").capitalize()
+    rest = message[match.end() :].split("TERMINATE")[0].rstrip()
+    return f"**Consensus Recommendation:** {recommendation}{rest}".strip()
+
+
+def find_consensus_section(
+    messages: Sequence[BaseAgentEvent | BaseChatMessage], summarizer_name: str
+) -> str | None:
+    """
+    Parse the most recent summary in the conversation, preferring the summarizer's own messages
+    """
+    candidates = [m for m in messages if m.source == summarizer_name] + list(messages[-1:])
+    for message in reversed(candidates):
+        content = getattr(message, "content", None)
+        if isinstance(content, str):
+            consensus_section = parse_consensus_section(content)
+            if consensus_section is not None:
+                return consensus_section
+    return None
+
+
+def build_transcript(messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> str:
+    """
+    Render the debate turns as plain text, leaving out the task and tool events
+    """
+    turns = []
+    for message in messages:
+        if not isinstance(message, BaseChatMessage) or message.source == "user":
+            continue
+        turns.append(f"{message.source}: {message.to_text()}")
+    return "\n\n".join(turns)
+
+
+def detect_consensus(
+    messages: Sequence[BaseAgentEvent | BaseChatMessage], analyst_names: Sequence[str]
+) -> str | None:
+    """
+    Return the agreed recommendation once every analyst's latest final stance matches, otherwise None.
+    Each analyst's first message is its opening statement, which already ends with a stance, so only
+    the stances given after the opening round count.
+    """
+    stances = {}
+    spoken = set()
+    for message in messages:
+        if isinstance(message, BaseChatMessage) and message.source in analyst_names:
+            if message.source not in spoken:
+                spoken.add(message.source)
+                continue
+            matches = list(FINAL_STANCE_PATTERN.finditer(message.to_text()))
+            if matches:
+                stances[message.source] = matches[-1].group("stance").lower()
+
+    if len(stances) == len(analyst_names) and len(set(stances.values())) == 1:
+        return next(iter(stances.values())).capitalize()
+    return None
@@ -0,0 +1,100 @@
+import math
+import time
+import logging
+from datetime import datetime, timedelta
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Sent in place of the analysis of a symbol whose debate was still running at the cutoff
+DEADLINE_MISSED_MESSAGE = "The analysis did not finish before the send-by time."
+
+
+class RunDeadline:
+    """
+    Time budget of a run, derived from the send-by time of the morning email.
+
+    The cutoff is the send-by time minus a reserve kept for moderation and delivery. Stages ask for their
+    timeout (their own limit, capped by the time left), and each debate gets a fair share of the time left
+    among the debates still pending. When the debates still pending would not finish before the cutoff at
+    their average pace, the run is behind and the rebuttal rounds are dropped.
+
+    A run started after the cutoff (such as the retry of a failed morning run) has no time left, so it only
+    sends the results journaled earlier. Without a send-by time (the default) there is no deadline.
+    """
+
+    def __init__(
+        self,
+        send_by: str = config.SEND_BY_TIME,
+        reserve_seconds: float = config.SEND_RESERVE_SECONDS,
+        now: datetime | None = None,
+    ):
+        self.cutoff: float | None = None
+        self.send_at: float | None = None
+        if not send_by:
+            return
+
+        now = now or datetime.now()
+        try:
+            hour, minute, *second = (int(part) for part in send_by.split(":"))
+            send_at = now.replace(
+                hour=hour, minute=minute, second=second[0] if second else 0, microsecond=0
+            )
+        except ValueError:
+            raise ValueError(f"SEND_BY_TIME must be HH:MM or HH:MM:SS, got {send_by!r}")
+
+        seconds_left = (send_at - timedelta(seconds=reserve_seconds) - now).total_seconds()
+        self.cutoff = time.monotonic() + max(0.0, seconds_left)
+        self.send_at = time.monotonic() + max(0.0, seconds_left + reserve_seconds)
+        if seconds_left <= 0:
+            logger.warning(
+                f"The cutoff before the {send_by} send-by time has already passed, only results finished "
+                f"earlier are sent (run with --no-deadline or without SEND_BY_TIME to analyze everything)"
+            )
+            return
+        logger.info(f"Run deadline: {seconds_left:.0f}s until the {send_by} send-by time, minus the send reserve")
+
+    @property
+    def enabled(self) -> bool:
+        return self.cutoff is not None
+
+    def remaining(self) -> float:
+        """
+        Seconds left before the cutoff (infinite without a deadline)
+        """
+        if self.cutoff is None:
+            return math.inf
+        return max(0.0, self.cutoff - time.monotonic())
+
+    def reserve_remaining(self) -> float:
+        """
+        Seconds left before the send-by time itself, once the cutoff has passed (infinite without a deadline)
+        """
+        if self.send_at is None:
+            return math.inf
+        return max(0.0, self.send_at - time.monotonic())
+
+    def stage_timeout(self, limit: float) -> float:
+        """
+        Timeout of one stage: its own limit, capped by the time left
+        """
+        return min(limit, self.remaining())
+
+    def debate_budget(self, pending_debates: int, concurrency: int) -> float:
+        """
+        Fair share of the time left for one debate, given the debates still pending
+        """
+        rounds = max(1, math.ceil(pending_debates / concurrency))
+        return self.remaining() / rounds
+
+    def behind(self, pending_debates: int, concurrency: int, average_debate_seconds: float) -> bool:
+        """
+        Whether the pending debates would overrun the cutoff at their average pace
+        """
+        if self.cutoff is None:
+            return False
+        rounds = math.ceil(pending_debates / concurrency)
+        return rounds * average_debate_seconds > self.remaining()
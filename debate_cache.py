@@ -0,0 +1,115 @@
+import hashlib
+import time
+import logging
+from typing import Any, Dict
+from cache import TTLCache, MISSING, default_cache
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Market data fields that make up the fingerprint, rounded so small price moves do not trigger a new debate
+FINGERPRINT_PRICE_FIELDS = (
+    "current_price",
+    "target_price",
+    "fifty_day_average",
+    "two_hundred_day_average",
+    "high_52week",
+    "low_52week",
+    "pe_ratio",
+)
+
+
+def _round_significant(value: Any, digits: int) -> Any:
+    """
+    Round a number to the given significant digits, so the tolerance scales with the price
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return value
+    return float(f"{value:.{digits}g}")
+
+
+class DebateResultCache:
+    """
+    Reuse the consensus section of an earlier debate when a symbol's inputs have not materially changed.
+
+    The fingerprint of a get_market_sentiment output is built from its rounded price fields, the analyst
+    recommendation and a hash of the research report titles. Stored results expire after the
+    "debate_results" TTL, which acts as the staleness window. Inputs without any market data (a failed
+    yfinance fetch) all share one fingerprint, so their debates are never stored or reused.
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache = default_cache,
+        significant_digits: int = config.DEBATE_FINGERPRINT_SIGNIFICANT_DIGITS,
+        force_refresh: bool = config.FORCE_REFRESH,
+    ):
+        self.cache = cache
+        self.significant_digits = significant_digits
+        self.force_refresh = force_refresh
+        self.reused = 0
+
+    def fingerprint(self, market_data: Dict[str, Any]) -> str:
+        """
+        Fingerprint the debate inputs of one symbol
+        """
+        stock_data = market_data.get("stock_data", {})
+        titles = sorted(
+            {
+                " ".join(report.get("title", "").lower().split())
+                for report in market_data.get("research_reports", [])
+            }
+        )
+        parts = [
+            market_data.get("symbol"),
+            {
+                field: _round_significant(stock_data.get(field), self.significant_digits)
+                for field in FINGERPRINT_PRICE_FIELDS
+            },
+            stock_data.get("recommendation"),
+            hashlib.sha256("\n".join(titles).encode("utf-8")).hexdigest(),
+        ]
+        return self.cache.make_key("debate_results", parts)
+
+    @staticmethod
+    def has_market_data(market_data: Dict[str, Any]) -> bool:
+        """
+        Whether any market data field of the fingerprint is known
+        """
+        stock_data = market_data.get("stock_data") or {}
+        return any(
+            stock_data.get(field) is not None for field in (*FINGERPRINT_PRICE_FIELDS, "recommendation")
+        )
+
+    def get(self, market_data: Dict[str, Any]) -> str | None:
+        """
+        Return the stored consensus section for unchanged inputs, or None if the debate has to run
+        """
+        if self.force_refresh or not self.has_market_data(market_data):
+            return None
+        entry = self.cache.get("debate_results", self.fingerprint(market_data))
+        if entry is MISSING:
+            return None
+
+        self.reused += 1
+        logger.info(
+            f"Inputs for {market_data['symbol']} are unchanged, reusing the consensus section "
+            f"from {(time.time() - entry['created_at']) / 60:.0f} minutes ago"
+        )
+        return entry["consensus_section"]
+
+    def set(self, market_data: Dict[str, Any], consensus_section: str) -> None:
+        """
+        Store the consensus section of a completed debate
+        """
+        if not self.has_market_data(market_data):
+            logger.warning(f"No market data for {market_data.get('symbol')}, not storing its debate result")
+            return
+        self.cache.set(
+            "debate_results",
+            self.fingerprint(market_data),
+            {"consensus_section": consensus_section, "created_at": time.time()},
+        )
@@ -0,0 +1,125 @@
+import hashlib
+import html
+import logging
+from datetime import datetime
+from string import Template
+from typing import Dict, List, Tuple
+import markdown
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+DISCLAIMER = (
+    "This is an automated stock analysis report. "
+    "Please do your own research before making investment decisions."
+)
+
+# Templates are parsed once at import, each email only substitutes into them
+HTML_SECTION_TEMPLATE = Template(
+    """
+                <div class="stock-analysis" style="margin-bottom: 30px; border-bottom: 1px solid #ccc; padding-bottom: 20px;">
+                    <h2>Analysis for $symbol</h2>
+                    <div style="margin: 15px 0;">
+                        $analysis
+                    </div>
+                </div>
+            """
+)
+
+HTML_PAGE_TEMPLATE = Template(
+    """
+        <html>
+            <body>
+                <h2>Stock Analysis Report - $date</h2>
+                $sections
+                <p style="color: #666; font-size: 12px; margin-top: 30px;">
+                    $disclaimer
+                </p>
+            </body>
+        </html>
+        """
+)
+
+TEXT_SECTION_TEMPLATE = Template("Analysis for $symbol\n$underline\n\n$analysis\n")
+
+TEXT_PAGE_TEMPLATE = Template("Stock Analysis Report - $date\n\n$sections\n$disclaimer\n")
+
+
+class EmailRenderer:
+    """
+    Render the HTML and plain text bodies of the report emails.
+
+    Each analysis is converted once per run: its HTML and plain text sections are memoized by a hash of the
+    symbol and analysis, so the same analysis going to many recipients is only rendered the first time.
+    A single Markdown converter is reused (and reset) for every conversion.
+    """
+
+    def __init__(self):
+        self._markdown = markdown.Markdown()
+        self._sections: Dict[str, Tuple[str, str]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(symbol: str, analysis: str) -> str:
+        return hashlib.sha256(f"{symbol}\0{analysis}".encode("utf-8")).hexdigest()
+
+    def render_section(self, symbol: str, analysis: str) -> Tuple[str, str]:
+        """
+        HTML and plain text sections of one stock
+        """
+        if not symbol:
+            raise ValueError("Stock symbol is empty")
+
+        key = self._key(symbol, analysis)
+        section = self._sections.get(key)
+        if section is not None:
+            self.hits += 1
+            return section
+
+        self.misses += 1
+        escaped_symbol = html.escape(symbol)
+        section = (
+            HTML_SECTION_TEMPLATE.substitute(
+                symbol=escaped_symbol,
+                analysis=self._markdown.reset().convert(analysis),
+            ),
+            TEXT_SECTION_TEMPLATE.substitute(
+                symbol=symbol,
+                underline="-" * len(f"Analysis for {symbol}"),
+                analysis=analysis.strip(),
+            ),
+        )
+        self._sections[key] = section
+        return section
+
+    def render(self, stock_analyses: Dict[str, str]) -> Tuple[str, str]:
+        """
+        HTML and plain text bodies of one email with multiple stock analyses
+        """
+        html_sections: List[str] = []
+        text_sections: List[str] = []
+        for symbol, analysis in stock_analyses.items():
+            html_section, text_section = self.render_section(symbol, analysis)
+            html_sections.append(html_section)
+            text_sections.append(text_section)
+
+        date = datetime.now().strftime("%Y-%m-%d")
+        return (
+            HTML_PAGE_TEMPLATE.substitute(
+                date=date, sections="".join(html_sections), disclaimer=DISCLAIMER
+            ),
+            TEXT_PAGE_TEMPLATE.substitute(
+                date=date, sections="\n".join(text_sections), disclaimer=DISCLAIMER
+            ),
+        )
+
+    def log_stats(self) -> None:
+        """
+        Log how many sections were rendered and how many were reused
+        """
+        logger.info(
+            f"Email rendering: {self.misses} sections rendered, {self.hits} reused"
+        )
@@ -0,0 +1,156 @@
+import logging
+from typing import Any, Dict
+import numpy as np
+import pandas as pd
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Trading days in a year, used for the 52-week high
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _wilder(frame: pd.DataFrame, period: int) -> pd.DataFrame:
+    """
+    Wilder's smoothing, as used by RSI and ATR
+    """
+    return frame.ewm(alpha=1 / period, adjust=False, min_periods=period).mean()
+
+
+def _latest_indicators(histories: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """
+    Latest value of each indicator for symbols that share the same dates, one row per symbol.
+
+    The frames are aligned into wide date x symbol frames, so each indicator is a single pandas operation
+    across the group. Since every symbol has a bar on every date, no window runs over padded rows.
+    """
+    close = pd.concat({s: h["Close"] for s, h in histories.items()}, axis=1)
+    high = pd.concat({s: h["High"] for s, h in histories.items()}, axis=1)
+    low = pd.concat({s: h["Low"] for s, h in histories.items()}, axis=1)
+    volume = pd.concat(
+        {s: h["Volume"].astype("f8") for s, h in histories.items()}, axis=1
+    )
+
+    # Moving averages
+    sma_20 = close.rolling(20).mean()
+    sma_50 = close.rolling(50).mean()
+    sma_200 = close.rolling(200).mean()
+    ema_12 = close.ewm(span=12, adjust=False, min_periods=12).mean()
+    ema_26 = close.ewm(span=26, adjust=False, min_periods=26).mean()
+
+    # RSI (14)
+    change = close.diff()
+    average_gain = _wilder(change.clip(lower=0), 14)
+    average_loss = _wilder(-change.clip(upper=0), 14)
+    rsi_14 = 100 - 100 / (1 + average_gain / average_loss.replace(0, np.nan))
+    rsi_14 = rsi_14.where(average_loss != 0, 100.0).where(average_gain.notna())
+
+    # MACD (12, 26, 9)
+    macd = ema_12 - ema_26
+    macd_signal = macd.ewm(span=9, adjust=False, min_periods=9).mean()
+
+    # Bollinger bands (20, 2)
+    std_20 = close.rolling(20).std()
+    bollinger_upper = sma_20 + 2 * std_20
+    bollinger_lower = sma_20 - 2 * std_20
+    bollinger_percent_b = (close - bollinger_lower) / (bollinger_upper - bollinger_lower)
+
+    # ATR (14)
+    previous_close = close.shift(1)
+    true_range = np.maximum(
+        high - low,
+        np.maximum((high - previous_close).abs(), (low - previous_close).abs()),
+    )
+    atr_14 = _wilder(true_range, 14)
+
+    # Drawdown from the 52-week high
+    high_52week = high.rolling(TRADING_DAYS_PER_YEAR, min_periods=1).max()
+    drawdown_52week = close / high_52week - 1
+
+    # Volume z-score against the last 20 sessions
+    volume_zscore = (volume - volume.rolling(20).mean()) / volume.rolling(20).std()
+
+    return pd.DataFrame(
+        {
+            "sma_20": sma_20.iloc[-1],
+            "sma_50": sma_50.iloc[-1],
+            "sma_200": sma_200.iloc[-1],
+            "ema_12": ema_12.iloc[-1],
+            "ema_26": ema_26.iloc[-1],
+            "rsi_14": rsi_14.iloc[-1],
+            "macd": macd.iloc[-1],
+            "macd_signal": macd_signal.iloc[-1],
+            "macd_histogram": (macd - macd_signal).iloc[-1],
+            "bollinger_upper": bollinger_upper.iloc[-1],
+            "bollinger_lower": bollinger_lower.iloc[-1],
+            "bollinger_percent_b": bollinger_percent_b.iloc[-1],
+            "atr_14": atr_14.iloc[-1],
+            "drawdown_from_52week_high": drawdown_52week.iloc[-1],
+            "volume_zscore_20": volume_zscore.iloc[-1],
+        }
+    )
+
+
+def compute_indicators(histories: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+    """
+    Compute technical indicators for every symbol, vectorized over the symbols that trade on the same dates.
+
+    Symbols are grouped by their exact date index (stocks on one exchange calendar share one, crypto trades
+    every day, a symbol missing a session gets its own group), so every indicator runs on each symbol's own
+    bars. Returns the latest value of each indicator per symbol, with None where there is not enough history.
+    """
+    histories = {symbol: hist for symbol, hist in histories.items() if not hist.empty}
+    if not histories:
+        return {}
+
+    groups: Dict[tuple, Dict[str, pd.DataFrame]] = {}
+    for symbol, hist in histories.items():
+        groups.setdefault(tuple(hist.index), {})[symbol] = hist
+    latest = pd.concat([_latest_indicators(group) for group in groups.values()]).round(4)
+
+    indicators = {
+        symbol: {
+            name: (None if pd.isna(value) else float(value))
+            for name, value in latest.loc[symbol].items()
+        }
+        for symbol in histories
+    }
+    logger.info(
+        f"Computed technical indicators for {len(indicators)} symbols in {len(groups)} aligned groups"
+    )
+    return indicators
+
+
+def format_indicators(indicators: Dict[str, Any]) -> str:
+    """
+    Render indicators as one compact line for the debate prompt, skipping values that are not available
+    """
+    labels = {
+        "sma_20": "SMA20",
+        "sma_50": "SMA50",
+        "sma_200": "SMA200",
+        "ema_12": "EMA12",
+        "ema_26": "EMA26",
+        "rsi_14": "RSI14",
+        "macd": "MACD",
+        "macd_signal": "MACDsignal",
+        "macd_histogram": "MACDhist",
+        "bollinger_upper": "BBupper",
+        "bollinger_lower": "BBlower",
+        "bollinger_percent_b": "BB%B",
+        "atr_14": "ATR14",
+        "drawdown_from_52week_high": "DrawdownFrom52wHigh",
+        "volume_zscore_20": "VolumeZ20",
+    }
+    parts = []
+    for name, label in labels.items():
+        value = indicators.get(name)
+        if value is None:
+            continue
+        if name == "drawdown_from_52week_high":
+            parts.append(f"{label} {value:.1%}")
+        else:
+            parts.append(f"{label} {value:.2f}")
+    return " | ".join(parts) if parts else "Not enough price history."
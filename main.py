@@ -1,9 +1,14 @@
+import argparse
 import asyncio
-from web_scraping import get_market_sentiment
-from agents import StockAnalysisSystem
+import sys
+from pipeline import StockAnalysisPipeline
 from autoemail import StockRecommendationEmailer
-from typing import List
+from typing import Dict, List
 import logging
+import config
+from deadline import RunDeadline
+from subscriptions import SubscriptionPlanner, load_subscriptions
+from telemetry import default_telemetry
 from logger_config import setup_logging
 
 # Configure logging for all modules
@@ -11,48 +16,74 @@ setup_logging()
 logger = logging.getLogger(__name__)
 
 
-async def analyze_stocks(symbols: List[str]):
+async def analyze_stocks(
+    subscriptions: Dict[str, List[str]],
+    force_refresh: bool = config.FORCE_REFRESH,
+    send_by: str = config.SEND_BY_TIME,
+) -> bool:
     """
-    Main function to analyze stocks and send recommendations
+    Main function to analyze stocks and send recommendations.
+    subscriptions maps each user's email address to their watchlist; every symbol is analyzed once, however
+    many users follow it. Pass force_refresh=True to debate every symbol even if its inputs have not changed
+    since the last run. send_by is the send-by time the run is scheduled against (empty for no deadline).
+    Returns whether every email was sent; completed stages are journaled, so a failed run
+    can simply be started again.
     """
+    default_telemetry.reset()
     try:
-        stock_analysis = {}
+        planner = SubscriptionPlanner(subscriptions)
+        planner.log_plan()
 
-        for symbol in symbols:
-            # Initialize analysis system inside the loop to reset state for each stock
-            analysis_system = StockAnalysisSystem()
-
-            logger.info(f"Starting analysis for {symbol}")
-
-            # Gather market data and news
-            market_data = await get_market_sentiment(symbol)
-            logger.info(f"Completed stock information retrieval")
-
-            # Run agent analysis
-            analysis_summary = await analysis_system.analyze_stock(market_data)
-            logger.info(f"Completed agent analysis for {symbol}")
-
-            stock_analysis[symbol] = analysis_summary
-
-            # Wait between stocks to avoid overwhelming APIs
-            await asyncio.sleep(5)
+        # Collect data for upcoming symbols while earlier symbols are being debated
+        pipeline = StockAnalysisPipeline(
+            force_refresh=force_refresh, deadline=RunDeadline(send_by=send_by)
+        )
+        stock_analysis = await pipeline.run(planner.symbols)
+        planner.log_savings(default_telemetry.summary().get("debate"))
 
         # Initialize components
         emailer = StockRecommendationEmailer()
-        # Send email with results
-        email_success = emailer.send_email(stock_analysis)
+        # Send every user the analyses of their own watchlist
+        email_success = await emailer.send_email(stock_analysis, planner.fan_out(stock_analysis))
         if email_success:
             logger.info("Successfully sent analysis email")
         else:
             logger.error("Failed to send analysis email")
+        return email_success
 
     except Exception as e:
         logger.error(f"Error in stock analysis process: {str(e)}")
+        return False
+
+    finally:
+        # Per-stage timings, tokens and bytes of the run
+        default_telemetry.write_report()
 
 
 if __name__ == "__main__":
-    # List of stock symbols to analyze
-    with open("watchlist.txt", "r") as f:
-        stock_symbols = [line.strip() for line in f if line.strip()]
+    parser = argparse.ArgumentParser(description="Analyze the watchlists and email the recommendations")
+    parser.add_argument(
+        "--force-refresh",
+        action="store_true",
+        default=config.FORCE_REFRESH,
+        help="Re-run every debate instead of reusing results for unchanged inputs",
+    )
+    parser.add_argument(
+        "--no-deadline",
+        action="store_true",
+        help="Analyze every symbol whatever the time, ignoring SEND_BY_TIME",
+    )
+    args = parser.parse_args()
+
+    # Watchlist of every user
+    subscriptions = load_subscriptions()
 
-    asyncio.run(analyze_stocks(stock_symbols))
+    success = asyncio.run(
+        analyze_stocks(
+            subscriptions,
+            force_refresh=args.force_refresh,
+            send_by="" if args.no_deadline else config.SEND_BY_TIME,
+        )
+    )
+    # A non-zero exit lets the cron script run again, resuming from the run journal
+    sys.exit(0 if success else 1)
@@ -0,0 +1,135 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+import pandas as pd
+import yfinance as yf
+from web_scraping import build_stock_data
+from cache import TTLCache, MISSING, default_cache
+from price_store import PriceHistoryStore
+from indicators import compute_indicators
+from telemetry import default_telemetry
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class BulkMarketDataProvider:
+    """
+    Fetch market data for a whole watchlist at once.
+
+    Price history is served from the local PriceHistoryStore, which only downloads the bars missing since the
+    last run in batched yf.download calls, while the per-symbol info lookups run concurrently in a bounded
+    thread pool. The result has the same shape as get_stock_data.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = config.MARKET_DATA_CONCURRENCY,
+        lookback_days: int = config.PRICE_HISTORY_LOOKBACK_DAYS,
+        cache: TTLCache = default_cache,
+        price_store: PriceHistoryStore | None = None,
+    ):
+        self.lookback_days = lookback_days
+        self.cache = cache
+        self.price_store = price_store or PriceHistoryStore()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="yfinance-info"
+        )
+
+    def close(self) -> None:
+        """
+        Shut down the info thread pool
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load_history(
+        self, symbols: List[str]
+    ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Dict[str, Any]]]:
+        """
+        Bring the price store up to date, compute technical indicators over the long window,
+        and read the lookback window passed to the analysts for every symbol
+        """
+        self.price_store.sync(symbols)
+
+        long_histories = {
+            symbol: self.price_store.window(symbol, config.INDICATOR_LOOKBACK_DAYS)
+            for symbol in symbols
+        }
+        indicators = compute_indicators(long_histories)
+
+        histories = {}
+        for symbol, hist in long_histories.items():
+            if hist.empty:
+                logger.warning(f"No price history stored for {symbol}")
+                continue
+            start = hist.index[-1] - pd.Timedelta(days=self.lookback_days - 1)
+            histories[symbol] = hist[hist.index >= start]
+        return histories, indicators
+
+    @staticmethod
+    def _fetch_info(symbol: str) -> Dict[str, Any]:
+        """
+        Blocking info lookup for one symbol, run inside the thread pool
+        """
+        return yf.Ticker(symbol).info
+
+    async def _get_info(self, symbol: str) -> Dict[str, Any] | None:
+        """
+        Look up the info fields for one symbol without blocking the event loop
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, self._fetch_info, symbol)
+        except Exception as e:
+            logger.error(f"Error fetching stock info via yfinance for {symbol}: {str(e)}")
+            return None
+
+    def _cache_key(self, symbol: str) -> str:
+        return self.cache.make_key("market_data", "bulk", self.lookback_days, symbol)
+
+    async def fetch(self, symbols: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch stock data for every symbol, returning an empty dict for symbols that failed.
+        Symbols with a fresh cached entry are served from disk and left out of the batch.
+        """
+        stock_data = {}
+        for symbol in symbols:
+            cached = self.cache.get("market_data", self._cache_key(symbol))
+            if cached is not MISSING:
+                stock_data[symbol] = cached
+
+        missing_symbols = [symbol for symbol in symbols if symbol not in stock_data]
+        if not missing_symbols:
+            return {symbol: stock_data[symbol] for symbol in symbols}
+
+        async def load_history() -> Tuple[Dict, Dict]:
+            try:
+                return await asyncio.to_thread(self._load_history, missing_symbols)
+            except Exception as e:
+                logger.error(f"Error loading batched price history: {str(e)}")
+                return {}, {}
+
+        with default_telemetry.span("market_data", symbols=len(missing_symbols)):
+            (histories, indicators), *infos = await asyncio.gather(
+                load_history(),
+                *(self._get_info(symbol) for symbol in missing_symbols),
+            )
+
+        for symbol, info in zip(missing_symbols, infos):
+            if info is None or symbol not in histories:
+                stock_data[symbol] = {}
+                continue
+            stock_data[symbol] = build_stock_data(symbol, info, histories[symbol])
+            stock_data[symbol]["technical_indicators"] = indicators.get(symbol, {})
+            self.cache.set("market_data", self._cache_key(symbol), stock_data[symbol])
+
+        logger.info(
+            f"Fetched market data for {sum(1 for symbol in missing_symbols if stock_data[symbol])} "
+            f"of {len(missing_symbols)} symbols "
+            f"({len(symbols) - len(missing_symbols)} served from cache)"
+        )
+        return {symbol: stock_data[symbol] for symbol in symbols}
@@ -0,0 +1,112 @@
+import asyncio
+import time
+import logging
+from typing import Dict
+from autogen_core.models import ChatCompletionClient, UserMessage
+from cache import TTLCache, MISSING, default_cache
+from telemetry import default_telemetry
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Ignore S6 unsafe classification since stock advice is inherently risky, decreases false positives
+ALLOWED_VERDICTS = ("safe", "unsafe\nS6")
+
+UNSAFE_CONTENT_MESSAGE = (
+    "The content generated was flagged as unsafe by the moderation system."
+)
+
+
+class ModerationStage:
+    """
+    Classify every consensus section of a run with Llama Guard in one concurrent batch.
+
+    Verdicts are cached by content hash, so identical summaries (within a run or re-sent from an earlier run)
+    are not classified again. Sections that are not allowed are replaced by UNSAFE_CONTENT_MESSAGE.
+    """
+
+    def __init__(
+        self,
+        moderation_client: ChatCompletionClient,
+        concurrency: int = config.MODERATION_CONCURRENCY,
+        cache: TTLCache = default_cache,
+    ):
+        self.moderation_client = moderation_client
+        self.cache = cache
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Latency of every item in the last batch, including cache lookups
+        self.latencies: Dict[str, float] = {}
+
+    async def _classify(self, content: str) -> str:
+        """
+        Ask Llama Guard for a verdict on one piece of content
+        """
+        async with self._semaphore:
+            with default_telemetry.span("moderation", bytes=len(content.encode("utf-8"))) as span:
+                response = await self.moderation_client.create(
+                    [UserMessage(content=content, source="user")]
+                )
+                span.set(
+                    prompt_tokens=response.usage.prompt_tokens,
+                    completion_tokens=response.usage.completion_tokens,
+                )
+        return response.content.strip() if isinstance(response.content, str) else ""
+
+    async def _verdict(self, content: str) -> str:
+        """
+        Return the cached verdict for the content, classifying it on a miss
+        """
+        key = self.cache.make_key("moderation", content)
+        verdict = self.cache.get("moderation", key)
+        if verdict is MISSING:
+            verdict = await self._classify(content)
+            self.cache.set("moderation", key, verdict)
+        return verdict
+
+    async def moderate(self, sections: Dict[str, str]) -> Dict[str, str]:
+        """
+        Moderate the consensus sections of a run, keyed by symbol. Empty sections are passed through unchanged.
+        """
+        self.latencies = {}
+        # Identical sections share one classification
+        pending: Dict[str, asyncio.Task] = {}
+
+        async def moderate_one(symbol: str, content: str) -> str:
+            started = time.monotonic()
+            if content not in pending:
+                pending[content] = asyncio.ensure_future(self._verdict(content))
+            verdict = await pending[content]
+            self.latencies[symbol] = time.monotonic() - started
+            logger.info(
+                f"Moderated {symbol} in {self.latencies[symbol]:.2f}s: {verdict!r}"
+            )
+            if verdict in ALLOWED_VERDICTS:
+                return content
+            logger.warning(f"Consensus section for {symbol} was flagged: {verdict!r}")
+            return UNSAFE_CONTENT_MESSAGE
+
+        symbols = [symbol for symbol, content in sections.items() if content]
+        try:
+            verdicts = await asyncio.gather(
+                *(moderate_one(symbol, sections[symbol]) for symbol in symbols)
+            )
+        except Exception as e:
+            # Never let unmoderated content through
+            logger.error(f"Moderation batch failed: {str(e)}", exc_info=True)
+            return {
+                symbol: UNSAFE_CONTENT_MESSAGE if content else content
+                for symbol, content in sections.items()
+            }
+
+        moderated = dict(sections)
+        moderated.update(zip(symbols, verdicts))
+
+        if self.latencies:
+            logger.info(
+                f"Moderated {len(self.latencies)} sections ({len(pending)} unique) with "
+                f"{max(self.latencies.values()):.2f}s max latency"
+            )
+        return moderated
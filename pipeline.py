@@ -0,0 +1,414 @@
+import asyncio
+import time
+import logging
+from typing import Dict, List, Set
+from web_scraping import (
+    get_yahoo_finance_news,
+    build_market_sentiment,
+    default_resource_filter,
+)
+from agents import (
+    StockAnalysisSystem,
+    create_model_clients,
+    warm_up_models,
+    ANALYSIS_ERROR_MESSAGE,
+)
+from moderation import ModerationStage, UNSAFE_CONTENT_MESSAGE
+from browser_pool import BrowserPool
+from market_data import BulkMarketDataProvider
+from cache import default_cache
+from debate_cache import DebateResultCache
+from search import default_search_service
+from search_context import SearchContextRetriever
+from run_journal import RunJournal
+from deadline import DEADLINE_MISSED_MESSAGE, RunDeadline
+from telemetry import default_telemetry
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Hosts contacted by each data collection stage, used as rate limiter keys
+YAHOO_QUOTE_HOST = "finance.yahoo.com"
+YFINANCE_API_HOST = "query2.finance.yahoo.com"
+
+
+class HostRateLimiter:
+    """
+    Enforce a minimum interval between consecutive requests sent to the same host.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._last_request: Dict[str, float] = {}
+
+    async def acquire(self, host: str) -> None:
+        """
+        Wait until a request to the given host is allowed
+        """
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            last_request = self._last_request.get(host)
+            if last_request is not None:
+                wait_time = self.min_interval - (time.monotonic() - last_request)
+                if wait_time > 0:
+                    await asyncio.sleep(wait_time)
+            self._last_request[host] = time.monotonic()
+
+
+class StockAnalysisPipeline:
+    """
+    Pipelined scheduler that collects data for upcoming symbols while earlier symbols are still being debated.
+    Each stage (scraping, yfinance fetches and LLM debates) has its own concurrency limit.
+
+    Stages are also bounded by the run deadline: each one gets a timeout capped by the time left, and when
+    the debate backlog would overrun it, the rebuttal round is dropped to shorten the debates.
+    At the cutoff, whatever finished is moderated and returned.
+    """
+
+    def __init__(
+        self,
+        scrape_concurrency: int = config.SCRAPE_CONCURRENCY,
+        market_data_concurrency: int = config.MARKET_DATA_CONCURRENCY,
+        debate_concurrency: int = config.DEBATE_CONCURRENCY,
+        rate_limiter: HostRateLimiter | None = None,
+        browser_pool: BrowserPool | None = None,
+        force_refresh: bool = config.FORCE_REFRESH,
+        search_context_enabled: bool = config.SEARCH_CONTEXT_ENABLED,
+        journal: RunJournal | None = None,
+        deadline: RunDeadline | None = None,
+    ):
+        self._scrape_semaphore = asyncio.Semaphore(scrape_concurrency)
+        self._debate_semaphore = asyncio.Semaphore(debate_concurrency)
+        self._debate_concurrency = debate_concurrency
+        self.rate_limiter = rate_limiter or HostRateLimiter(
+            config.HOST_MIN_INTERVAL_SECONDS
+        )
+        # One headless browser is shared by every scrape in the run
+        self.browser_pool = browser_pool or BrowserPool()
+        # Market data for the whole watchlist is fetched in one batch when the run starts
+        self.market_data_provider = BulkMarketDataProvider(
+            max_workers=market_data_concurrency
+        )
+        self._market_data_task: asyncio.Task | None = None
+        # Model clients are shared by every debate, and analysis systems are reset and reused between symbols
+        self.model_clients = create_model_clients()
+        self._idle_analysis_systems: List[StockAnalysisSystem] = []
+        # Systems debating right now, by symbol, so they can be cancelled at the cutoff
+        self._busy_analysis_systems: Dict[str, StockAnalysisSystem] = {}
+        # Consensus sections are moderated together once all debates have finished
+        self.moderation_stage = ModerationStage(self.model_clients[1])
+        self._warm_up_task: asyncio.Task | None = None
+        # Debates whose inputs have not changed since an earlier run reuse its consensus section
+        self.debate_cache = DebateResultCache(force_refresh=force_refresh)
+        # Standard web searches run alongside the scrape and are handed to the analysts as context
+        self.search_context_retriever = (
+            SearchContextRetriever() if search_context_enabled else None
+        )
+        # Stages completed earlier today are skipped, unless every debate is forced to run again
+        self.journal = journal or RunJournal(resume=not force_refresh)
+        # Time budget derived from the send-by time of the email
+        self.deadline = deadline or RunDeadline()
+        self._pending_debates = 0
+        self._debate_durations: List[float] = []
+        self.dropped = {"rebuttals": 0, "unfinished": 0}
+        # Symbols analyzed with missing or failed inputs (an empty scrape, market data or search context) or a
+        # shortened debate, which are neither cached nor journaled so that a later run analyzes them again
+        self._degraded_inputs: Set[str] = set()
+        self._degraded_symbols: Set[str] = set()
+
+    def _behind(self) -> bool:
+        """
+        Whether the debates still pending would overrun the deadline at the measured pace of this run.
+        Until a debate has finished there is no pace to go by, and the fair share budget of each debate
+        is what keeps the run on time.
+        """
+        if not self._debate_durations:
+            return False
+        average = sum(self._debate_durations) / len(self._debate_durations)
+        return self.deadline.behind(self._pending_debates, self._debate_concurrency, average)
+
+    async def _scrape(self, symbol: str) -> List[Dict]:
+        """
+        Scrape research reports while respecting the scrape concurrency limit
+        """
+        articles = self.journal.get(symbol, "scrape")
+        if articles is not None:
+            return articles
+
+        async with self._scrape_semaphore:
+            await self.rate_limiter.acquire(YAHOO_QUOTE_HOST)
+            logger.info(f"Getting Yahoo Finance research reports for {symbol}")
+            try:
+                articles = await asyncio.wait_for(
+                    get_yahoo_finance_news(symbol, self.browser_pool),
+                    timeout=self.deadline.stage_timeout(config.SCRAPE_TIMEOUT_SECONDS),
+                )
+            except asyncio.TimeoutError:
+                logger.warning(f"Scraping the research reports of {symbol} timed out")
+                self._degraded_inputs.add(symbol)
+                return []
+        # An empty result may be a failed scrape, so it is tried again on the next run
+        if articles:
+            self.journal.record(symbol, "scrape", articles)
+        else:
+            self._degraded_inputs.add(symbol)
+        return articles
+
+    async def _fetch_all_market_data(self, symbols: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch yfinance data for the whole watchlist in one batch, leaving out symbols already journaled
+        """
+        all_market_data = {}
+        for symbol in symbols:
+            stock_data = self.journal.get(symbol, "market_data")
+            if stock_data is not None:
+                all_market_data[symbol] = stock_data
+
+        missing_symbols = [symbol for symbol in symbols if symbol not in all_market_data]
+        if missing_symbols:
+            await self.rate_limiter.acquire(YFINANCE_API_HOST)
+            logger.info(f"Getting stock data for {len(missing_symbols)} symbols via yfinance")
+            fetched = await self.market_data_provider.fetch(missing_symbols)
+            for symbol, stock_data in fetched.items():
+                if stock_data:
+                    self.journal.record(symbol, "market_data", stock_data)
+            all_market_data.update(fetched)
+        return all_market_data
+
+    async def _fetch_market_data(self, symbol: str) -> Dict:
+        """
+        Wait for the batched market data and pick out one symbol
+        """
+        all_market_data = await self._market_data_task
+        stock_data = all_market_data.get(symbol) or {}
+        if not stock_data:
+            logger.warning(f"No market data for {symbol}")
+            self._degraded_inputs.add(symbol)
+        return stock_data
+
+    async def _retrieve_search_context(self, symbol: str) -> List[Dict]:
+        """
+        Run the standard web searches for a symbol, if enabled
+        """
+        if self.search_context_retriever is None:
+            return []
+        try:
+            search_context = await asyncio.wait_for(
+                self.search_context_retriever.retrieve(symbol),
+                timeout=self.deadline.stage_timeout(config.SEARCH_CONTEXT_TIMEOUT_SECONDS),
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"The web search context of {symbol} timed out")
+            search_context = []
+        if not search_context:
+            self._degraded_inputs.add(symbol)
+        return search_context
+
+    async def collect(self, symbol: str) -> Dict:
+        """
+        Run the scraping, market data and search context stages for one symbol concurrently
+        """
+        articles, stock_data, search_context = await asyncio.gather(
+            self._scrape(symbol),
+            self._fetch_market_data(symbol),
+            self._retrieve_search_context(symbol),
+        )
+        logger.info(f"Completed stock information retrieval for {symbol}")
+        return build_market_sentiment(symbol, articles, stock_data, search_context)
+
+    async def debate(self, market_data: Dict) -> str:
+        """
+        Run the analyst debate while respecting the debate concurrency limit
+        """
+        symbol = market_data["symbol"]
+        consensus_section = self.debate_cache.get(market_data)
+        if consensus_section is not None:
+            return consensus_section
+
+        async with self._debate_semaphore:
+            if self._warm_up_task is not None:
+                # Make sure the models are loaded before the first debate starts timing its turns
+                await self._warm_up_task
+
+            # At most debate_concurrency systems exist, each reused across symbols
+            if self._idle_analysis_systems:
+                analysis_system = self._idle_analysis_systems.pop()
+            else:
+                analysis_system = StockAnalysisSystem(model_clients=self.model_clients)
+
+            # A fair share of the time left, or only the opening statements when behind schedule
+            if self._behind():
+                logger.warning(f"Behind schedule, skipping the rebuttal round of {symbol}")
+                self.dropped["rebuttals"] += 1
+                time_budget = 0.0
+            else:
+                time_budget = min(
+                    config.DEBATE_TIME_BUDGET_SECONDS,
+                    self.deadline.debate_budget(self._pending_debates, self._debate_concurrency),
+                )
+
+            self._busy_analysis_systems[symbol] = analysis_system
+            try:
+                # Reset team and agent state left over from the previous symbol
+                await analysis_system.reset()
+                logger.info(f"Starting agent analysis for {symbol}")
+                started = time.monotonic()
+                with default_telemetry.span("debate", symbol=symbol, time_budget=round(time_budget, 1)):
+                    analysis_summary = await analysis_system.analyze_stock(
+                        market_data, moderate=False, time_budget=time_budget
+                    )
+                self._debate_durations.append(time.monotonic() - started)
+                logger.info(f"Completed agent analysis for {symbol}")
+                # A debate cut short by the deadline, or run on missing or failed inputs, is sent but not kept
+                if time_budget == 0 or (
+                    analysis_system.wrapped_up and time_budget < config.DEBATE_TIME_BUDGET_SECONDS
+                ):
+                    logger.warning(f"The analysis of {symbol} was shortened to meet the deadline, not keeping it")
+                    self._degraded_symbols.add(symbol)
+                elif symbol in self._degraded_inputs:
+                    logger.warning(f"The analysis of {symbol} ran on incomplete inputs, not keeping it")
+                    self._degraded_symbols.add(symbol)
+                elif analysis_summary and analysis_summary != ANALYSIS_ERROR_MESSAGE:
+                    self.debate_cache.set(market_data, analysis_summary)
+                return analysis_summary
+            finally:
+                del self._busy_analysis_systems[symbol]
+                self._idle_analysis_systems.append(analysis_system)
+
+    async def process_symbol(self, symbol: str) -> str:
+        """
+        Collect data for a symbol and then debate it, unless its debate already finished earlier today
+        """
+        analysis_summary = self.journal.get(symbol, "debate")
+        if analysis_summary is not None:
+            return analysis_summary
+
+        try:
+            market_data = await self.collect(symbol)
+            analysis_summary = await self.debate(market_data)
+            if (
+                analysis_summary
+                and analysis_summary != ANALYSIS_ERROR_MESSAGE
+                and symbol not in self._degraded_symbols
+            ):
+                self.journal.record(symbol, "debate", analysis_summary)
+            return analysis_summary
+        except Exception as e:
+            logger.error(f"Error analyzing {symbol}: {str(e)}", exc_info=True)
+            return ANALYSIS_ERROR_MESSAGE
+        finally:
+            self._pending_debates -= 1
+
+    async def _analyze_before_cutoff(self, symbols: List[str]) -> List[str]:
+        """
+        Analyze every symbol, giving up on the ones still running at the cutoff
+        """
+        tasks = [asyncio.create_task(self.process_symbol(symbol)) for symbol in symbols]
+        if not tasks:
+            return []
+        timeout = self.deadline.remaining() if self.deadline.enabled else None
+        _, unfinished = await asyncio.wait(tasks, timeout=timeout)
+
+        summaries = []
+        for symbol, task in zip(symbols, tasks):
+            if task in unfinished:
+                # Abort the model call in flight, the task alone would wait for the current turn to finish
+                analysis_system = self._busy_analysis_systems.get(symbol)
+                if analysis_system is not None:
+                    analysis_system.cancel()
+                task.cancel()
+                logger.error(f"{symbol} did not finish before the cutoff, sending the other analyses")
+                self.dropped["unfinished"] += 1
+                summaries.append(DEADLINE_MISSED_MESSAGE)
+            else:
+                summaries.append(task.result())
+        if unfinished:
+            # Let the cancelled debates unwind before the browser and model clients are closed under them,
+            # without eating into the time left for moderation and delivery
+            _, still_running = await asyncio.wait(
+                unfinished,
+                timeout=min(config.CANCEL_GRACE_SECONDS, self.deadline.reserve_remaining()),
+            )
+            if still_running:
+                logger.warning(f"{len(still_running)} cancelled analyses did not stop in time, abandoning them")
+        return summaries
+
+    async def run(self, symbols: List[str]) -> Dict[str, str]:
+        """
+        Analyze all symbols, returning the summaries in watchlist order
+        """
+        # Symbols debated earlier today need no market data
+        pending_symbols = [
+            symbol for symbol in symbols if "debate" not in self.journal.completed.get(symbol, {})
+        ]
+        self._pending_debates = len(pending_symbols)
+        self._market_data_task = asyncio.create_task(
+            self._fetch_all_market_data(pending_symbols)
+        )
+        default_search_service.reset()
+        # Load the models into Ollama while the first symbols are being scraped
+        self._warm_up_task = asyncio.create_task(warm_up_models())
+        try:
+            summaries = await self._analyze_before_cutoff(symbols)
+
+            # Moderate every consensus section of the run in one batch, skipping failed analyses
+            # and sections already approved earlier today
+            moderated = {}
+            consensus_sections = {}
+            for symbol, summary in zip(symbols, summaries):
+                if summary in (ANALYSIS_ERROR_MESSAGE, DEADLINE_MISSED_MESSAGE):
+                    continue
+                if self.journal.completed.get(symbol, {}).get("moderation") == summary:
+                    moderated[symbol] = self.journal.get(symbol, "moderation")
+                else:
+                    consensus_sections[symbol] = summary
+            try:
+                newly_moderated = await asyncio.wait_for(
+                    self.moderation_stage.moderate(consensus_sections),
+                    timeout=config.MODERATION_TIMEOUT_SECONDS,
+                )
+            except asyncio.TimeoutError:
+                # Never send unmoderated content
+                logger.error(f"Moderation did not finish in {config.MODERATION_TIMEOUT_SECONDS:.0f}s")
+                newly_moderated = {symbol: UNSAFE_CONTENT_MESSAGE for symbol in consensus_sections}
+            for symbol, content in newly_moderated.items():
+                # Flagged sections (or a failed batch) are moderated again on the next run
+                if content and content == consensus_sections[symbol]:
+                    self.journal.record(symbol, "moderation", content)
+            moderated.update(newly_moderated)
+            summaries = [
+                moderated.get(symbol, summary)
+                for symbol, summary in zip(symbols, summaries)
+            ]
+        finally:
+            # No debate awaits the warm-up when every symbol was resumed or failed before its debate
+            for task in (self._warm_up_task, self._market_data_task):
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(self._warm_up_task, self._market_data_task, return_exceptions=True)
+            await self.browser_pool.close()
+            self.market_data_provider.close()
+            default_search_service.close()
+            for model_client in self.model_clients:
+                await model_client.close()
+
+        default_cache.log_stats()
+        default_search_service.log_stats()
+        if any(self.dropped.values()):
+            logger.warning(
+                "Dropped to meet the deadline: "
+                + ", ".join(f"{count} {work.replace('_', ' ')}" for work, count in self.dropped.items())
+            )
+        if self.journal.resumed:
+            logger.info(f"Resumed {self.journal.resumed} completed stages from the run journal")
+        if self.debate_cache.reused:
+            logger.info(
+                f"Reused {self.debate_cache.reused} of {len(symbols)} debate results with unchanged inputs"
+            )
+
+        default_resource_filter.log_stats()
+        return dict(zip(symbols, summaries))
@@ -0,0 +1,206 @@
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List
+from zoneinfo import ZoneInfo
+import numpy as np
+import pandas as pd
+import yfinance as yf
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# One fixed-size record per daily bar, so files can be appended to and memory-mapped directly
+OHLCV_DTYPE = np.dtype(
+    [
+        ("date", "datetime64[D]"),
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("volume", "i8"),
+    ]
+)
+
+# Bars are only stored once the session has closed, so the append-only files never hold a partial bar
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+
+
+class PriceHistoryStore:
+    """
+    Local columnar store of daily OHLCV bars, one append-only binary file per symbol.
+
+    sync() downloads only the bars missing since the last run (bootstrapping new symbols with a longer period),
+    and window() serves any lookback from the memory-mapped files without network access.
+    Prices are adjusted for splits but not for dividends (Yahoo's Close rather than Adj Close), so bars already
+    on disk never change when dividends are paid. A split rescales every earlier bar, so when one shows up in
+    the newly downloaded bars, the symbol's file is dropped and its history bootstrapped again.
+    """
+
+    def __init__(
+        self,
+        directory: str = config.PRICE_STORE_DIR,
+        bootstrap_period: str = config.PRICE_HISTORY_BOOTSTRAP_PERIOD,
+    ):
+        self.directory = directory
+        self.bootstrap_period = bootstrap_period
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.directory, f"{symbol.upper()}.ohlcv")
+
+    def load(self, symbol: str) -> np.ndarray:
+        """
+        Memory-map every stored bar for a symbol, oldest first
+        """
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        # Ignore a trailing partial record left behind by an interrupted write
+        count = os.path.getsize(path) // OHLCV_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        return np.memmap(path, dtype=OHLCV_DTYPE, mode="r", shape=(count,))
+
+    def last_date(self, symbol: str) -> np.datetime64 | None:
+        """
+        Date of the most recent stored bar, or None if the symbol has no history yet
+        """
+        bars = self.load(symbol)
+        return bars["date"][-1] if len(bars) else None
+
+    def append(self, symbol: str, hist: pd.DataFrame) -> int:
+        """
+        Append completed bars newer than the last stored bar, returning how many were added
+        """
+        if hist.empty:
+            return 0
+
+        hist = hist.dropna(subset=["Close"])
+        dates = hist.index.tz_localize(None) if hist.index.tz else hist.index
+        dates = dates.values.astype("datetime64[D]")
+
+        today = np.datetime64(datetime.now(MARKET_TIMEZONE).date(), "D")
+        keep = dates < today
+        last_date = self.last_date(symbol)
+        if last_date is not None:
+            keep &= dates > last_date
+        if not keep.any():
+            return 0
+
+        bars = np.empty(int(keep.sum()), dtype=OHLCV_DTYPE)
+        bars["date"] = dates[keep]
+        bars["open"] = hist["Open"].to_numpy(dtype="f8")[keep]
+        bars["high"] = hist["High"].to_numpy(dtype="f8")[keep]
+        bars["low"] = hist["Low"].to_numpy(dtype="f8")[keep]
+        bars["close"] = hist["Close"].to_numpy(dtype="f8")[keep]
+        bars["volume"] = hist["Volume"].fillna(0).to_numpy(dtype="i8")[keep]
+
+        with open(self._path(symbol), "ab") as f:
+            f.write(bars.tobytes())
+        return len(bars)
+
+    def window(self, symbol: str, lookback_days: int | None = None) -> pd.DataFrame:
+        """
+        Serve stored bars from the last `lookback_days` calendar days (all bars when None) as a history frame
+        """
+        bars = self.load(symbol)
+        if lookback_days is not None and len(bars):
+            start = bars["date"][-1] - np.timedelta64(lookback_days - 1, "D")
+            bars = bars[np.searchsorted(bars["date"], start) :]
+
+        return pd.DataFrame(
+            {
+                "Open": np.asarray(bars["open"]),
+                "High": np.asarray(bars["high"]),
+                "Low": np.asarray(bars["low"]),
+                "Close": np.asarray(bars["close"]),
+                "Volume": np.asarray(bars["volume"]),
+            },
+            index=pd.DatetimeIndex(np.asarray(bars["date"]), name="Date"),
+        )
+
+    def _download(self, symbols: List[str], **kwargs) -> Dict[str, pd.DataFrame]:
+        """
+        Download bars for several symbols in one batched request and split them per symbol
+        """
+        frame = yf.download(
+            symbols,
+            group_by="ticker",
+            auto_adjust=False,
+            actions=True,
+            threads=True,
+            progress=False,
+            **kwargs,
+        )
+
+        histories = {}
+        for symbol in symbols:
+            if isinstance(frame.columns, pd.MultiIndex):
+                if symbol not in frame.columns.get_level_values(0):
+                    logger.warning(f"No price history returned for {symbol}")
+                    continue
+                histories[symbol] = frame[symbol]
+            else:
+                # Older yfinance versions return flat columns for a single symbol
+                histories[symbol] = frame
+        return histories
+
+    @staticmethod
+    def _has_split(hist: pd.DataFrame) -> bool:
+        """
+        Whether a downloaded history includes a stock split
+        """
+        if "Stock Splits" not in hist.columns:
+            return False
+        return bool((hist["Stock Splits"].fillna(0) != 0).any())
+
+    def sync(self, symbols: List[str]) -> Dict[str, int]:
+        """
+        Fetch and append the bars each symbol is missing, batching symbols that need the same start date
+        """
+        today = np.datetime64(datetime.now(MARKET_TIMEZONE).date(), "D")
+        # The last completed session is the previous weekday (Friday on a Saturday, Sunday or Monday)
+        last_session = np.busday_offset(today, -1, roll="forward")
+
+        groups: Dict[np.datetime64 | None, List[str]] = {}
+        for symbol in symbols:
+            bars = self.load(symbol)
+            last_date = bars["date"][-1] if len(bars) else None
+            # Symbols with weekend bars (crypto) trade every day
+            trades_daily = len(bars) > 0 and not np.is_busday(bars["date"][-7:]).all()
+            if last_date is not None and last_date >= (today - 1 if trades_daily else last_session):
+                # Already up to date, no network access needed
+                continue
+            groups.setdefault(last_date, []).append(symbol)
+
+        appended = {symbol: 0 for symbol in symbols}
+        split_symbols = []
+        for last_date, group in groups.items():
+            if last_date is None:
+                histories = self._download(group, period=self.bootstrap_period)
+            else:
+                start = pd.Timestamp(last_date) + timedelta(days=1)
+                histories = self._download(group, start=start.strftime("%Y-%m-%d"))
+
+            for symbol, hist in histories.items():
+                if last_date is not None and self._has_split(hist):
+                    # The stored bars are on the pre-split scale
+                    logger.info(f"{symbol} split since {last_date}, downloading its price history again")
+                    os.remove(self._path(symbol))
+                    split_symbols.append(symbol)
+                    continue
+                appended[symbol] = self.append(symbol, hist)
+
+        if split_symbols:
+            for symbol, hist in self._download(split_symbols, period=self.bootstrap_period).items():
+                appended[symbol] = self.append(symbol, hist)
+
+        logger.info(
+            f"Price history store appended {sum(appended.values())} bars for "
+            f"{sum(1 for count in appended.values() if count)} of {len(symbols)} symbols"
+        )
+        return appended
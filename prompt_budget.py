@@ -0,0 +1,265 @@
+import json
+import logging
+from typing import Any, Dict, List, Sequence
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
+from indicators import format_indicators
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Market data fields rendered on the single key=value line, in this order
+MARKET_DATA_FIELDS = (
+    "current_price",
+    "target_price",
+    "recommendation",
+    "pe_ratio",
+    "market_cap",
+    "dividend_yield",
+    "sector",
+    "fifty_day_average",
+    "two_hundred_day_average",
+    "high_52week",
+    "low_52week",
+)
+
+TASK_INSTRUCTIONS = """Each agent should provide their perspective on whether to buy, sell, or hold this stock.
+Consider all available information and justify your recommendations.
+When you give your final stance, state it on its own line as "Final stance: Buy", "Final stance: Sell" or "Final stance: Hold"."""
+
+
+def _load_encoding():
+    """
+    Load the tiktoken encoding, returning None when it cannot be loaded (e.g. offline without a cached encoding)
+    """
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens from length: {str(e)}")
+        return None
+
+
+def _format_number(value: Any) -> str:
+    """
+    Format numbers compactly for the prompt (large values with K/M/B/T suffixes)
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return str(value)
+    for threshold, suffix in ((1e12, "T"), (1e9, "B"), (1e6, "M"), (1e3, "K")):
+        if abs(value) >= threshold:
+            return f"{value / threshold:.2f}{suffix}"
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def _downsample(dates: List[str], points: int) -> List[str]:
+    """
+    Pick `points` evenly spaced dates, always keeping the most recent one
+    """
+    if len(dates) <= points:
+        return dates
+    step = (len(dates) - 1) / (points - 1)
+    return [dates[round(i * step)] for i in range(points)]
+
+
+class PromptBudget:
+    """
+    Build the debate task in a compact table format that fits under a token limit.
+
+    Research reports are deduplicated by title and their summaries truncated, and the daily price and volume
+    history is downsampled. When the prompt is still over budget, history points, report and search result
+    counts and summary length are reduced step by step until it fits.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = config.PROMPT_TOKEN_BUDGET,
+        history_points: int = 12,
+        max_reports: int = 8,
+        max_search_results: int = config.SEARCH_CONTEXT_MAX_RESULTS,
+        summary_chars: int = 280,
+    ):
+        self.max_tokens = max_tokens
+        self.history_points = history_points
+        self.max_reports = max_reports
+        self.max_search_results = max_search_results
+        self.summary_chars = summary_chars
+        self._encoding = _load_encoding()
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Count tokens with tiktoken, or estimate roughly 4 characters per token without it
+        """
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return (len(text) + 3) // 4
+
+    @staticmethod
+    def _truncate(text: str, chars: int) -> str:
+        """
+        Cut text at a word boundary
+        """
+        if len(text) > chars:
+            return text[:chars].rsplit(" ", 1)[0] + "..."
+        return text
+
+    @staticmethod
+    def _dedupe_reports(reports: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Drop reports whose normalized title was already seen
+        """
+        seen = set()
+        unique = []
+        for report in reports:
+            key = " ".join(report.get("title", "").lower().split())
+            if key and key not in seen:
+                seen.add(key)
+                unique.append(report)
+        return unique
+
+    def _render(
+        self,
+        stock_data: Dict[str, Any],
+        reports: List[Dict[str, Any]],
+        history_points: int,
+        report_count: int,
+        search_result_count: int,
+        summary_chars: int,
+    ) -> str:
+        """
+        Render the task with the given reduction settings
+        """
+        market_data = stock_data.get("stock_data", {})
+        lines = [
+            "Please analyze this stock based on the following data:",
+            "",
+            f"Symbol: {market_data.get('symbol', stock_data.get('symbol', 'Unknown'))}",
+            "",
+            "Market Data: "
+            + "; ".join(
+                f"{field}={_format_number(market_data[field])}"
+                for field in MARKET_DATA_FIELDS
+                if market_data.get(field) is not None
+            ),
+        ]
+
+        technical_indicators = market_data.get("technical_indicators")
+        if technical_indicators:
+            lines.append(
+                "Technical Indicators (precomputed from daily bars, use these instead of recomputing them): "
+                + format_indicators(technical_indicators)
+            )
+
+        price_history = market_data.get("price_history", {})
+        volume_history = market_data.get("volume_history", {})
+        if price_history and history_points > 0:
+            dates = _downsample(sorted(price_history), history_points)
+            lines += [
+                "",
+                f"Price History ({len(dates)} of {len(price_history)} sessions, date | close | volume):",
+            ]
+            lines += [
+                f"{date} | {price_history[date]:.2f} | {_format_number(volume_history.get(date, 0))}"
+                for date in dates
+            ]
+
+        if reports and report_count > 0:
+            lines += ["", "Recent Research Reports:"]
+            for index, report in enumerate(reports[:report_count], start=1):
+                summary = report.get("content", "").removeprefix("Summary: ").strip()
+                lines.append(f"{index}. {report['title']}: {self._truncate(summary, summary_chars)}")
+
+        search_context = stock_data.get("search_context", [])
+        if search_context and search_result_count > 0:
+            lines += ["", "Web Search Results (cite the link when you use one):"]
+            for index, result in enumerate(search_context[:search_result_count], start=1):
+                snippet = self._truncate(result.get("snippet", "").strip(), summary_chars)
+                lines.append(f"{index}. {result['title']} ({result['link']}): {snippet}")
+
+        lines += ["", TASK_INSTRUCTIONS]
+        return "\n".join(lines)
+
+    def build_task(self, stock_data: Dict[str, Any]) -> str:
+        """
+        Build the debate task for a symbol under the token budget, logging the tokens saved
+        """
+        reports = self._dedupe_reports(stock_data.get("research_reports", []))
+
+        history_points = self.history_points
+        report_count = min(self.max_reports, len(reports))
+        search_result_count = min(
+            self.max_search_results, len(stock_data.get("search_context", []))
+        )
+        summary_chars = self.summary_chars
+        while True:
+            task = self._render(
+                stock_data,
+                reports,
+                history_points,
+                report_count,
+                search_result_count,
+                summary_chars,
+            )
+            tokens = self.count_tokens(task)
+            if tokens <= self.max_tokens:
+                break
+            # Shrink the least valuable content first
+            if summary_chars > 80:
+                summary_chars //= 2
+            elif history_points > 4:
+                history_points //= 2
+            elif search_result_count > 3:
+                search_result_count -= 1
+            elif report_count > 3:
+                report_count -= 1
+            elif history_points > 0:
+                history_points = 0
+            elif search_result_count > 0:
+                search_result_count -= 1
+            elif report_count > 0:
+                report_count -= 1
+            else:
+                logger.warning(
+                    f"Prompt is {tokens} tokens, over the {self.max_tokens} token budget after all reductions"
+                )
+                break
+
+        # The original pretty-printed payload, for comparison
+        original_tokens = self.count_tokens(
+            json.dumps(stock_data.get("research_reports", []), indent=2)
+            + json.dumps(stock_data.get("stock_data", {}), indent=2)
+            + json.dumps(stock_data.get("search_context", []), indent=2)
+        )
+        logger.info(
+            f"Prompt for {stock_data.get('symbol', 'Unknown')}: {tokens} tokens "
+            f"(pretty-printed payload was {original_tokens} tokens)"
+        )
+        return task
+
+
+def log_turn_usage(
+    symbol: str, messages: Sequence[BaseAgentEvent | BaseChatMessage]
+) -> Dict[str, Dict[str, int]]:
+    """
+    Log prompt (in) and completion (out) tokens for every agent turn and return totals per agent
+    """
+    totals: Dict[str, Dict[str, int]] = {}
+    for turn, message in enumerate(messages):
+        usage = getattr(message, "models_usage", None)
+        if usage is None:
+            continue
+        logger.info(
+            f"{symbol} turn {turn} ({message.source}): "
+            f"{usage.prompt_tokens} tokens in, {usage.completion_tokens} tokens out"
+        )
+        agent_totals = totals.setdefault(message.source, {"in": 0, "out": 0})
+        agent_totals["in"] += usage.prompt_tokens
+        agent_totals["out"] += usage.completion_tokens
+
+    total_in = sum(agent["in"] for agent in totals.values())
+    total_out = sum(agent["out"] for agent in totals.values())
+    logger.info(f"{symbol} debate used {total_in} tokens in, {total_out} tokens out")
+    return totals
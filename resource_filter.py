@@ -0,0 +1,160 @@
+import re
+import logging
+from typing import Dict, Iterable, List
+from urllib.parse import urlparse
+from playwright.async_api import Page, Route
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Resource types that are never needed to read the research reports DOM
+BLOCKED_RESOURCE_TYPES = ("image", "media", "font")
+
+# Analytics, tracking and advertising domains loaded by the quote page
+BLOCKED_DOMAINS = (
+    "doubleclick.net",
+    "googlesyndication.com",
+    "googletagservices.com",
+    "googletagmanager.com",
+    "google-analytics.com",
+    "adservice.google.com",
+    "amazon-adsystem.com",
+    "adnxs.com",
+    "criteo.com",
+    "criteo.net",
+    "taboola.com",
+    "outbrain.com",
+    "moatads.com",
+    "scorecardresearch.com",
+    "chartbeat.com",
+    "chartbeat.net",
+    "quantserve.com",
+    "facebook.net",
+    "pubmatic.com",
+    "rubiconproject.com",
+    "casalemedia.com",
+    "ads.yahoo.com",
+    "analytics.yahoo.com",
+    "geo.yahoo.com",
+    "udc.yahoo.com",
+)
+
+# File extensions requested for each blocked resource type. The route only intercepts URLs with these
+# extensions or on a blocked domain, so every other request is served without a round trip to the filter
+RESOURCE_TYPE_EXTENSIONS = {
+    "image": ("png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico", "bmp"),
+    "media": ("mp4", "webm", "m3u8", "mp3", "m4a", "ogg", "wav"),
+    "font": ("woff", "woff2", "ttf", "otf", "eot"),
+}
+
+
+def _matches_domain(host: str, domains: Iterable[str]) -> bool:
+    """
+    Check whether a host is one of the domains or a subdomain of one of them
+    """
+    return any(host == domain or host.endswith("." + domain) for domain in domains)
+
+
+class ResourceFilter:
+    """
+    Playwright routing filter that aborts images, media, fonts, analytics and ad requests during a scrape.
+
+    Only requests that may be blocked (a URL with a blocked resource type's file extension, or on a blocked
+    domain) are routed through the filter. Hosts on the allowlist are never blocked. Aborted requests never
+    report their size, so only the number of blocked requests and the scrape durations are logged.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = config.BLOCK_RESOURCES,
+        allowlist: List[str] = config.RESOURCE_ALLOWLIST,
+        blocked_resource_types: Iterable[str] = BLOCKED_RESOURCE_TYPES,
+        blocked_domains: Iterable[str] = BLOCKED_DOMAINS,
+    ):
+        self.enabled = enabled
+        self.allowlist = tuple(allowlist)
+        self.blocked_resource_types = frozenset(blocked_resource_types)
+        self.blocked_domains = tuple(blocked_domains)
+        self.route_pattern = self._route_pattern()
+        self.totals = {"scrapes": 0, "blocked_requests": 0, "seconds": 0.0}
+
+    def _route_pattern(self) -> re.Pattern:
+        """
+        URLs the filter is attached to. Playwright matches the pattern in the browser driver, so it must also
+        be a valid JavaScript regular expression.
+        """
+        extensions = sorted(
+            {
+                extension
+                for resource_type in self.blocked_resource_types
+                for extension in RESOURCE_TYPE_EXTENSIONS.get(resource_type, ())
+            }
+        )
+        alternatives = []
+        if self.blocked_domains:
+            domains = "|".join(domain.replace(".", r"\.") for domain in self.blocked_domains)
+            alternatives.append(rf"^[a-z]+://([^/?#@]*\.)?({domains})(:\d+)?([/?#]|$)")
+        if extensions:
+            alternatives.append(rf"\.({'|'.join(extensions)})([?#]|$)")
+        # Matches nothing when there is nothing to block
+        return re.compile("|".join(alternatives) or "$^", re.IGNORECASE)
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        """
+        Decide whether a request can be aborted without affecting the research reports
+        """
+        host = urlparse(url).hostname or ""
+        if _matches_domain(host, self.allowlist):
+            return False
+        if resource_type in self.blocked_resource_types:
+            return True
+        return _matches_domain(host, self.blocked_domains)
+
+    async def attach(self, page: Page) -> Dict[str, int]:
+        """
+        Install the routing filter on a page and return the counters it updates
+        """
+        stats = {"blocked_requests": 0, "allowed_requests": 0}
+
+        async def handle_route(route: Route) -> None:
+            request = route.request
+            if self.should_block(request.url, request.resource_type):
+                stats["blocked_requests"] += 1
+                await route.abort()
+            else:
+                stats["allowed_requests"] += 1
+                await route.continue_()
+
+        await page.route(self.route_pattern, handle_route)
+        return stats
+
+    def record_scrape(self, symbol: str, elapsed: float, stats: Dict[str, int] | None) -> None:
+        """
+        Log how long a scrape took and how many requests were blocked
+        """
+        if stats is None:
+            logger.info(f"Unfiltered scrape of {symbol} took {elapsed:.2f}s")
+            return
+
+        self.totals["scrapes"] += 1
+        self.totals["blocked_requests"] += stats["blocked_requests"]
+        self.totals["seconds"] += elapsed
+        logger.info(
+            f"Filtered scrape of {symbol} took {elapsed:.2f}s: blocked {stats['blocked_requests']} of "
+            f"{stats['blocked_requests'] + stats['allowed_requests']} routed requests"
+        )
+
+    def log_stats(self) -> None:
+        """
+        Log the requests blocked during the run
+        """
+        if not self.totals["scrapes"]:
+            return
+        logger.info(
+            f"Resource filter blocked {self.totals['blocked_requests']} requests across "
+            f"{self.totals['scrapes']} scrapes, which took {self.totals['seconds'] / self.totals['scrapes']:.2f}s "
+            f"on average"
+        )
@@ -0,0 +1,102 @@
+import json
+import os
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Set, Tuple
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Serialize numpy scalars found in market data, and anything else as a string
+    """
+    if hasattr(value, "item"):
+        return value.item()
+    return str(value)
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of the stages completed for each symbol during the day's run
+    (scrape, market_data, debate and moderation).
+
+    Every completed stage is appended (and flushed) with its result as soon as it finishes. When main.py is
+    run again the same day, after a crash or a failed send, the journal is replayed and completed work is
+    skipped: symbols whose debate already finished go straight to moderation or to the email. Later records
+    of a stage override earlier ones, and a line cut short by a crash is ignored.
+    """
+
+    def __init__(
+        self,
+        directory: str = config.JOURNAL_DIR,
+        enabled: bool = config.JOURNAL_ENABLED,
+        resume: bool = True,
+    ):
+        self.enabled = enabled
+        self.path = os.path.join(directory, f"{datetime.now().strftime('%Y-%m-%d')}.jsonl")
+        self.completed: Dict[str, Dict[str, Any]] = {}
+        # Stages reused from the journal, counted once however often they are looked up
+        self._resumed_stages: Set[Tuple[str, str]] = set()
+        if enabled and resume:
+            self._load()
+
+    def _load(self) -> None:
+        """
+        Replay today's journal
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping an incomplete line of {self.path}")
+                    continue
+                self.completed.setdefault(record["symbol"], {})[record["stage"]] = record["value"]
+        logger.info(
+            f"Loaded {sum(len(stages) for stages in self.completed.values())} completed stages "
+            f"for {len(self.completed)} symbols from {self.path}"
+        )
+
+    @property
+    def resumed(self) -> int:
+        """
+        Number of completed stages reused from the journal
+        """
+        return len(self._resumed_stages)
+
+    def get(self, symbol: str, stage: str) -> Any | None:
+        """
+        Result of a stage completed earlier today, or None
+        """
+        value = self.completed.get(symbol, {}).get(stage)
+        if value is not None and (symbol, stage) not in self._resumed_stages:
+            self._resumed_stages.add((symbol, stage))
+            logger.info(f"Resuming {symbol} {stage} from the run journal")
+        return value
+
+    def record(self, symbol: str, stage: str, value: Any) -> None:
+        """
+        Append the result of a completed stage
+        """
+        if not self.enabled:
+            return
+        self.completed.setdefault(symbol, {})[stage] = value
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "symbol": symbol,
+            "stage": stage,
+            "value": value,
+        }
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=_json_default) + "\n")
+        except OSError as e:
+            logger.error(f"Could not write to the run journal: {str(e)}")
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import queue
+import random
+import hashlib
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+from ddgs import DDGS
+from ddgs.exceptions import RatelimitException, TimeoutException
+from cache import TTLCache, MISSING, default_cache
+from telemetry import default_telemetry
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def _format_results(results: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Normalize raw search results to title, link and snippet fields
+    """
+    formatted_results = []
+    for r in results:
+        try:
+            formatted_results.append(
+                {
+                    "title": r.get("title", "No title"),
+                    "link": r.get("href", r.get("url", r.get("link", "No link"))),
+                    "snippet": r.get("body", r.get("snippet", "No description")),
+                }
+            )
+        except (AttributeError, KeyError) as e:
+            logger.warning(f"Skipping malformed result: {str(e)}")
+            continue
+    return formatted_results
+
+
+class DDGSBackend:
+    """
+    DuckDuckGo search through a pool of reusable DDGS clients.
+    Blocking: search is run inside the search service's thread pool, and each thread borrows its own client.
+    """
+
+    def __init__(
+        self,
+        pool_size: int = config.SEARCH_CLIENT_POOL_SIZE,
+        timeout: int = config.SEARCH_TIMEOUT_SECONDS,
+    ):
+        self.timeout = timeout
+        self._clients: queue.Queue = queue.Queue()
+        for _ in range(pool_size):
+            self._clients.put(None)
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """
+        Run one text search with a pooled client, creating the client on first use
+        """
+        client = self._clients.get()
+        try:
+            if client is None:
+                client = DDGS(timeout=self.timeout)
+            return client.text(query, max_results=max_results)
+        finally:
+            self._clients.put(client)
+
+
+class LocalSearchBackend:
+    """
+    Offline stand-in for DuckDuckGo, for tests and benchmarks.
+
+    Results come from a JSON fixture mapping normalized queries to raw result lists. Queries missing from
+    the fixture get deterministic synthetic results. An optional delay simulates network latency.
+    """
+
+    def __init__(self, fixture_file: str | None = None, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.fixtures: Dict[str, List[Dict[str, Any]]] = {}
+        if fixture_file:
+            with open(fixture_file, "r") as f:
+                self.fixtures = {
+                    " ".join(query.lower().split()): results
+                    for query, results in json.load(f).items()
+                }
+
+    def search(self, query: str, max_results: int) -> List[Dict[str, Any]]:
+        """
+        Return the fixture results for a query, or synthetic ones
+        """
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+
+        normalized = " ".join(query.lower().split())
+        if normalized in self.fixtures:
+            return self.fixtures[normalized][:max_results]
+
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:8]
+        return [
+            {
+                "title": f"{query} ({index + 1})",
+                "href": f"https://example.com/{digest}/{index + 1}",
+                "body": f"Local search result {index + 1} for {query}.",
+            }
+            for index in range(max_results)
+        ]
+
+
+def create_search_backend(backend: str = config.SEARCH_BACKEND):
+    """
+    Create the configured search backend ("ddgs" or "local")
+    """
+    if backend == "local":
+        return LocalSearchBackend(config.SEARCH_FIXTURE_FILE)
+    return DDGSBackend()
+
+
+class SearchService:
+    """
+    Shared web search used by the agents' web_search tool.
+
+    Searches run in a dedicated bounded thread pool. Results are cached per query, and concurrent
+    identical queries (for example the same question asked by two analysts) share one in-flight request
+    instead of each hitting the network. When DuckDuckGo rate limits or times out, the search is retried
+    with exponential backoff and jitter.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        max_workers: int = config.SEARCH_CONCURRENCY,
+        max_retries: int = config.SEARCH_MAX_RETRIES,
+        backoff_seconds: float = config.SEARCH_BACKOFF_SECONDS,
+        cache: TTLCache = default_cache,
+    ):
+        self.backend = backend or create_search_backend()
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.cache = cache
+        self._executor: ThreadPoolExecutor | None = None
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        # Results of this run, so repeated queries are deduplicated even with the disk cache disabled
+        self._run_results: Dict[str, List[Dict[str, str]]] = {}
+        self.stats = {"requests": 0, "network_calls": 0, "coalesced": 0, "rate_limited": 0}
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """
+        Start the search thread pool on first use
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="web-search"
+            )
+        return self._executor
+
+    def reset(self) -> None:
+        """
+        Start a new run: forget the per-run results and counters
+        """
+        self._run_results = {}
+        self.stats = {"requests": 0, "network_calls": 0, "coalesced": 0, "rate_limited": 0}
+
+    def close(self) -> None:
+        """
+        Shut down the search thread pool. It is started again by the next search.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _fetch(self, query: str, num_results: int) -> List[Dict[str, str]]:
+        """
+        Run the search in the thread pool, backing off and retrying when rate limited
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            self.stats["network_calls"] += 1
+            try:
+                results = await loop.run_in_executor(
+                    self.executor, self.backend.search, query, num_results
+                )
+                return _format_results(results)
+            except (RatelimitException, TimeoutException) as e:
+                self.stats["rate_limited"] += 1
+                if attempt == self.max_retries:
+                    raise
+                delay = self.backoff_seconds * 2**attempt * random.uniform(1.0, 1.5)
+                logger.warning(
+                    f"Search for {query!r} failed ({type(e).__name__}), retrying in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+        return []
+
+    async def _search(self, key: str, query: str, num_results: int) -> List[Dict[str, str]]:
+        """
+        Fetch and cache one query, dropping it from the in-flight requests once done
+        """
+        try:
+            results = await self._fetch(query, num_results)
+            if results:
+                self._run_results[key] = results
+                self.cache.set("web_search", key, results)
+            return results
+        except Exception as e:
+            logger.error(f"Search error: {str(e)}", exc_info=True)
+            return []
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def search(self, query: str, num_results: int = 3) -> List[Dict[str, str]]:
+        """
+        Search the web, sharing the result with identical queries that are cached or already in flight
+        """
+        self.stats["requests"] += 1
+        key = self.cache.make_key(
+            "web_search", "search", [query.strip().lower(), num_results]
+        )
+        with default_telemetry.span("web_search", query=query) as span:
+            if key in self._run_results:
+                self.stats["coalesced"] += 1
+                span.set(source="run")
+                results = self._run_results[key]
+            else:
+                results = self.cache.get("web_search", key)
+                if results is not MISSING:
+                    span.set(source="cache")
+                else:
+                    future = self._in_flight.get(key)
+                    if future is not None:
+                        self.stats["coalesced"] += 1
+                        span.set(source="coalesced")
+                    else:
+                        future = asyncio.ensure_future(self._search(key, query, num_results))
+                        self._in_flight[key] = future
+                        span.set(source="network")
+                    # A cancelled caller must not cancel the request shared with the other callers
+                    results = await asyncio.shield(future)
+            span.set(
+                results=len(results),
+                bytes=sum(len(r["title"]) + len(r["snippet"]) for r in results),
+            )
+            return results
+
+    def log_stats(self) -> None:
+        """
+        Log how many searches reached the network, and how many were shared with identical queries
+        """
+        if self.stats["requests"]:
+            logger.info(
+                f"Web search: {self.stats['requests']} requests, {self.stats['network_calls']} network calls, "
+                f"{self.stats['coalesced']} coalesced, {self.stats['rate_limited']} rate limited"
+            )
+
+
+# Search service shared by every agent in the process
+default_search_service = SearchService()
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+from typing import Dict, List
+from search import SearchService, default_search_service
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Rank fusion constant: dampens the weight of the top positions of a single query
+RANK_CONSTANT = 60
+
+
+class SearchContextRetriever:
+    """
+    Search a standard set of questions for a symbol before its debate, so the analysts start with current
+    context instead of blocking the debate on tool calls (each of which costs an extra LLM round).
+
+    The queries run concurrently through the shared search service. Results are deduplicated by link and
+    title, and ranked by reciprocal rank fusion across the queries, with a bonus for results mentioning the
+    symbol.
+    """
+
+    def __init__(
+        self,
+        search_service: SearchService = default_search_service,
+        queries: List[str] | None = None,
+        results_per_query: int = config.SEARCH_CONTEXT_RESULTS_PER_QUERY,
+        max_results: int = config.SEARCH_CONTEXT_MAX_RESULTS,
+    ):
+        self.search_service = search_service
+        self.queries = queries or config.SEARCH_CONTEXT_QUERIES
+        self.results_per_query = results_per_query
+        self.max_results = max_results
+
+    def _rank(self, symbol: str, result_lists: List[List[Dict[str, str]]]) -> List[Dict[str, str]]:
+        """
+        Merge the results of every query, dropping duplicates and keeping the best ranked ones
+        """
+        scores: Dict[str, float] = {}
+        results: Dict[str, Dict[str, str]] = {}
+        seen_titles: Dict[str, str] = {}
+        for result_list in result_lists:
+            for position, result in enumerate(result_list):
+                title = " ".join(result.get("title", "").lower().split())
+                # The same article is often returned under a different URL by another query
+                key = seen_titles.get(title) or result.get("link") or title
+                if title:
+                    seen_titles.setdefault(title, key)
+                results.setdefault(key, result)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (RANK_CONSTANT + position + 1)
+
+        for key, result in results.items():
+            text = f"{result.get('title', '')} {result.get('snippet', '')}".upper()
+            if symbol.upper() in text:
+                scores[key] += 1.0 / RANK_CONSTANT
+
+        ranked = sorted(results, key=lambda key: scores[key], reverse=True)
+        return [results[key] for key in ranked[: self.max_results]]
+
+    async def retrieve(self, symbol: str) -> List[Dict[str, str]]:
+        """
+        Run the standard queries for a symbol and return the ranked, deduplicated results
+        """
+        queries = [query.format(symbol=symbol) for query in self.queries]
+        result_lists = await asyncio.gather(
+            *(self.search_service.search(query, self.results_per_query) for query in queries)
+        )
+        context = self._rank(symbol, result_lists)
+        logger.info(
+            f"Retrieved {len(context)} search results for {symbol} from "
+            f"{sum(len(results) for results in result_lists)} results of {len(queries)} queries"
+        )
+        return context
@@ -8,5 +8,11 @@ source venv/bin/activate
 rm -f output.log
 rm -f error.log
 
-# Run the script
-python3 main.py
\ No newline at end of file
+# The scheduled run has to be in inboxes by 6:00 am (manual runs have no deadline)
+export SEND_BY_TIME="${SEND_BY_TIME:-06:00}"
+
+# Run the script, running it again if it fails: the second attempt resumes from the run journal
+# and only emails the recipients who did not get their report
+for attempt in 1 2; do
+    python3 main.py && break
+done
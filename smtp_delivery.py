@@ -0,0 +1,335 @@
+import asyncio
+import hashlib
+import os
+import queue
+import random
+import smtplib
+import socket
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from email import message_from_bytes, policy
+from email.message import Message
+from typing import Dict, Iterable, List, Tuple
+from telemetry import default_telemetry
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Network errors after which the connection is dropped and the message is retried on a fresh one. OSError itself is
+# left out, since every SMTPException is one: other SMTP errors are only retried on a 4xx reply code
+TRANSIENT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError, socket.gaierror)
+
+
+def _is_transient(error: Exception) -> bool:
+    """
+    Whether a failed delivery is worth retrying: dropped connections and 4xx replies are, 5xx replies are not
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, TRANSIENT_ERRORS)
+
+
+class SMTPConnectionPool:
+    """
+    Authenticated SMTP connections kept open for the whole run and shared by the delivery threads.
+
+    Connections are opened on first use (EHLO, STARTTLS, EHLO, LOGIN), checked with NOOP before being reused,
+    and reopened when the server has dropped them.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        size: int = config.SMTP_POOL_SIZE,
+        starttls: bool = config.SMTP_STARTTLS,
+        timeout: float = config.SMTP_TIMEOUT_SECONDS,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.size = size
+        self.connections_opened = 0
+        self._connections: queue.Queue = queue.Queue()
+        for _ in range(size):
+            self._connections.put(None)
+
+    def _connect(self) -> smtplib.SMTP:
+        """
+        Open and authenticate one connection
+        """
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.starttls:
+                server.starttls()
+                server.ehlo()
+            # Local SMTP sinks do not offer AUTH
+            if server.has_extn("auth"):
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.connections_opened += 1
+        return server
+
+    def acquire(self) -> smtplib.SMTP:
+        """
+        Borrow a live connection, blocking while all of them are in use
+        """
+        server = self._connections.get()
+        try:
+            if server is not None:
+                try:
+                    if server.noop()[0] == 250:
+                        return server
+                except (smtplib.SMTPException, OSError):
+                    pass
+                server.close()
+            return self._connect()
+        except Exception:
+            # Keep the slot so a later message can try to connect again
+            self._connections.put(None)
+            raise
+
+    def release(self, server: smtplib.SMTP) -> None:
+        """
+        Return a healthy connection to the pool
+        """
+        self._connections.put(server)
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        """
+        Drop a broken connection, freeing its slot
+        """
+        server.close()
+        self._connections.put(None)
+
+    def close(self) -> None:
+        """
+        Quit every open connection
+        """
+        while not self._connections.empty():
+            server = self._connections.get_nowait()
+            if server is None:
+                continue
+            try:
+                server.quit()
+            except (smtplib.SMTPException, OSError):
+                # The server or the network already dropped the connection, the messages were delivered
+                server.close()
+
+
+class Outbox:
+    """
+    Persistent outbox of the day's messages, one .eml file per recipient.
+
+    Messages are written before delivery and marked as sent once accepted by the server. A run that is
+    restarted on the same day (after a crash or a failed delivery) sends only what is still pending and
+    never mails a recipient twice. A message with placeholders for unfinished analyses is only marked as a
+    partial delivery, so a later run that completes more of them sends the recipient the full report.
+    """
+
+    def __init__(self, directory: str = config.OUTBOX_DIR):
+        self.directory = os.path.join(directory, datetime.now().strftime("%Y-%m-%d"))
+
+    @staticmethod
+    def message_id(recipient: str) -> str:
+        """
+        Stable outbox id of a recipient's message for the day
+        """
+        return hashlib.sha256(recipient.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+    def _path(self, message_id: str, suffix: str) -> str:
+        return os.path.join(self.directory, f"{message_id}{suffix}")
+
+    def is_sent(self, message_id: str) -> bool:
+        return os.path.exists(self._path(message_id, ".sent"))
+
+    def partial_placeholders(self, message_id: str) -> int | None:
+        """
+        Placeholders in the partial report delivered earlier today, or None if none was delivered
+        """
+        try:
+            with open(self._path(message_id, ".partial"), "r") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def put(self, message_id: str, msg: Message) -> None:
+        """
+        Store a message, replacing an older pending version
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(message_id, ".eml")
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(msg.as_bytes())
+        os.replace(f"{path}.tmp", path)
+
+    def pending(self, message_ids: Iterable[str]) -> List[Tuple[str, Message]]:
+        """
+        Messages queued by this run that have not been delivered yet. Undelivered messages left behind by an
+        earlier run for anyone else (a removed subscriber, or a recipient skipped this time) are stale, and are
+        dropped instead of being sent
+        """
+        if not os.path.isdir(self.directory):
+            return []
+        message_ids = set(message_ids)
+        messages = []
+        for name in sorted(os.listdir(self.directory)):
+            message_id, extension = os.path.splitext(name)
+            if extension != ".eml" or self.is_sent(message_id):
+                continue
+            path = os.path.join(self.directory, name)
+            if message_id not in message_ids:
+                logger.info(f"Dropping the stale outbox message {name}")
+                os.remove(path)
+                continue
+            with open(path, "rb") as f:
+                messages.append((message_id, message_from_bytes(f.read(), policy=policy.SMTP)))
+        return messages
+
+    def mark_sent(self, message_id: str, placeholders: int = 0) -> None:
+        """
+        Record a delivery and drop the stored message. A report with placeholders is only a partial delivery
+        """
+        if placeholders:
+            with open(self._path(message_id, ".partial"), "w") as f:
+                f.write(str(placeholders))
+            stale_suffixes = (".eml",)
+        else:
+            with open(self._path(message_id, ".sent"), "w") as f:
+                f.write(datetime.now().isoformat())
+            stale_suffixes = (".eml", ".partial")
+        for suffix in stale_suffixes:
+            try:
+                os.remove(self._path(message_id, suffix))
+            except FileNotFoundError:
+                pass
+
+
+class EmailDeliveryEngine:
+    """
+    Deliver many messages over a few reused SMTP connections.
+
+    Messages go through the persistent outbox, and are sent from a bounded thread pool (one thread per pooled
+    connection). Each message is retried on its own with exponential backoff when the failure is transient, so
+    one bad delivery no longer loses the whole send.
+    """
+
+    def __init__(
+        self,
+        pool: SMTPConnectionPool,
+        outbox: Outbox | None = None,
+        max_retries: int = config.SMTP_MAX_RETRIES,
+        backoff_seconds: float = config.SMTP_BACKOFF_SECONDS,
+    ):
+        self.pool = pool
+        self.outbox = outbox or Outbox()
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._executor = ThreadPoolExecutor(
+            max_workers=pool.size,
+            thread_name_prefix="smtp",
+        )
+
+    def _send_blocking(self, msg: Message) -> None:
+        """
+        Send one message on a pooled connection, run inside the delivery thread pool
+        """
+        server = self.pool.acquire()
+        try:
+            server.send_message(msg)
+        except Exception as e:
+            # smtplib resets the session after an SMTP error reply, so only a broken connection is dropped
+            if isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                self.pool.release(server)
+            else:
+                self.pool.discard(server)
+            raise
+        self.pool.release(server)
+
+    async def _deliver_one(self, message_id: str, msg: Message, placeholders: int = 0) -> bool:
+        """
+        Send one message, retrying transient failures with backoff
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries + 1):
+            with default_telemetry.span(
+                "send_email", recipient=msg["To"], attempt=attempt, bytes=len(msg.as_bytes())
+            ) as span:
+                try:
+                    await loop.run_in_executor(self._executor, self._send_blocking, msg)
+                    self.outbox.mark_sent(message_id, placeholders)
+                    return True
+                except Exception as e:
+                    error = type(e).__name__
+                    span.set(error=error)
+                    if not _is_transient(e) or attempt == self.max_retries:
+                        logger.error(
+                            f"Could not deliver the email to {msg['To']} after {attempt + 1} attempt(s): {str(e)}"
+                        )
+                        return False
+            delay = self.backoff_seconds * 2**attempt * random.uniform(1.0, 1.5)
+            logger.warning(f"Delivery to {msg['To']} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+        return False
+
+    async def deliver(
+        self, messages: Dict[str, Message], placeholders: Dict[str, int] | None = None
+    ) -> Dict[str, bool]:
+        """
+        Deliver messages keyed by recipient, resuming from today's outbox.
+        placeholders counts the unfinished analyses in each recipient's report. Recipients who were already
+        mailed today are skipped, unless they only got a partial report with more placeholders than this one.
+        Returns whether each recipient was delivered.
+        """
+        placeholders = placeholders or {}
+        results = {}
+        queued = []
+        for recipient, msg in messages.items():
+            message_id = self.outbox.message_id(recipient)
+            earlier_placeholders = self.outbox.partial_placeholders(message_id)
+            if self.outbox.is_sent(message_id):
+                logger.info(f"Skipping {recipient}, today's email was already delivered")
+                results[recipient] = True
+            elif earlier_placeholders is not None and placeholders.get(recipient, 0) >= earlier_placeholders:
+                logger.info(f"Skipping {recipient}, no more analyses finished since today's partial report")
+                results[recipient] = True
+            else:
+                self.outbox.put(message_id, msg)
+                queued.append(message_id)
+
+        pending = self.outbox.pending(queued)
+        delivered = await asyncio.gather(
+            *(
+                self._deliver_one(message_id, msg, placeholders.get(msg["To"], 0))
+                for message_id, msg in pending
+            )
+        )
+        for (_, msg), success in zip(pending, delivered):
+            results[msg["To"]] = success
+
+        logger.info(
+            f"Delivered {sum(delivered)} of {len(pending)} emails over "
+            f"{self.pool.connections_opened} SMTP connection(s)"
+        )
+        return results
+
+    def close(self) -> None:
+        """
+        Close the SMTP connections and the delivery threads
+        """
+        self._executor.shutdown(wait=True)
+        self.pool.close()
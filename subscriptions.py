@@ -0,0 +1,111 @@
+import json
+import os
+import logging
+from typing import Dict, List
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+def _normalize_symbols(symbols: List[str]) -> List[str]:
+    """
+    Upper-case symbols without blanks or duplicates, in their original order
+    """
+    return list(dict.fromkeys(symbol.strip().upper() for symbol in symbols if symbol.strip()))
+
+
+def load_subscriptions(
+    path: str = config.SUBSCRIPTIONS_FILE,
+    watchlist_path: str = config.WATCHLIST_FILE,
+) -> Dict[str, List[str]]:
+    """
+    Load the watchlist of every user, keyed by email address.
+
+    The subscriptions file is a JSON object mapping each email address to its symbols. Without it, every address
+    in RECIPIENT_EMAILS follows the shared watchlist file (one symbol per line).
+    """
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            subscriptions = json.load(f)
+        if not isinstance(subscriptions, dict) or not all(
+            isinstance(symbols, list) for symbols in subscriptions.values()
+        ):
+            raise ValueError(f"{path} must map each email address to a list of symbols")
+        return {
+            email.strip(): _normalize_symbols(symbols)
+            for email, symbols in subscriptions.items()
+            if email.strip()
+        }
+
+    recipient_emails = os.getenv("RECIPIENT_EMAILS")
+    if not recipient_emails:
+        raise ValueError(f"{path} not found and RECIPIENT_EMAILS not found in environment variables")
+    with open(watchlist_path, "r") as f:
+        symbols = _normalize_symbols(f.readlines())
+    return {email.strip(): symbols for email in recipient_emails.split(",") if email.strip()}
+
+
+class SubscriptionPlanner:
+    """
+    Plan one run for many users with overlapping watchlists.
+
+    Every unique symbol is analyzed once, whatever the number of users following it, and the analyses are
+    fanned back out to per-user reports.
+    """
+
+    def __init__(self, subscriptions: Dict[str, List[str]]):
+        self.subscriptions = {
+            email: _normalize_symbols(symbols) for email, symbols in subscriptions.items()
+        }
+        # Deduped union of the watchlists, in first-subscribed order
+        self.symbols = _normalize_symbols(
+            [symbol for symbols in self.subscriptions.values() for symbol in symbols]
+        )
+        self.requested = sum(len(symbols) for symbols in self.subscriptions.values())
+
+    @property
+    def dedup_ratio(self) -> float:
+        """
+        Symbol subscriptions per analyzed symbol (1.0 when no watchlists overlap)
+        """
+        return self.requested / len(self.symbols) if self.symbols else 1.0
+
+    @property
+    def analyses_saved(self) -> int:
+        """
+        Analyses that would have been run again by analyzing each user's watchlist separately
+        """
+        return self.requested - len(self.symbols)
+
+    def fan_out(self, analyses: Dict[str, str]) -> Dict[str, List[str]]:
+        """
+        Per-user watchlists restricted to the symbols that were analyzed
+        """
+        return {
+            email: [symbol for symbol in symbols if symbol in analyses]
+            for email, symbols in self.subscriptions.items()
+        }
+
+    def log_plan(self) -> None:
+        """
+        Log the dedup ratio of the run
+        """
+        logger.info(
+            f"{len(self.subscriptions)} users follow {self.requested} symbols, {len(self.symbols)} unique "
+            f"(dedup ratio {self.dedup_ratio:.2f}, {self.analyses_saved} analyses saved)"
+        )
+
+    def log_savings(self, debate_stage: Dict[str, float] | None) -> None:
+        """
+        Log the debate time saved by the dedup, estimated from the run's average debate duration
+        """
+        if not debate_stage or not debate_stage.get("count"):
+            return
+        average = debate_stage["total_seconds"] / debate_stage["count"]
+        logger.info(
+            f"Analyzing each symbol once saved about {self.analyses_saved * average:.1f}s of debate time "
+            f"({self.analyses_saved} debates at {average:.1f}s on average)"
+        )
@@ -0,0 +1,256 @@
+import json
+import os
+import time
+import logging
+from datetime import datetime
+from functools import wraps
+from typing import Any, Callable, Dict, List
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+# Numeric span attributes that are summed per span name in the report and the Prometheus textfile
+SUMMED_ATTRIBUTES = ("prompt_tokens", "completion_tokens", "bytes")
+
+
+class _NoopSpan:
+    """
+    Shared span returned while telemetry is disabled, so instrumented code pays for one attribute check
+    """
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class Span:
+    """
+    Time one operation and record it with its attributes (symbol, token counts, bytes...) when it ends
+    """
+
+    __slots__ = ("telemetry", "name", "attributes", "start")
+
+    def __init__(self, telemetry: "Telemetry", name: str, attributes: Dict[str, Any]):
+        self.telemetry = telemetry
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+
+    def set(self, **attributes: Any) -> None:
+        """
+        Add attributes to the span while it runs
+        """
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "Span":
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.telemetry.record(
+            self.name, time.monotonic() - self.start, start=self.start, **self.attributes
+        )
+        return False
+
+
+class Telemetry:
+    """
+    Lightweight span and metrics recorder for one run.
+
+    Stages wrap their work in spans (scrape, market_data, web_search, agent_turn, moderation, send_email...).
+    At the end of the run, write_report exports every span and a per-stage summary as JSON, and the totals
+    as a Prometheus textfile for the node exporter's textfile collector. When disabled, span() returns a
+    shared no-op span and nothing is recorded.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = config.METRICS_ENABLED,
+        directory: str = config.METRICS_DIR,
+    ):
+        self.enabled = enabled
+        self.directory = directory
+        self.spans: List[Dict[str, Any]] = []
+        self._run_start = time.monotonic()
+        self._run_started_at = datetime.now()
+
+    def reset(self) -> None:
+        """
+        Start a new run
+        """
+        self.spans = []
+        self._run_start = time.monotonic()
+        self._run_started_at = datetime.now()
+
+    def span(self, name: str, **attributes: Any) -> Span | _NoopSpan:
+        """
+        Context manager timing the enclosed block
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        return Span(self, name, attributes)
+
+    def record(
+        self, name: str, duration: float, start: float | None = None, **attributes: Any
+    ) -> None:
+        """
+        Record a span measured elsewhere (for example a streamed agent turn)
+        """
+        if not self.enabled:
+            return
+        if start is None:
+            start = time.monotonic() - duration
+        self.spans.append(
+            {
+                "name": name,
+                "start_seconds": round(start - self._run_start, 4),
+                "duration_seconds": round(duration, 4),
+                **attributes,
+            }
+        )
+
+    def traced(
+        self, name: str, attributes: Callable[..., Dict[str, Any]] | None = None
+    ) -> Callable:
+        """
+        Decorator wrapping every call of an async function in a span.
+        attributes picks span attributes from the call arguments.
+        """
+
+        def decorator(func: Callable) -> Callable:
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return await func(*args, **kwargs)
+                with self.span(name, **(attributes(*args, **kwargs) if attributes else {})):
+                    return await func(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Count, duration statistics, errors and summed token and byte attributes per span name
+        """
+        durations: Dict[str, List[float]] = {}
+        summary: Dict[str, Dict[str, Any]] = {}
+        for span in self.spans:
+            name = span["name"]
+            durations.setdefault(name, []).append(span["duration_seconds"])
+            stage = summary.setdefault(name, {"errors": 0})
+            if "error" in span:
+                stage["errors"] += 1
+            for attribute in SUMMED_ATTRIBUTES:
+                if isinstance(span.get(attribute), (int, float)):
+                    stage[attribute] = stage.get(attribute, 0) + span[attribute]
+
+        for name, values in durations.items():
+            values.sort()
+            summary[name].update(
+                {
+                    "count": len(values),
+                    "total_seconds": round(sum(values), 4),
+                    "max_seconds": values[-1],
+                    "p50_seconds": values[len(values) // 2],
+                    "p95_seconds": values[min(len(values) - 1, int(len(values) * 0.95))],
+                }
+            )
+        return summary
+
+    def _prometheus_lines(self, summary: Dict[str, Dict[str, Any]], run_seconds: float) -> List[str]:
+        """
+        Render the run summary in the Prometheus text exposition format
+        """
+        lines = [
+            "# HELP stock_news_run_duration_seconds Wall time of the last run.",
+            "# TYPE stock_news_run_duration_seconds gauge",
+            f"stock_news_run_duration_seconds {run_seconds:.4f}",
+            "# HELP stock_news_last_run_timestamp_seconds Unix time the last run finished.",
+            "# TYPE stock_news_last_run_timestamp_seconds gauge",
+            f"stock_news_last_run_timestamp_seconds {time.time():.0f}",
+        ]
+        metrics = (
+            ("span_count", "count", "Spans recorded per stage in the last run."),
+            ("span_seconds_total", "total_seconds", "Summed span duration per stage in the last run."),
+            ("span_seconds_max", "max_seconds", "Slowest span per stage in the last run."),
+            ("span_seconds_p95", "p95_seconds", "95th percentile span duration per stage in the last run."),
+            ("span_errors", "errors", "Failed spans per stage in the last run."),
+            ("prompt_tokens", "prompt_tokens", "Prompt tokens per stage in the last run."),
+            ("completion_tokens", "completion_tokens", "Completion tokens per stage in the last run."),
+            ("bytes", "bytes", "Bytes transferred per stage in the last run."),
+        )
+        for metric, field, description in metrics:
+            samples = [
+                f'stock_news_{metric}{{stage="{name}"}} {stage[field]}'
+                for name, stage in sorted(summary.items())
+                if field in stage
+            ]
+            if samples:
+                lines += [
+                    f"# HELP stock_news_{metric} {description}",
+                    f"# TYPE stock_news_{metric} gauge",
+                    *samples,
+                ]
+        return lines
+
+    def write_report(self) -> str | None:
+        """
+        Export the run as a JSON report and a Prometheus textfile, returning the report path
+        """
+        if not self.enabled:
+            return None
+        run_seconds = time.monotonic() - self._run_start
+        summary = self.summary()
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            report_path = os.path.join(
+                self.directory,
+                f"run-{self._run_started_at.strftime('%Y%m%d-%H%M%S')}.json",
+            )
+            with open(report_path, "w") as f:
+                json.dump(
+                    {
+                        "started_at": self._run_started_at.isoformat(),
+                        "duration_seconds": round(run_seconds, 4),
+                        "summary": summary,
+                        "spans": self.spans,
+                    },
+                    f,
+                    indent=2,
+                    default=str,
+                )
+
+            # Write then rename, so the textfile collector never reads a partial file
+            textfile_path = os.path.join(self.directory, "stock_news.prom")
+            with open(f"{textfile_path}.tmp", "w") as f:
+                f.write("\n".join(self._prometheus_lines(summary, run_seconds)) + "\n")
+            os.replace(f"{textfile_path}.tmp", textfile_path)
+        except OSError as e:
+            logger.error(f"Could not write the metrics report: {str(e)}")
+            return None
+
+        for name, stage in sorted(summary.items()):
+            logger.info(
+                f"Stage {name}: {stage['count']} spans, {stage['total_seconds']:.2f}s total, "
+                f"{stage['max_seconds']:.2f}s max, {stage['errors']} errors"
+            )
+        logger.info(f"Wrote metrics report to {report_path}")
+        return report_path
+
+
+# Recorder shared by every stage of the run
+default_telemetry = Telemetry()
@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from autogen_agentchat.messages import TextMessage
+from consensus import detect_consensus
+from turn_scheduler import TurnScheduler
+
+ANALYSTS = ["BuyAgent", "SellAgent", "HoldAgent"]
+
+
+def _message(source: str, content: str) -> TextMessage:
+    return TextMessage(content=content, source=source)
+
+
+def _agreeing_openings() -> list:
+    return [
+        _message("user", "Analyze AAPL. End with Final stance: Buy/Sell/Hold"),
+        *(_message(name, f"{name} opening statement. Final stance: Hold") for name in ANALYSTS),
+    ]
+
+
+def test_agreeing_openings_are_not_a_consensus():
+    assert detect_consensus(_agreeing_openings(), ANALYSTS) is None
+
+
+def test_agreeing_openings_do_not_end_the_debate():
+    scheduler = TurnScheduler(
+        facilitator_name="DebateFacilitatorAgent",
+        agent_names=[*ANALYSTS, "SummarizerAgent"],
+        analyst_names=ANALYSTS,
+        summarizer_name="SummarizerAgent",
+    )
+    assert scheduler.select(_agreeing_openings()) == "DebateFacilitatorAgent"
+    assert scheduler.early_terminations == 0
+
+
+def test_final_stances_after_the_openings_reach_consensus():
+    messages = _agreeing_openings()
+    for name in ANALYSTS:
+        messages.append(_message("DebateFacilitatorAgent", f"{name}, please give your final stance."))
+        messages.append(_message(name, "After the rebuttals, **Final stance:** hold"))
+    assert detect_consensus(messages, ANALYSTS) == "Hold"
+
+
+def test_a_missing_final_stance_is_not_a_consensus():
+    messages = _agreeing_openings()
+    for name in ANALYSTS[:2]:
+        messages.append(_message(name, "Final stance: Hold"))
+    assert detect_consensus(messages, ANALYSTS) is None
+
+
+def test_disagreeing_final_stances_are_not_a_consensus():
+    messages = _agreeing_openings()
+    for name, stance in zip(ANALYSTS, ["Buy", "Hold", "Hold"]):
+        messages.append(_message(name, f"Final stance: {stance}"))
+    assert detect_consensus(messages, ANALYSTS) is None
@@ -0,0 +1,38 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import TTLCache
+from debate_cache import DebateResultCache
+
+
+def _market_data(symbol: str, stock_data: dict) -> dict:
+    return {
+        "symbol": symbol,
+        "stock_data": stock_data,
+        "research_reports": [{"title": "Quarterly results beat estimates"}],
+    }
+
+
+def _debate_cache(tmp_path) -> DebateResultCache:
+    return DebateResultCache(cache=TTLCache(directory=str(tmp_path)), force_refresh=False)
+
+
+def test_unchanged_inputs_reuse_the_stored_result(tmp_path):
+    debate_cache = _debate_cache(tmp_path)
+    market_data = _market_data("AAPL", {"current_price": 190.12, "recommendation": "buy"})
+    debate_cache.set(market_data, "**Consensus Recommendation:** Buy")
+
+    # A small price move rounds to the same fingerprint
+    moved = _market_data("AAPL", {"current_price": 190.14, "recommendation": "buy"})
+    assert debate_cache.get(moved) == "**Consensus Recommendation:** Buy"
+
+
+def test_results_without_market_data_are_never_stored_or_reused(tmp_path):
+    debate_cache = _debate_cache(tmp_path)
+    failed = _market_data("AAPL", {})
+    debate_cache.set(failed, "**Consensus Recommendation:** Sell")
+
+    assert debate_cache.get(failed) is None
+    assert debate_cache.get(_market_data("AAPL", {"current_price": None})) is None
@@ -0,0 +1,54 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from indicators import compute_indicators
+
+
+def _history(dates: pd.DatetimeIndex, seed: int) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, len(dates)))
+    return pd.DataFrame(
+        {
+            "Open": close + rng.normal(0, 0.5, len(dates)),
+            "High": close + 1,
+            "Low": close - 1,
+            "Close": close,
+            "Volume": rng.integers(1_000, 10_000, len(dates)),
+        },
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+
+
+STOCK_DATES = pd.bdate_range("2025-01-01", periods=260)
+# Crypto trades on weekends too
+CRYPTO_DATES = pd.date_range("2025-01-01", STOCK_DATES[-1], freq="D")
+
+
+def test_crypto_in_the_watchlist_does_not_change_stock_indicators():
+    stock = _history(STOCK_DATES, seed=1)
+    alone = compute_indicators({"AAPL": stock})["AAPL"]
+    mixed = compute_indicators({"AAPL": stock, "BTC-USD": _history(CRYPTO_DATES, seed=2)})
+
+    assert mixed["AAPL"] == alone
+    for name in ("sma_20", "sma_50", "sma_200", "bollinger_percent_b", "volume_zscore_20"):
+        assert alone[name] is not None
+    assert mixed["BTC-USD"] == compute_indicators({"BTC-USD": _history(CRYPTO_DATES, seed=2)})["BTC-USD"]
+
+
+def test_a_missing_session_uses_the_symbol_own_latest_bar():
+    complete = _history(STOCK_DATES, seed=3)
+    missing_last = _history(STOCK_DATES, seed=4).iloc[:-1]
+    mixed = compute_indicators({"MSFT": complete, "KO": missing_last})
+
+    assert mixed["KO"] == compute_indicators({"KO": missing_last})["KO"]
+    assert mixed["MSFT"] == compute_indicators({"MSFT": complete})["MSFT"]
+
+
+def test_short_history_reports_none():
+    indicators = compute_indicators({"NEW": _history(STOCK_DATES[:30], seed=5)})["NEW"]
+    assert indicators["sma_20"] is not None
+    assert indicators["sma_200"] is None
@@ -0,0 +1,64 @@
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import price_store
+from price_store import PriceHistoryStore
+
+
+def _history(dates) -> pd.DataFrame:
+    close = np.linspace(100, 110, len(dates))
+    return pd.DataFrame(
+        {"Open": close, "High": close + 1, "Low": close - 1, "Close": close, "Volume": 1_000},
+        index=pd.DatetimeIndex(dates, name="Date"),
+    )
+
+
+def _store(tmp_path, monkeypatch, today: str):
+    class Today(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime.fromisoformat(f"{today}T09:00").replace(tzinfo=tz)
+
+    monkeypatch.setattr(price_store, "datetime", Today)
+    store = PriceHistoryStore(directory=str(tmp_path))
+    downloads = []
+
+    def download(symbols, **kwargs):
+        downloads.append(list(symbols))
+        return {}
+
+    monkeypatch.setattr(store, "_download", download)
+    return store, downloads
+
+
+# 2026-10-16 is a Friday
+@pytest.mark.parametrize("today", ["2026-10-17", "2026-10-18", "2026-10-19"])
+def test_stocks_are_up_to_date_with_the_last_weekday_session(tmp_path, monkeypatch, today):
+    store, downloads = _store(tmp_path, monkeypatch, today)
+    store.append("AAPL", _history(pd.bdate_range("2026-09-01", "2026-10-16")))
+
+    store.sync(["AAPL"])
+    assert downloads == []
+
+
+def test_stocks_missing_a_weekday_session_are_fetched(tmp_path, monkeypatch):
+    store, downloads = _store(tmp_path, monkeypatch, "2026-10-20")
+    store.append("AAPL", _history(pd.bdate_range("2026-09-01", "2026-10-16")))
+
+    store.sync(["AAPL"])
+    assert downloads == [["AAPL"]]
+
+
+def test_symbols_trading_on_weekends_are_fetched_every_day(tmp_path, monkeypatch):
+    store, downloads = _store(tmp_path, monkeypatch, "2026-10-18")
+    store.append("BTC-USD", _history(pd.date_range("2026-09-01", "2026-10-16")))
+
+    store.sync(["BTC-USD"])
+    assert downloads == [["BTC-USD"]]
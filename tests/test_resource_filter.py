@@ -0,0 +1,36 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from resource_filter import ResourceFilter
+
+
+def test_only_blockable_requests_are_routed():
+    route_pattern = ResourceFilter(enabled=True, allowlist=[]).route_pattern
+    routed = [
+        "https://s.yimg.com/cv/logo.PNG?width=64",
+        "https://finance.yahoo.com/fonts/yahoo-sans.woff2",
+        "https://stats.g.doubleclick.net/j/collect?v=1",
+        "https://geo.yahoo.com/p",
+    ]
+    not_routed = [
+        "https://finance.yahoo.com/quote/AAPL/",
+        "https://s.yimg.com/bundle/app.js",
+        "https://finance.yahoo.com/quote/PNG/",
+        "https://notdoubleclick.net/tag.js",
+    ]
+    assert all(route_pattern.search(url) for url in routed)
+    assert not any(route_pattern.search(url) for url in not_routed)
+
+
+def test_allowlisted_hosts_are_never_blocked():
+    resource_filter = ResourceFilter(enabled=True, allowlist=["s.yimg.com"])
+    assert not resource_filter.should_block("https://s.yimg.com/cv/logo.png", "image")
+    assert resource_filter.should_block("https://example.com/logo.png", "image")
+    assert not resource_filter.should_block("https://example.com/data.json", "fetch")
+
+
+def test_nothing_is_routed_without_blocked_types_or_domains():
+    resource_filter = ResourceFilter(enabled=True, allowlist=[], blocked_resource_types=[], blocked_domains=[])
+    assert resource_filter.route_pattern.search("https://example.com/logo.png") is None
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pipeline
+from cache import TTLCache
+from debate_cache import DebateResultCache
+from deadline import RunDeadline
+from run_journal import RunJournal
+
+SYMBOL = "AAPL"
+ARTICLES = [{"title": "Quarterly results beat estimates", "type": "Research Report"}]
+STOCK_DATA = {"current_price": 190.12, "recommendation": "buy"}
+SUMMARY = "**Consensus Recommendation:** Buy"
+STAGES = ["scrape", "market_data", "debate", "moderation"]
+
+
+class _Stages:
+    """
+    Stand-ins for the scrape, yfinance, debate and moderation stages that count their calls
+    """
+
+    def __init__(self, articles=ARTICLES):
+        self.articles = articles
+        self.calls = Counter()
+
+    async def scrape(self, symbol, browser_pool):
+        self.calls["scrape"] += 1
+        return self.articles
+
+    async def fetch(self, symbols):
+        self.calls["market_data"] += 1
+        return {symbol: dict(STOCK_DATA) for symbol in symbols}
+
+    async def moderate(self, sections):
+        if sections:
+            self.calls["moderation"] += 1
+        return dict(sections)
+
+
+def _run(tmp_path, monkeypatch, stages: _Stages) -> dict:
+    class AnalysisSystem:
+        wrapped_up = False
+
+        def __init__(self, model_clients):
+            pass
+
+        async def reset(self):
+            pass
+
+        def cancel(self):
+            pass
+
+        async def analyze_stock(self, market_data, moderate, time_budget):
+            stages.calls["debate"] += 1
+            return SUMMARY
+
+    async def warm_up_models():
+        pass
+
+    monkeypatch.setattr(pipeline, "get_yahoo_finance_news", stages.scrape)
+    monkeypatch.setattr(pipeline, "StockAnalysisSystem", AnalysisSystem)
+    monkeypatch.setattr(pipeline, "warm_up_models", warm_up_models)
+
+    async def run() -> dict:
+        stock_pipeline = pipeline.StockAnalysisPipeline(
+            rate_limiter=pipeline.HostRateLimiter(0),
+            search_context_enabled=False,
+            journal=RunJournal(directory=str(tmp_path / "journal"), enabled=True),
+            deadline=RunDeadline(send_by=""),
+        )
+        stock_pipeline.debate_cache = DebateResultCache(
+            cache=TTLCache(directory=str(tmp_path / "cache")), force_refresh=False
+        )
+        monkeypatch.setattr(stock_pipeline.market_data_provider, "fetch", stages.fetch)
+        monkeypatch.setattr(stock_pipeline.moderation_stage, "moderate", stages.moderate)
+        return await stock_pipeline.run([SYMBOL])
+
+    return asyncio.run(run())
+
+
+def test_a_completed_run_is_replayed_without_running_any_stage(tmp_path, monkeypatch):
+    first = _Stages()
+    assert _run(tmp_path, monkeypatch, first) == {SYMBOL: SUMMARY}
+    assert first.calls == dict.fromkeys(STAGES, 1)
+
+    second = _Stages()
+    assert _run(tmp_path, monkeypatch, second) == {SYMBOL: SUMMARY}
+    assert second.calls == {}
+
+
+@pytest.mark.parametrize("completed", range(1, len(STAGES)))
+def test_a_crashed_run_resumes_after_its_last_completed_stage(tmp_path, monkeypatch, completed):
+    journal = RunJournal(directory=str(tmp_path / "journal"), enabled=True)
+    values = {"scrape": ARTICLES, "market_data": STOCK_DATA, "debate": SUMMARY, "moderation": SUMMARY}
+    for stage in STAGES[:completed]:
+        journal.record(SYMBOL, stage, values[stage])
+    # The crash cut the next record short
+    with open(journal.path, "a", encoding="utf-8") as f:
+        f.write('{"symbol": "AAPL", "stage": ')
+
+    stages = _Stages()
+    assert _run(tmp_path, monkeypatch, stages) == {SYMBOL: SUMMARY}
+    # A finished debate needs no inputs, so only moderation is left
+    remaining = ["moderation"] if completed >= STAGES.index("debate") + 1 else STAGES[completed:]
+    assert stages.calls == dict.fromkeys(remaining, 1)
+
+
+def test_a_debate_on_degraded_inputs_is_not_journaled(tmp_path, monkeypatch):
+    # A failed scrape returns no research reports
+    failed = _Stages(articles=[])
+    assert _run(tmp_path, monkeypatch, failed) == {SYMBOL: SUMMARY}
+    completed = RunJournal(directory=str(tmp_path / "journal")).completed[SYMBOL]
+    assert "scrape" not in completed and "debate" not in completed
+
+    # The next run scrapes and debates again, reusing the market data (and the verdict on an identical summary)
+    retried = _Stages()
+    assert _run(tmp_path, monkeypatch, retried) == {SYMBOL: SUMMARY}
+    assert retried.calls == {"scrape": 1, "debate": 1}
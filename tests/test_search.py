@@ -0,0 +1,55 @@
+import asyncio
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import TTLCache
+from search import LocalSearchBackend, SearchService
+
+FIXTURE = {
+    "AAPL  Earnings": [
+        {"title": f"Apple earnings {index}", "href": f"https://example.com/{index}", "body": f"Snippet {index}"}
+        for index in range(5)
+    ]
+}
+
+
+def _backend(tmp_path, delay: float = 0.0) -> LocalSearchBackend:
+    fixture_file = tmp_path / "search_fixture.json"
+    fixture_file.write_text(json.dumps(FIXTURE))
+    return LocalSearchBackend(str(fixture_file), delay=delay)
+
+
+def test_fixture_queries_are_matched_ignoring_case_and_spacing(tmp_path):
+    backend = _backend(tmp_path)
+    results = backend.search("aapl earnings", max_results=3)
+    assert [r["title"] for r in results] == ["Apple earnings 0", "Apple earnings 1", "Apple earnings 2"]
+
+
+def test_queries_missing_from_the_fixture_get_deterministic_results(tmp_path):
+    results = _backend(tmp_path).search("MSFT guidance", max_results=2)
+    assert len(results) == 2
+    # Another backend, and a differently spelled query, return the same links
+    again = LocalSearchBackend().search("msft   GUIDANCE", max_results=2)
+    assert [r["href"] for r in again] == [r["href"] for r in results]
+
+
+def test_identical_concurrent_searches_share_one_request(tmp_path):
+    backend = _backend(tmp_path, delay=0.05)
+    service = SearchService(backend=backend, cache=TTLCache(directory=str(tmp_path / "cache")))
+
+    async def search_twice():
+        try:
+            return await asyncio.gather(
+                service.search("AAPL earnings"), service.search("  aapl EARNINGS ")
+            )
+        finally:
+            service.close()
+
+    first, second = asyncio.run(search_twice())
+    assert first == second
+    assert first[0] == {"title": "Apple earnings 0", "link": "https://example.com/0", "snippet": "Snippet 0"}
+    assert backend.calls == 1
+    assert service.stats["coalesced"] == 1
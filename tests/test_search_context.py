@@ -0,0 +1,68 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_context import SearchContextRetriever
+
+
+class _SearchService:
+    """
+    Returns canned results per query
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    async def search(self, query, num_results=3):
+        self.queries.append((query, num_results))
+        return self.results.get(query, [])[:num_results]
+
+
+def _result(title: str, link: str, snippet: str = "") -> dict:
+    return {"title": title, "link": link, "snippet": snippet}
+
+
+def _retrieve(results: dict, max_results: int = 6, results_per_query: int = 5) -> list:
+    retriever = SearchContextRetriever(
+        search_service=_SearchService(results),
+        queries=["{symbol} news", "{symbol} earnings"],
+        results_per_query=results_per_query,
+        max_results=max_results,
+    )
+    return asyncio.run(retriever.retrieve("AAPL"))
+
+
+def test_results_found_by_several_queries_are_kept_once():
+    context = _retrieve(
+        {
+            "AAPL news": [_result("Apple beats estimates", "https://a.com/1"), _result("Other", "https://a.com/2")],
+            # The same article under another URL, with different spacing and case
+            "AAPL earnings": [
+                _result("apple  BEATS estimates", "https://b.com/1"),
+                _result("Other", "https://a.com/2"),
+            ],
+        }
+    )
+    assert [r["link"] for r in context] == ["https://a.com/1", "https://a.com/2"]
+
+
+def test_context_is_truncated_to_the_best_ranked_results():
+    news = [_result(f"News {index}", f"https://a.com/{index}") for index in range(5)]
+    earnings = [_result(f"Earnings {index}", f"https://b.com/{index}") for index in range(5)]
+    # Ranked last by both queries, but found by both
+    earnings[4] = _result("News 4", "https://b.com/4")
+    context = _retrieve({"AAPL news": news, "AAPL earnings": earnings}, max_results=3, results_per_query=5)
+
+    assert len(context) == 3
+    assert context[0]["link"] == "https://a.com/4"
+    assert [r["link"] for r in context[1:]] == ["https://a.com/0", "https://b.com/0"]
+
+
+def test_each_query_asks_for_the_configured_number_of_results():
+    service = _SearchService({})
+    retriever = SearchContextRetriever(search_service=service, queries=["{symbol} news"], results_per_query=4)
+    assert asyncio.run(retriever.retrieve("MSFT")) == []
+    assert service.queries == [("MSFT news", 4)]
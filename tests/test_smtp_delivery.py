@@ -0,0 +1,115 @@
+import asyncio
+import os
+import socket
+import sys
+from email.message import EmailMessage
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [REPO_DIR, os.path.join(REPO_DIR, "benchmarks")]
+
+from smtp_delivery import EmailDeliveryEngine, Outbox, SMTPConnectionPool
+from smtp_sink import SMTPSink
+
+
+def _message(recipient: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg["Subject"] = "Daily Stock Analysis Report"
+    msg["From"] = "reports@example.com"
+    msg["To"] = recipient
+    msg.set_content(f"Report for {recipient}")
+    return msg
+
+
+def _messages(*recipients: str) -> dict:
+    return {recipient: _message(recipient) for recipient in recipients}
+
+
+def _deliver(port: int, outbox: Outbox, messages: dict, max_retries: int = 3, placeholders=None) -> dict:
+    pool = SMTPConnectionPool("127.0.0.1", port, "user", "password", size=2, starttls=False, timeout=5)
+    engine = EmailDeliveryEngine(pool, outbox=outbox, max_retries=max_retries, backoff_seconds=0.01)
+    try:
+        return asyncio.run(engine.deliver(messages, placeholders))
+    finally:
+        engine.close()
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_temporary_failures_are_retried(tmp_path):
+    messages = _messages("a@example.com", "b@example.com", "c@example.com")
+    with SMTPSink(transient_failures=2) as sink:
+        results = _deliver(sink.port, Outbox(str(tmp_path)), messages)
+
+    assert results == dict.fromkeys(messages, True)
+    assert len(sink.messages) == 3
+
+
+def test_permanent_failures_are_not_retried(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    with SMTPSink(permanent_failures=1) as sink:
+        results = _deliver(sink.port, outbox, _messages("a@example.com"))
+
+    assert results == {"a@example.com": False}
+    assert sink.messages == []
+    # The message stays in the outbox for the next run
+    assert [message_id for message_id, _ in outbox.pending([outbox.message_id("a@example.com")])] == [
+        outbox.message_id("a@example.com")
+    ]
+
+
+def test_a_rerun_sends_only_what_is_still_pending(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    with SMTPSink() as sink:
+        _deliver(sink.port, outbox, _messages("a@example.com"))
+    # The server is down for the second recipient
+    failed = _deliver(_closed_port(), outbox, _messages("a@example.com", "b@example.com"), max_retries=0)
+    assert failed == {"a@example.com": True, "b@example.com": False}
+
+    with SMTPSink() as sink:
+        results = _deliver(sink.port, outbox, _messages("a@example.com", "b@example.com"))
+
+    assert results == {"a@example.com": True, "b@example.com": True}
+    assert [b"To: b@example.com" in message for message in sink.messages] == [True]
+
+
+def test_stale_messages_from_earlier_runs_are_not_sent(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    # Left behind by an earlier run for a subscriber who has since been removed
+    outbox.put(outbox.message_id("gone@example.com"), _message("gone@example.com"))
+
+    with SMTPSink() as sink:
+        results = _deliver(sink.port, outbox, _messages("a@example.com"))
+
+    assert results == {"a@example.com": True}
+    assert len(sink.messages) == 1 and b"To: a@example.com" in sink.messages[0]
+    assert outbox.pending([outbox.message_id("gone@example.com")]) == []
+
+
+def test_a_partial_report_is_resent_once_more_analyses_finish(tmp_path):
+    outbox = Outbox(str(tmp_path))
+    with SMTPSink() as sink:
+        _deliver(sink.port, outbox, _messages("a@example.com"), placeholders={"a@example.com": 2})
+        _deliver(sink.port, outbox, _messages("a@example.com"), placeholders={"a@example.com": 2})
+        _deliver(sink.port, outbox, _messages("a@example.com"))
+        _deliver(sink.port, outbox, _messages("a@example.com"))
+
+    assert len(sink.messages) == 2
+
+
+def test_closing_the_pool_tolerates_a_dropped_connection(monkeypatch):
+    with SMTPSink() as sink:
+        pool = SMTPConnectionPool("127.0.0.1", sink.port, "user", "password", size=1, starttls=False, timeout=5)
+        server = pool.acquire()
+        pool.release(server)
+
+        def quit():
+            raise ConnectionResetError("Connection reset by peer")
+
+        # The network dropped the connection while saying goodbye
+        monkeypatch.setattr(server, "quit", quit)
+        pool.close()
+    assert server.sock is None
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
+import config
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class TranscriptWriter:
+    """
+    Append debate turns to a JSONL transcript as they are streamed, one file per symbol and day.
+
+    Every line is flushed right away, so the transcript of a debate that is still running (or crashed)
+    can be followed with tail -f.
+    """
+
+    def __init__(self, symbol: str, directory: str = config.TRANSCRIPT_DIR):
+        day = datetime.now().strftime("%Y-%m-%d")
+        self.path = os.path.join(directory, day, f"{symbol}.jsonl")
+        self.symbol = symbol
+        self.turns = 0
+        self._file = None
+        self._started = time.monotonic()
+
+    def __enter__(self) -> "TranscriptWriter":
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._file.close()
+        logger.info(f"Wrote {self.turns} {self.symbol} turns to {self.path}")
+
+    def write(self, message: BaseAgentEvent | BaseChatMessage) -> None:
+        """
+        Append one streamed message or event to the transcript
+        """
+        usage = getattr(message, "models_usage", None)
+        record = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "elapsed_seconds": round(time.monotonic() - self._started, 3),
+            "symbol": self.symbol,
+            "turn": self.turns,
+            "source": message.source,
+            "type": message.type,
+            "content": message.to_text(),
+            "prompt_tokens": usage.prompt_tokens if usage else None,
+            "completion_tokens": usage.completion_tokens if usage else None,
+        }
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self.turns += 1
+        if isinstance(message, BaseChatMessage):
+            logger.info(f"{self.symbol} turn {record['turn']}: {message.source} ({len(record['content'])} chars)")
@@ -0,0 +1,152 @@
+import re
+import time
+import logging
+from typing import Dict, List, Sequence
+from autogen_agentchat.messages import BaseAgentEvent, BaseChatMessage
+from consensus import detect_consensus
+from logger_config import setup_logging
+
+# Configure logging for all modules
+setup_logging()
+logger = logging.getLogger(__name__)
+
+
+class TurnScheduler:
+    """
+    Rule-based speaker selection for the debate.
+
+    Every analyst turn is followed by the facilitator, and after a facilitator turn the next speaker is the agent the
+    facilitator addressed. The addressed agent is parsed from the facilitator's message; only when the parse is
+    ambiguous does selection fall back to the LLM selector (by returning None).
+
+    As soon as every analyst has stated a matching final stance after its opening statement, the summarizer is
+    selected right away instead of letting the debate run on. The same hand-off happens once the debate's time
+    budget is used up (wrap_up_at, a time.monotonic() timestamp), as long as every analyst has spoken.
+    """
+
+    def __init__(
+        self,
+        facilitator_name: str,
+        agent_names: List[str],
+        analyst_names: List[str] | None = None,
+        summarizer_name: str | None = None,
+    ):
+        self.facilitator_name = facilitator_name
+        self.agent_names = agent_names
+        self.analyst_names = analyst_names or []
+        self.summarizer_name = summarizer_name
+        self.selector_calls_avoided = 0
+        self.selector_calls_delegated = 0
+        self.early_terminations = 0
+        self.deadline_wrap_ups = 0
+        self.wrap_up_at: float | None = None
+
+        # Match "BuyAgent", "Buy Agent" and "buy agent" style mentions
+        names = "|".join(
+            re.escape(name[: -len("Agent")]) if name.endswith("Agent") else re.escape(name)
+            for name in agent_names
+        )
+        mention = rf"(?P<name>{names})\s?agent\b"
+        self._mention_pattern = re.compile(rf"\b{mention}", re.IGNORECASE)
+        # Direct address: "@BuyAgent", "BuyAgent:" or "BuyAgent," at the start of a sentence,
+        # or phrases like "over to BuyAgent" / "let's hear from BuyAgent"
+        self._address_patterns = [
+            re.compile(rf"@\s*{mention}", re.IGNORECASE),
+            re.compile(
+                rf"(?:^|[\n.!?]\s*)(?:\*\*)?{mention}(?:\*\*)?\s*[,:]",
+                re.IGNORECASE,
+            ),
+            re.compile(
+                rf"\b(?:over to|turn to|start with|hear from|invite|call on|ask|question (?:is )?for|"
+                rf"floor to|now,?)\s+(?:the\s+)?{mention}",
+                re.IGNORECASE,
+            ),
+        ]
+        self._names_by_prefix = {
+            (name[: -len("Agent")] if name.endswith("Agent") else name).lower(): name
+            for name in agent_names
+        }
+
+    def _names_in(self, matches) -> List[str]:
+        """
+        Map regex matches to distinct agent names, in order of appearance
+        """
+        found = []
+        for match in matches:
+            name = self._names_by_prefix[match.group("name").lower()]
+            if name not in found:
+                found.append(name)
+        return found
+
+    def resolve_addressed_agent(self, content: str) -> str | None:
+        """
+        Return the single agent the facilitator addressed, or None if the message is ambiguous
+        """
+        mentioned = self._names_in(self._mention_pattern.finditer(content))
+        if len(mentioned) == 1:
+            return mentioned[0]
+        if not mentioned:
+            return None
+
+        addressed = []
+        for pattern in self._address_patterns:
+            for name in self._names_in(pattern.finditer(content)):
+                if name not in addressed:
+                    addressed.append(name)
+        if len(addressed) == 1:
+            return addressed[0]
+        return None
+
+    def select(self, messages: Sequence[BaseAgentEvent | BaseChatMessage]) -> str | None:
+        """
+        Selector function for SelectorGroupChat: the next speaker's name, or None to let the LLM decide
+        """
+        last_message = messages[-1]
+
+        if self.summarizer_name and self.analyst_names:
+            summarized = any(m.source == self.summarizer_name for m in messages)
+            consensus = detect_consensus(messages, self.analyst_names)
+            if consensus is not None and not summarized:
+                logger.info(
+                    f"Analysts reached a {consensus} consensus after {len(messages)} messages, "
+                    f"handing off to {self.summarizer_name}"
+                )
+                self.early_terminations += 1
+                return self.summarizer_name
+
+            if (
+                self.wrap_up_at is not None
+                and time.monotonic() >= self.wrap_up_at
+                and not summarized
+                and all(any(m.source == name for m in messages) for name in self.analyst_names)
+            ):
+                logger.info(
+                    f"Debate time budget used up after {len(messages)} messages, "
+                    f"handing off to {self.summarizer_name}"
+                )
+                self.deadline_wrap_ups += 1
+                return self.summarizer_name
+
+        if last_message.source != self.facilitator_name:
+            return self.facilitator_name
+
+        content = getattr(last_message, "content", "")
+        speaker = self.resolve_addressed_agent(content) if isinstance(content, str) else None
+        if speaker is None:
+            self.selector_calls_delegated += 1
+            return None
+
+        self.selector_calls_avoided += 1
+        return speaker
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Number of facilitator turns resolved by the rules versus delegated to the LLM selector,
+        and number of debates cut short by early consensus or by their time budget
+        """
+        return {
+            "selector_calls_avoided": self.selector_calls_avoided,
+            "selector_calls_delegated": self.selector_calls_delegated,
+            "early_terminations": self.early_terminations,
+            "deadline_wrap_ups": self.deadline_wrap_ups,
+        }
@@ -1,9 +1,17 @@
 import yfinance as yf
-from typing import List, Dict, Any
+import pandas as pd
+from typing import List, Dict, Any, Tuple
+import json
 import time
 import logging
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
+import asyncio
+import lxml.html
+from playwright.async_api import Page
+from browser_pool import BrowserPool
+from resource_filter import ResourceFilter
+from cache import default_cache
+from telemetry import default_telemetry
+import config
 
 from logger_config import setup_logging
 
@@ -11,147 +19,295 @@ from logger_config import setup_logging
 setup_logging()
 logger = logging.getLogger(__name__)
 
+# Shared filter so blocked requests are totalled across the whole run
+default_resource_filter = ResourceFilter()
 
+
+def build_stock_data(
+    symbol: str, info: Dict[str, Any], hist: pd.DataFrame
+) -> Dict[str, Any]:
+    """
+    Shape yfinance info fields and price history into the stock data dict used by the analysts.
+    """
+    # Format every date in one vectorized call instead of per element
+    dates = hist.index.strftime("%Y-%m-%d").tolist()
+
+    return {
+        "symbol": symbol,
+        "current_price": info.get("currentPrice", None),
+        "target_price": info.get("targetMeanPrice", None),
+        "recommendation": info.get("recommendationKey", None),
+        "price_history": dict(zip(dates, hist["Close"].tolist())),
+        "volume_history": dict(zip(dates, hist["Volume"].tolist())),
+        "pe_ratio": info.get("forwardPE", None),
+        "market_cap": info.get("marketCap", None),
+        "dividend_yield": info.get("dividendYield", None),
+        "sector": info.get("sector", None),
+        "fifty_day_average": info.get("fiftyDayAverage", None),
+        "two_hundred_day_average": info.get("twoHundredDayAverage", None),
+        "high_52week": info.get("fiftyTwoWeekHigh", None),
+        "low_52week": info.get("fiftyTwoWeekLow", None),
+    }
+
+
+def _fetch_stock_data(symbol: str) -> Dict[str, Any]:
+    """
+    Blocking yfinance calls for a single symbol, run off the event loop by get_stock_data.
+    """
+    stock = yf.Ticker(symbol)
+    info = stock.info
+    # Fetch 1 month of historical data
+    hist = stock.history(period="1mo")
+
+    return build_stock_data(symbol, info, hist)
+
+
+@default_telemetry.traced("market_data", attributes=lambda symbol: {"symbol": symbol})
+@default_cache.cached("market_data", key_func=lambda symbol: symbol)
 async def get_stock_data(symbol: str) -> Dict[str, Any]:
     """
-    Get stock market data using yfinance. (No changes applied here.)
+    Get stock market data for one symbol using yfinance.
+    The blocking yfinance calls run in a worker thread so they do not stall the event loop.
     """
     try:
-        stock = yf.Ticker(symbol)
-        info = stock.info
-        # Fetch 1 month of historical data
-        hist = stock.history(period="1mo")
-
-        return {
-            "symbol": symbol,
-            "current_price": info.get("currentPrice", None),
-            "target_price": info.get("targetMeanPrice", None),
-            "recommendation": info.get("recommendationKey", None),
-            "price_history": {
-                k.strftime("%Y-%m-%d"): v for k, v in hist["Close"].to_dict().items()
-            },
-            "volume_history": {
-                k.strftime("%Y-%m-%d"): v for k, v in hist["Volume"].to_dict().items()
-            },
-            "pe_ratio": info.get("forwardPE", None),
-            "market_cap": info.get("marketCap", None),
-            "dividend_yield": info.get("dividendYield", None),
-            "sector": info.get("sector", None),
-            "fifty_day_average": info.get("fiftyDayAverage", None),
-            "two_hundred_day_average": info.get("twoHundredDayAverage", None),
-            "high_52week": info.get("fiftyTwoWeekHigh", None),
-            "low_52week": info.get("fiftyTwoWeekLow", None),
-        }
+        return await asyncio.to_thread(_fetch_stock_data, symbol)
 
     except Exception as e:
         logging.error(f"Error fetching stock data via yfinance for {symbol}: {str(e)}")
         return {}
 
 
-async def get_yahoo_finance_news(symbol: str) -> List[Dict[str, Any]]:
+# Report items inside the research reports list, shared by the in-browser and the HTML extraction paths
+RESEARCH_REPORT_ITEMS_SELECTOR = (
+    'section[data-testid="research-report"] div.listContainer section'
+)
+
+MAX_RESEARCH_REPORTS = 15
+
+# Runs inside the page on the report items, so only their titles and summaries leave the browser
+EXTRACT_REPORTS_SCRIPT = """items => items.map(item => {
+    const title = item.querySelector("h3.title");
+    const summary = item.querySelector("p.summary");
+    return {
+        title: title ? title.textContent : null,
+        summary: summary ? summary.textContent : null,
+    };
+})"""
+
+
+def _class_xpath(tag: str, class_name: str) -> str:
     """
-    Uses Playwright to launch a browser, wait for JavaScript to render content,
-    and then scrape the research reports using BeautifulSoup.
+    XPath matching descendant `tag` elements that have `class_name` among their classes
+    """
+    return f".//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {class_name} ')]"
+
+
+def _build_research_reports(items: List[Dict[str, str | None]]) -> List[Dict[str, Any]]:
+    """
+    Turn extracted report titles and summaries into research report articles, up to MAX_RESEARCH_REPORTS
     """
     all_articles = []
-    url = f"https://finance.yahoo.com/quote/{symbol}/"
+    for item in items:
+        if len(all_articles) >= MAX_RESEARCH_REPORTS:
+            logger.info(f"Reached {MAX_RESEARCH_REPORTS} item limit for research reports.")
+            break
+
+        headline = " ".join((item.get("title") or "").split())
+        if not headline:
+            # Skip boilerplate or incomplete sections
+            continue
+        description = " ".join((item.get("summary") or "").split()) or "No summary found."
+
+        all_articles.append(
+            {
+                "source": "Yahoo Finance - Research Reports (Playwright)",
+                "title": headline,
+                "content": f"Summary: {description}",
+                "type": "research_report",
+            }
+        )
 
-    try:
-        # Initialize Playwright
-        async with async_playwright() as p:
-            # Launch the browser in headless mode
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+    logger.info(f"Extracted {len(all_articles)} research reports.")
+    return all_articles
 
-            logger.info(f"Navigating to {url} using Playwright")
 
-            # Navigate to the page and wait for the DOM to be fully loaded
-            await page.goto(url, wait_until="load", timeout=300_000)
+async def _render_quote_page(
+    page: Page,
+    symbol: str,
+    url: str,
+    resource_filter: ResourceFilter,
+    extraction: str = config.REPORT_EXTRACTION,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Navigate a browser tab to the quote page and extract the research reports once they have rendered.
+    With resource filtering enabled, the page resolves on domcontentloaded instead of waiting for every asset.
+    Returns the reports and the number of bytes transferred out of the browser.
+    """
+    logger.info(f"Navigating to {url} using Playwright")
+    started = time.monotonic()
+
+    if resource_filter.enabled:
+        filter_stats = await resource_filter.attach(page)
+        # Only the DOM is needed, the reports selector below waits for the dynamic content
+        await page.goto(
+            url, wait_until="domcontentloaded", timeout=config.PAGE_LOAD_TIMEOUT_SECONDS * 1000
+        )
+    else:
+        filter_stats = None
+        # Navigate to the page and wait for the DOM to be fully loaded
+        await page.goto(url, wait_until="load", timeout=config.PAGE_LOAD_TIMEOUT_SECONDS * 1000)
+
+    # Wait for the dynamic content to load
+    # Selector targets the first non-skeleton section element within the listContainer
+    reports_list_selector = (
+        'div.listContainer section:not([data-testid="skeleton-loader"])'
+    )
+
+    logger.info("Waiting for research reports to load")
+
+    # Playwright waits until the element matching the selector appears
+    await page.wait_for_selector(
+        reports_list_selector, timeout=config.REPORTS_LOAD_TIMEOUT_SECONDS * 1000
+    )
+
+    if extraction == "evaluate":
+        # Read only the report subtree in the browser instead of serializing and parsing the whole page
+        items = await page.eval_on_selector_all(
+            RESEARCH_REPORT_ITEMS_SELECTOR, EXTRACT_REPORTS_SCRIPT
+        )
+        payload_bytes = len(json.dumps(items).encode("utf-8"))
+        reports = _build_research_reports(items)
+    else:
+        # Get the fully rendered HTML content
+        content = await page.content()
+        payload_bytes = len(content.encode("utf-8"))
+        reports = await asyncio.to_thread(_parse_research_reports, content)
 
-            # Wait for the dynamic content to load
-            # Selector targets the first non-skeleton section element within the listContainer
-            reports_list_selector = (
-                'div.listContainer section:not([data-testid="skeleton-loader"])'
-            )
+    resource_filter.record_scrape(symbol, time.monotonic() - started, filter_stats)
 
-            logger.info("Waiting for research reports to load")
+    return reports, payload_bytes
 
-            # Playwright waits until the element matching the selector appears
-            await page.wait_for_selector(reports_list_selector, timeout=120_000)
 
-            # Get the fully rendered HTML content
-            content = await page.content()
+def _parse_research_reports(content: str) -> List[Dict[str, Any]]:
+    """
+    Extract up to 15 research reports from the rendered quote page HTML using lxml.
+    """
+    tree = lxml.html.fromstring(content)
 
-            # Close the page and browser
-            await page.close()
-            await browser.close()
+    research_reports_sections = tree.xpath('//section[@data-testid="research-report"]')
+    if not research_reports_sections:
+        logger.warning(
+            "Research reports section [data-testid=research-report] not found."
+        )
+        return []
 
-            logger.info("Content successfully rendered and scraped.")
+    list_containers = research_reports_sections[0].xpath(_class_xpath("div", "listContainer"))
+    if not list_containers:
+        logger.warning("listContainer div not found within research-reports section.")
+        return []
 
-            # Use BeautifulSoup to parse the fully rendered content
-            soup = BeautifulSoup(content, "html.parser")
+    items = []
+    # Every inner section tag may contain report data
+    for item_section in list_containers[0].iterdescendants("section"):
+        h3_tags = item_section.xpath(_class_xpath("h3", "title"))
+        p_tags = item_section.xpath(_class_xpath("p", "summary"))
+        items.append(
+            {
+                "title": h3_tags[0].text_content() if h3_tags else None,
+                "summary": p_tags[0].text_content() if p_tags else None,
+            }
+        )
+    return _build_research_reports(items)
 
-            research_reports_section = soup.find(
-                "section", {"data-testid": "research-report"}
-            )
 
-            if research_reports_section:
-                list_container = research_reports_section.find(
-                    "div", class_="listContainer"
-                )
+@default_cache.cached(
+    "research_reports", key_func=lambda symbol, *args, **kwargs: symbol
+)
+async def get_yahoo_finance_news(
+    symbol: str,
+    browser_pool: BrowserPool | None = None,
+    resource_filter: ResourceFilter = default_resource_filter,
+) -> List[Dict[str, Any]]:
+    """
+    Uses Playwright to open the quote page in a headless browser, wait for JavaScript to render content,
+    and then extract the research reports inside the page (or from its HTML with lxml).
+    A shared browser_pool is reused when provided, otherwise a single-use browser is launched.
+    """
+    url = f"https://finance.yahoo.com/quote/{symbol}/"
 
-                if list_container:
-                    # Find all inner section tags which contain the report data
-                    report_items = list_container.find_all("section")
+    with default_telemetry.span("scrape", symbol=symbol) as span:
+        try:
+            if browser_pool is None:
+                # Launch a browser just for this symbol when no shared pool is available
+                async with BrowserPool(max_pages=1) as single_use_pool:
+                    async with single_use_pool.page() as page:
+                        reports, payload_bytes = await _render_quote_page(
+                            page, symbol, url, resource_filter
+                        )
+            else:
+                async with browser_pool.page() as page:
+                    reports, payload_bytes = await _render_quote_page(
+                        page, symbol, url, resource_filter
+                    )
 
-                    for item_section in report_items:
-                        if len(all_articles) >= 15:
-                            logger.info("Reached 15 item limit for research reports.")
-                            break
+            logger.info("Content successfully rendered and scraped.")
 
-                        # Find Title (h3.title)
-                        h3_tag = item_section.find("h3", class_="title")
-                        headline = h3_tag.get_text(strip=True) if h3_tag else None
+            span.set(bytes=payload_bytes, reports=len(reports))
+            return reports
 
-                        # Find Description (p.summary)
-                        p_tag = item_section.find("p", class_="summary")
-                        description = (
-                            p_tag.get_text(strip=True) if p_tag else "No summary found."
-                        )
+        except Exception as e:
+            # Catches errors like Timeouts if the content doesn't load in time
+            logger.error(
+                f"Playwright operation failed (e.g., Timeout or Browser error): {str(e)}",
+                exc_info=True,
+            )
+            span.set(error=type(e).__name__)
+            return []
 
-                        if not headline:
-                            # Skip boilerplate or incomplete sections
-                            continue
-
-                        all_articles.append(
-                            {
-                                "source": "Yahoo Finance - Research Reports (Playwright)",
-                                "title": headline,
-                                "content": f"Summary: {description}",
-                                "type": "research_report",
-                            }
-                        )
-                        time.sleep(0.1)
 
-                    logger.info(f"Extracted {len(all_articles)} research reports.")
-                else:
-                    logger.warning(
-                        "listContainer div not found within research-reports section."
-                    )
-            else:
-                logger.warning(
-                    "Research reports section [data-testid=research-report] not found."
-                )
+async def get_yahoo_finance_news_batch(
+    symbols: List[str], browser_pool: BrowserPool
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Scrape research reports for many symbols in parallel tabs of one shared browser.
+    The number of tabs open at once is bounded by the pool's max_pages.
+    """
+    results = await asyncio.gather(
+        *(get_yahoo_finance_news(symbol, browser_pool) for symbol in symbols)
+    )
+    return dict(zip(symbols, results))
+
+
+def build_market_sentiment(
+    symbol: str,
+    articles: List[Dict[str, Any]],
+    stock_data: Dict[str, Any],
+    search_context: List[Dict[str, str]] | None = None,
+) -> Dict[str, Any]:
+    """
+    Combine research reports, stock data and pre-fetched web search results for a symbol into one output.
+    """
+    # Log collection summary
+    logging.info(f"Collected {len(articles)} research reports for {symbol}")
 
-    except Exception as e:
-        # Catches errors like Timeouts if the content doesn't load within 30 seconds
-        logger.error(
-            f"Playwright operation failed (e.g., Timeout or Browser error): {str(e)}",
-            exc_info=True,
-        )
-        return []
+    # Count articles by type
+    article_types = {}
+    for article in articles:
+        article_type = article["type"]
+        article_types[article_type] = article_types.get(article_type, 0) + 1
 
-    return all_articles
+    logging.info(
+        "Article type breakdown: "
+        + ", ".join([f"{k}: {v}" for k, v in article_types.items()])
+    )
+
+    # Renamed output key to reflect content change
+    return {
+        "symbol": symbol,
+        "research_reports": articles,
+        "stock_data": stock_data,
+        "search_context": search_context or [],
+    }
 
 
 async def get_market_sentiment(symbol: str) -> Dict[str, Any]:
@@ -168,26 +324,7 @@ async def get_market_sentiment(symbol: str) -> Dict[str, Any]:
         logging.info(f"Getting stock data for {symbol} via yfinance")
         stock_data = await get_stock_data(symbol)
 
-        # Log collection summary
-        logging.info(f"Collected {len(articles)} research reports for {symbol}")
-
-        # Count articles by type
-        article_types = {}
-        for article in articles:
-            article_type = article["type"]
-            article_types[article_type] = article_types.get(article_type, 0) + 1
-
-        logging.info(
-            "Article type breakdown: "
-            + ", ".join([f"{k}: {v}" for k, v in article_types.items()])
-        )
-
-        # Renamed output key to reflect content change
-        return {
-            "symbol": symbol,
-            "research_reports": articles,
-            "stock_data": stock_data,
-        }
+        return build_market_sentiment(symbol, articles, stock_data)
 
     except Exception as e:
         logging.error(f"Error in get_market_sentiment: {str(e)}", exc_info=True)